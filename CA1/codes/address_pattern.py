@@ -0,0 +1,188 @@
+import bisect
+from typing import Iterable
+
+from base58check import BASE58_ALPHABET
+
+PAYLOAD_SIZE = 25
+HASH160_SIZE = 20
+CHECKSUM_BITS = 32
+MAX_ADDRESS_LENGTH = 35
+
+
+def _base58_value(digits: str) -> int:
+    value = 0
+    for digit in digits:
+        value = value * 58 + BASE58_ALPHABET.index(digit)
+    return value
+
+
+def _merge(intervals: list[tuple[int, int]]) -> list[tuple[int, int]]:
+    merged = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def payload_intervals(prefix: str, version: int) -> list[tuple[int, int]]:
+    for character in prefix:
+        if character not in BASE58_ALPHABET:
+            raise ValueError(f"Invalid Base58 character: {character!r}")
+
+    version_start = version << (8 * (PAYLOAD_SIZE - 1))
+    version_end = (version + 1) << (8 * (PAYLOAD_SIZE - 1))
+    pattern = "?" + prefix
+
+    intervals = []
+    for zeros in range(PAYLOAD_SIZE):
+        zeros_start = 256 ** (PAYLOAD_SIZE - zeros - 1)
+        zeros_end = 256 ** (PAYLOAD_SIZE - zeros)
+        start = max(version_start, zeros_start)
+        end = min(version_end, zeros_end)
+        if start >= end:
+            continue
+        if any(character != "1" for character in pattern[1:zeros]):
+            continue
+
+        for length in range(1, MAX_ADDRESS_LENGTH + 1):
+            length_start = max(start, 58 ** (length - 1))
+            length_end = min(end, 58**length)
+            if length_start >= length_end:
+                continue
+
+            digits = pattern[zeros:]
+            if len(digits) > length:
+                continue
+            first_digits = BASE58_ALPHABET[1:] if digits[:1] == "?" else digits[:1]
+            for first_digit in first_digits or [""]:
+                scale = 58 ** (length - len(digits))
+                value = _base58_value(first_digit + digits[1:])
+                interval_start = max(length_start, value * scale)
+                interval_end = min(length_end, (value + 1) * scale)
+                if interval_start < interval_end:
+                    intervals.append((interval_start, interval_end))
+    return _merge(intervals)
+
+
+def _probability(intervals: list[tuple[int, int]]) -> float:
+    total = sum(end - start for start, end in intervals)
+    return total / 2 ** (8 * (PAYLOAD_SIZE - 1))
+
+
+class AddressPattern:
+    def __init__(self, prefix: str, version: bytes):
+        self._prefix = prefix
+        self._version = version
+        self._intervals = payload_intervals(prefix, version[0])
+        if not self._intervals:
+            raise ValueError(f"Impossible prefix for this network: {prefix!r}")
+
+        hash160_intervals = _merge(
+            [
+                (self._to_hash160(start), self._to_hash160(end - 1, round_up=True))
+                for start, end in self._intervals
+            ]
+        )
+        self._starts = [start for start, _ in hash160_intervals]
+        self._ends = [end for _, end in hash160_intervals]
+
+    @property
+    def prefix(self) -> str:
+        return self._prefix
+
+    @property
+    def version(self) -> bytes:
+        return self._version
+
+    @property
+    def payload_intervals(self) -> list[tuple[int, int]]:
+        return self._intervals
+
+    @property
+    def hash160_intervals(self) -> list[tuple[bytes, bytes]]:
+        return list(zip(self._starts, self._ends))
+
+    @property
+    def probability(self) -> float:
+        return _probability(self._intervals)
+
+    @property
+    def expected_tries(self) -> float:
+        return 1 / self.probability
+
+    def matches(self, public_key_hash: bytes) -> bool:
+        index = bisect.bisect_right(self._starts, public_key_hash) - 1
+        return index >= 0 and public_key_hash < self._ends[index]
+
+    def matches_address(self, address: str) -> bool:
+        return address[1:].startswith(self._prefix)
+
+    def _to_hash160(self, payload: int, round_up: bool = False) -> bytes:
+        value = payload - (self._version[0] << (8 * (PAYLOAD_SIZE - 1)))
+        value = (value >> CHECKSUM_BITS) + int(round_up)
+        if value >= 256**HASH160_SIZE:
+            return b"\xff" * HASH160_SIZE + b"\x00"
+        return value.to_bytes(HASH160_SIZE, "big")
+
+
+class PatternTable:
+    def __init__(self, patterns: Iterable[AddressPattern]):
+        self._patterns = list(patterns)
+
+        events: dict[bytes, list[tuple[int, AddressPattern]]] = {}
+        for pattern in self._patterns:
+            for start, end in pattern.hash160_intervals:
+                events.setdefault(start, []).append((1, pattern))
+                events.setdefault(end, []).append((-1, pattern))
+
+        self._starts: list[bytes] = []
+        self._groups: list[tuple[AddressPattern, ...]] = []
+        active: dict[AddressPattern, int] = {}
+        for boundary in sorted(events):
+            for delta, pattern in events[boundary]:
+                active[pattern] = active.get(pattern, 0) + delta
+                if active[pattern] == 0:
+                    del active[pattern]
+            self._starts.append(boundary)
+            self._groups.append(tuple(active))
+
+    @property
+    def patterns(self) -> list[AddressPattern]:
+        return self._patterns
+
+    @property
+    def probability(self) -> float:
+        return _probability(
+            _merge(
+                [
+                    interval
+                    for pattern in self._patterns
+                    for interval in pattern.payload_intervals
+                ]
+            )
+        )
+
+    @property
+    def expected_tries(self) -> float:
+        return 1 / self.probability
+
+    def lookup(self, public_key_hash: bytes) -> tuple[AddressPattern, ...]:
+        index = bisect.bisect_right(self._starts, public_key_hash) - 1
+        if index < 0:
+            return ()
+        return self._groups[index]
+
+
+def main():
+    for prefix in ["pas", "PASHA", "a"]:
+        try:
+            pattern = AddressPattern(prefix, b"\x6f")
+            print(f"{prefix}: {pattern.expected_tries:,.0f} expected tries")
+        except ValueError as e:
+            print(f"{prefix}: {e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+import hashlib
+from typing import Iterable
+
+BASE58_ALPHABET = "123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz"
+CHECKSUM_SIZE = 4
+PAIR_BASE = 58**2
+
+_DIGIT_VALUES = {digit: value for value, digit in enumerate(BASE58_ALPHABET)}
+_PAIRS = [high + low for high in BASE58_ALPHABET for low in BASE58_ALPHABET]
+_PAIR_VALUES = {pair: value for value, pair in enumerate(_PAIRS)}
+
+
+def _checksum(payload: bytes) -> bytes:
+    return hashlib.sha256(hashlib.sha256(payload).digest()).digest()[:CHECKSUM_SIZE]
+
+
+def b58encode(data: bytes) -> str:
+    stripped = data.lstrip(b"\x00")
+    value = int.from_bytes(stripped, "big")
+    pairs = []
+    while value:
+        value, pair = divmod(value, PAIR_BASE)
+        pairs.append(_PAIRS[pair])
+    pairs.reverse()
+    encoded = "".join(pairs).lstrip("1")
+    return "1" * (len(data) - len(stripped)) + encoded
+
+
+def b58decode(string: str) -> bytes:
+    stripped = string.lstrip("1")
+    value = 0
+    try:
+        start = len(stripped) % 2
+        if start:
+            value = _DIGIT_VALUES[stripped[0]]
+        for i in range(start, len(stripped), 2):
+            value = value * PAIR_BASE + _PAIR_VALUES[stripped[i : i + 2]]
+    except KeyError:
+        raise ValueError("Invalid Base58 character") from None
+    decoded = value.to_bytes((value.bit_length() + 7) // 8, "big")
+    return b"\x00" * (len(string) - len(stripped)) + decoded
+
+
+def encode(payload: bytes) -> str:
+    return b58encode(payload + _checksum(payload))
+
+
+def decode(string: str) -> bytes:
+    data = b58decode(string)
+    payload, checksum = data[:-CHECKSUM_SIZE], data[-CHECKSUM_SIZE:]
+    if len(data) < CHECKSUM_SIZE or _checksum(payload) != checksum:
+        raise ValueError("Invalid checksum")
+    return payload
+
+
+def encode_many(payloads: Iterable[bytes]) -> list[str]:
+    return list(map(encode, payloads))
+
+
+def decode_many(strings: Iterable[str]) -> list[bytes]:
+    return list(map(decode, strings))
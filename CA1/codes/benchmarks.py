@@ -0,0 +1,697 @@
+import asyncio
+import io
+import multiprocessing
+import os
+import random
+import struct
+import sys
+import tempfile
+import time
+from itertools import islice
+from typing import BinaryIO, Callable, Iterable
+
+import base58
+from bitcoin.core import (
+    COIN,
+    CMutableTransaction,
+    CMutableTxIn,
+    CMutableTxOut,
+    COutPoint,
+    Hash,
+)
+from bitcoin.core.script import (
+    OP_0,
+    OP_CHECKSIG,
+    OP_DUP,
+    OP_EQUALVERIFY,
+    OP_HASH160,
+    SIGHASH_ALL,
+    CScript,
+    SignatureHash,
+)
+from bitcoin.core.scripteval import SCRIPT_VERIFY_P2SH, VerifyScript
+from bitcoin.core.serialize import VarIntSerializer
+from bitcoin.wallet import CBitcoinSecret, CKey
+
+import base58check
+import sha256_batch
+import template_verify
+from address_pattern import AddressPattern
+from block_reader import BlockReader
+from bulk_wallets import BulkWalletGenerator
+from coin_selection import P2PKH_OUTPUT_SIZE, CoinSelector, p2pkh_input_size
+from header_store import (
+    INDEX_SUFFIX,
+    RECORD_SIZE,
+    RETARGET_INTERVAL,
+    HeaderStore,
+    bits_to_target,
+)
+from key_walk import KeyWalker, walk_wallets
+from keystore import KeyMaterial, Keystore
+from merkle import MerkleTree
+from mining_stats import MiningMonitor
+from multisig import MultiSigSpend
+from part1_q1 import Wallet
+from part1_q2 import PROCESSES
+from part3 import BitcoinBlock, HeaderHasher
+from script_templates import address_to_script_pub_key, multi_sig_2_of_3
+from script_verify import DEFAULT_FLAGS, BatchVerifier
+from sighash import SighashCache
+from template_verify import _verify_script
+from transaction import Destination, Transaction, UnspentTransactionOutput
+from utxo_store import StoredUtxo, UtxoStore
+from work_client import run_worker
+from work_server import WorkServer
+
+DURATION = 2.0
+
+
+def _rate(items: Iterable, duration: float = DURATION) -> float:
+    iterator = iter(items)
+    count = 0
+    start = time.perf_counter()
+    while (elapsed := time.perf_counter() - start) < duration:
+        count += sum(1 for _ in islice(iterator, 100))
+    return count / elapsed
+
+
+def _report(name: str, rate: float, baseline: float | None = None) -> None:
+    speedup = "" if baseline is None else f" ({rate / baseline:.1f}x)"
+    print(f"{name:<40}{rate:>14,.0f} /s{speedup}")
+
+
+def _generate_wallets(network: Wallet.Network):
+    wallet = Wallet(network)
+    while True:
+        wallet.generate()
+        yield wallet.bitcoin_address
+
+
+def benchmark_key_generation() -> None:
+    network = Wallet.Network.TESTNET
+    baseline = _rate(_generate_wallets(network))
+    _report("Wallet.generate", baseline)
+    _report("walk_wallets", _rate(walk_wallets(network)), baseline)
+
+
+def benchmark_bulk_wallets() -> None:
+    network = Wallet.Network.TESTNET
+    baseline = _rate(_generate_wallets(network))
+    _report("Wallet.generate", baseline)
+    generator = BulkWalletGenerator(network)
+    next(generator.generate(1))
+    _report("BulkWalletGenerator", _rate(generator.generate(10**9)), baseline)
+
+
+def _match_addresses(wallet: Wallet, prefix: str):
+    for private_key, public_key in KeyWalker():
+        wallet._private_key = private_key
+        wallet._public_key = public_key
+        wallet._generate_bitcoin_address()
+        yield wallet.bitcoin_address[1:].startswith(prefix)
+
+
+def _match_hashes(wallet: Wallet, pattern: AddressPattern):
+    for _, public_key in KeyWalker():
+        wallet._public_key = public_key
+        yield pattern.matches(wallet._get_public_key_hash())
+
+
+def benchmark_prefix_matching() -> None:
+    wallet = Wallet(Wallet.Network.TESTNET)
+    pattern = AddressPattern("pas", wallet._get_network_byte(is_private=False))
+    baseline = _rate(_match_addresses(wallet, pattern.prefix))
+    _report("Base58 address startswith", baseline)
+    _report("AddressPattern.matches", _rate(_match_hashes(wallet, pattern)), baseline)
+
+
+BASE58_PAYLOADS = 20_000
+
+
+def benchmark_base58() -> None:
+    payloads = [b"\x6f" + os.urandom(20) for _ in range(BASE58_PAYLOADS)]
+    addresses = base58check.encode_many(payloads)
+    baseline = _per_second(
+        lambda _: [base58.b58encode_check(payload) for payload in payloads],
+        BASE58_PAYLOADS,
+    )
+    _report("base58.b58encode_check", baseline)
+    rate = _per_second(lambda _: base58check.encode_many(payloads), BASE58_PAYLOADS)
+    _report("base58check.encode_many", rate, baseline)
+    baseline = _per_second(
+        lambda _: [base58.b58decode_check(address) for address in addresses],
+        BASE58_PAYLOADS,
+    )
+    _report("base58.b58decode_check", baseline)
+    rate = _per_second(lambda _: base58check.decode_many(addresses), BASE58_PAYLOADS)
+    _report("base58check.decode_many", rate, baseline)
+
+
+HEADER_PREFIX = bytes(76)
+HEADER_TARGET = bytes(4) + b"\xff" * 28
+HEADER_NONCES = 500_000
+
+
+def _hash_headers_naive(count: int) -> None:
+    target = HEADER_TARGET
+    for nonce in range(count):
+        hash_value = Hash(HEADER_PREFIX + struct.pack("<L", nonce))
+        if hash_value[::-1] < target:
+            break
+
+
+def _per_second(function: Callable[[int], object], count: int) -> float:
+    start = time.perf_counter()
+    function(count)
+    return count / (time.perf_counter() - start)
+
+
+def benchmark_header_hashing() -> None:
+    hasher = HeaderHasher(HEADER_PREFIX, HEADER_TARGET)
+    baseline = _per_second(_hash_headers_naive, HEADER_NONCES)
+    _report("Hash(partial_header + nonce)", baseline)
+    rate = _per_second(lambda count: hasher.sweep(0, count), HEADER_NONCES)
+    _report("HeaderHasher.sweep", rate, baseline)
+    if sha256_batch.AVAILABLE:
+        batch_hasher = sha256_batch.BatchHeaderHasher(HEADER_PREFIX, HEADER_TARGET)
+        rate = _per_second(lambda count: batch_hasher.sweep(0, count), HEADER_NONCES)
+        _report("BatchHeaderHasher.sweep", rate, baseline)
+    else:
+        print("BatchHeaderHasher.sweep skipped: NumPy is not installed")
+
+
+MERKLE_SIZES = [1_000, 10_000, 100_000]
+MERKLE_UPDATES = 1_000
+
+
+def _rebuild_merkle_root(leaves: list[bytes]) -> bytes:
+    hashes = list(leaves)
+    while len(hashes) > 1:
+        if len(hashes) % 2 != 0:
+            hashes.append(hashes[-1])
+        hashes = [
+            Hash(hash1 + hash2) for hash1, hash2 in zip(hashes[::2], hashes[1::2])
+        ]
+    return hashes[0]
+
+
+def _update_merkle_tree(tree: MerkleTree, count: int) -> None:
+    for _ in range(count):
+        leaf = os.urandom(32)
+        tree.replace(0, leaf)
+        tree.append(os.urandom(32))
+        MerkleTree.verify(leaf, 0, tree.proof(0), tree.root)
+
+
+def benchmark_merkle_tree() -> None:
+    for size in MERKLE_SIZES:
+        leaves = [os.urandom(32) for _ in range(size)]
+        rebuilds = max(1, MERKLE_UPDATES * 1_000 // size // 10)
+        baseline = _per_second(
+            lambda count: [_rebuild_merkle_root(leaves) for _ in range(count)],
+            rebuilds,
+        )
+        _report(f"full rebuild ({size:,} txs)", baseline)
+        tree = MerkleTree(leaves)
+        rate = _per_second(
+            lambda count: _update_merkle_tree(tree, count), MERKLE_UPDATES
+        )
+        _report(f"replace+append+proof ({size:,} txs)", rate, baseline)
+
+
+SIGNING_PRIVATE_KEY = "92Zh9ENA7DeNBr3FXa1QMLi4igPAzUKy44TEPMW7rogBtGz4CaR"
+SIGNING_INPUTS = [1, 10, 100, 500]
+
+
+def _create_transaction(inputs: int) -> Transaction:
+    tx = Transaction(SIGNING_PRIVATE_KEY)
+    script_pub_key = tx.my_P2PKH_script_pub_key()
+    for _ in range(inputs):
+        tx.add_utxo(UnspentTransactionOutput(os.urandom(32).hex(), 0, script_pub_key))
+    tx.add_destination(Destination(tx.address, 0.001))
+    tx._create_transaction()
+    return tx
+
+
+def _sign_naive(tx: Transaction) -> None:
+    for i, utxo in enumerate(tx._utxos):
+        sighash = SignatureHash(utxo.script_pub_key, tx._tx, i, SIGHASH_ALL)
+        tx._private_key.sign(sighash)
+
+
+def benchmark_signing() -> None:
+    for inputs in SIGNING_INPUTS:
+        tx = _create_transaction(inputs)
+        baseline = _per_second(lambda _: _sign_naive(tx), inputs)
+        _report(f"SignatureHash+sign ({inputs} inputs)", baseline)
+        rate = _per_second(lambda _: tx._sign(), inputs)
+        _report(f"SighashCache ({inputs} inputs)", rate, baseline)
+        rate = _per_second(lambda _: tx._sign(PROCESSES), inputs)
+        _report(f"SighashCache x{PROCESSES} ({inputs} inputs)", rate, baseline)
+
+
+VERIFY_INPUTS = 200
+
+
+def _verify_naive(tx: Transaction) -> None:
+    for i, utxo in enumerate(tx._utxos):
+        VerifyScript(
+            tx._tx.vin[i].scriptSig,
+            utxo.script_pub_key,
+            tx._tx,
+            i,
+            (SCRIPT_VERIFY_P2SH,),
+        )
+
+
+def benchmark_verification() -> None:
+    tx = _create_transaction(VERIFY_INPUTS)
+    tx._sign()
+    baseline = _per_second(lambda _: _verify_naive(tx), VERIFY_INPUTS)
+    _report(f"VerifyScript ({VERIFY_INPUTS} inputs)", baseline)
+    verifier = BatchVerifier()
+    rate = _per_second(
+        lambda _: verifier.verify(tx._tx, [utxo.script_pub_key for utxo in tx._utxos]),
+        VERIFY_INPUTS,
+    )
+    _report("BatchVerifier (cold)", rate, baseline)
+    rate = _per_second(
+        lambda _: verifier.verify(tx._tx, [utxo.script_pub_key for utxo in tx._utxos]),
+        VERIFY_INPUTS,
+    )
+    _report("BatchVerifier (cached)", rate, baseline)
+
+
+TEMPLATE_INPUTS = 200
+
+
+def _verify_templates(tx: Transaction, verify: Callable) -> None:
+    sighashes = SighashCache(tx._tx)
+    flags = frozenset(DEFAULT_FLAGS)
+    for i, utxo in enumerate(tx._utxos):
+        verify(tx._tx, i, utxo.script_pub_key, flags, sighashes)
+
+
+def benchmark_template_verification() -> None:
+    tx = _create_transaction(TEMPLATE_INPUTS)
+    tx._sign()
+    baseline = _per_second(
+        lambda _: _verify_templates(
+            tx, lambda tx, i, spk, flags, _: _verify_script(tx, i, spk, flags)
+        ),
+        TEMPLATE_INPUTS,
+    )
+    _report(f"VerifyScript ({TEMPLATE_INPUTS} P2PKH inputs)", baseline)
+    rate = _per_second(
+        lambda _: _verify_templates(tx, template_verify.verify_input), TEMPLATE_INPUTS
+    )
+    _report(f"template_verify ({TEMPLATE_INPUTS} P2PKH inputs)", rate, baseline)
+
+
+MULTISIG_INPUTS = [10, 100, 500]
+
+
+def _create_multisig_transaction(
+    inputs: int, keys: list[CKey]
+) -> tuple[CMutableTransaction, CScript]:
+    script_pub_key = multi_sig_2_of_3(*[key.pub for key in keys])
+    tx = CMutableTransaction(
+        [CMutableTxIn(COutPoint(os.urandom(32), 0)) for _ in range(inputs)],
+        [CMutableTxOut(COIN, script_pub_key)],
+    )
+    return tx, script_pub_key
+
+
+def _cosign_naive(
+    tx: CMutableTransaction, script_pub_key: CScript, keys: list[CKey]
+) -> None:
+    for i in range(len(tx.vin)):
+        signatures = [
+            key.sign(SignatureHash(script_pub_key, tx, i, SIGHASH_ALL))
+            + bytes([SIGHASH_ALL])
+            for key in keys
+        ]
+        tx.vin[i].scriptSig = CScript([OP_0, *signatures])  # type: ignore
+
+
+def _cosign(
+    tx: CMutableTransaction,
+    script_pub_key: CScript,
+    keys: list[CKey],
+    processes: int = 1,
+) -> None:
+    spend = MultiSigSpend(tx, [script_pub_key] * len(tx.vin))
+    spend.sign(*keys, processes=processes)
+    for i, script_sig in spend.script_sigs().items():
+        tx.vin[i].scriptSig = script_sig
+
+
+def benchmark_multisig() -> None:
+    keys = [CBitcoinSecret.from_secret_bytes(os.urandom(32)) for _ in range(3)]
+    for inputs in MULTISIG_INPUTS:
+        tx, script_pub_key = _create_multisig_transaction(inputs, keys)
+        baseline = _per_second(
+            lambda _: _cosign_naive(tx, script_pub_key, keys[:2]), inputs
+        )
+        _report(f"SignatureHash per co-signer ({inputs} inputs)", baseline)
+        rate = _per_second(lambda _: _cosign(tx, script_pub_key, keys[:2]), inputs)
+        _report(f"MultiSigSpend.sign ({inputs} inputs)", rate, baseline)
+        rate = _per_second(
+            lambda _: _cosign(tx, script_pub_key, keys[:2], PROCESSES), inputs
+        )
+        _report(f"MultiSigSpend.sign x{PROCESSES} ({inputs} inputs)", rate, baseline)
+
+
+BLOCK_FILE_BLOCKS = 50
+BLOCK_TRANSACTIONS = 1_000
+BLOCK_BITS = "0x207fffff"
+
+
+def _write_block_file(file: BinaryIO) -> None:
+    for _ in range(BLOCK_FILE_BLOCKS):
+        coinbase = CMutableTransaction(
+            [CMutableTxIn(COutPoint(), CScript([b"benchmark"]))],  # type: ignore
+            [CMutableTxOut(COIN, CScript([os.urandom(20)]))],  # type: ignore
+        )
+        transactions = [coinbase] + [
+            CMutableTransaction(
+                [CMutableTxIn(COutPoint(os.urandom(32), 0), CScript([os.urandom(71)]))],  # type: ignore
+                [CMutableTxOut(COIN, CScript([os.urandom(20)]))],  # type: ignore
+            )
+            for _ in range(BLOCK_TRANSACTIONS - 1)
+        ]
+        block = BitcoinBlock(transactions, "00" * 32, BLOCK_BITS)
+        block.mine(monitor=MiningMonitor())
+        block.write_to(file)
+
+
+def _validate_blocks_naive(path: str) -> None:
+    with open(path, "rb") as file:
+        data = file.read()
+    offset = 0
+    while offset < len(data):
+        (size,) = struct.unpack_from("<L", data, offset + 4)
+        stream = io.BytesIO(data[offset + 8 : offset + 8 + size])
+        header = stream.read(80)
+        transactions = [
+            CMutableTransaction.stream_deserialize(stream)
+            for _ in range(VarIntSerializer.stream_deserialize(stream))
+        ]
+        root = MerkleTree(tx.GetTxid() for tx in transactions).root
+        if root != header[36:68] or int.from_bytes(Hash(header), "little") >= int(
+            BitcoinBlock._get_target(BLOCK_BITS).hex(), 16
+        ):
+            raise ValueError("Invalid block")
+        offset += 8 + size
+
+
+def _validate_blocks(path: str, processes: int = 1) -> None:
+    with BlockReader(path) as reader:
+        for validation in reader.validate(processes):
+            if not validation.passed:
+                raise ValueError(str(validation))
+
+
+def benchmark_block_reader() -> None:
+    with tempfile.NamedTemporaryFile(suffix=".dat") as file:
+        _write_block_file(file)
+        file.flush()
+        baseline = _per_second(
+            lambda _: _validate_blocks_naive(file.name), BLOCK_FILE_BLOCKS
+        )
+        _report(f"read+deserialize ({BLOCK_TRANSACTIONS:,} txs/block)", baseline)
+        rate = _per_second(lambda _: _validate_blocks(file.name), BLOCK_FILE_BLOCKS)
+        _report("BlockReader.validate", rate, baseline)
+        rate = _per_second(
+            lambda _: _validate_blocks(file.name, PROCESSES), BLOCK_FILE_BLOCKS
+        )
+        _report(f"BlockReader.validate x{PROCESSES}", rate, baseline)
+
+
+HEADER_STORE_SIZE = 1_000_000
+HEADER_STORE_BITS = 0x207FFFFF
+HEADER_SPACING = 600
+
+
+def _mine_headers(
+    prev_hash: bytes, height: int, count: int, bits: int, spacing: int
+) -> list[bytes]:
+    target = bits_to_target(bits)
+    headers = []
+    for i in range(count):
+        partial_header = (
+            struct.pack("<L", 2)
+            + prev_hash
+            + os.urandom(32)
+            + struct.pack("<LL", 1_700_000_000 + (height + i) * spacing, bits)
+        )
+        for nonce in range(2**32):
+            header = partial_header + struct.pack("<L", nonce)
+            prev_hash = Hash(header)
+            if int.from_bytes(prev_hash, "little") <= target:
+                break
+        headers.append(header)
+    return headers
+
+
+def _extend_chain(store: HeaderStore, count: int, spacing: int) -> None:
+    while count > 0:
+        height = 0 if store.tip is None else store.tip.height + 1
+        prev_hash = bytes(32) if store.tip is None else store.tip.hash
+        batch = min(count, RETARGET_INTERVAL - height % RETARGET_INTERVAL)
+        bits = int(store.next_bits(), 16)
+        store.add_many(_mine_headers(prev_hash, height, batch, bits, spacing))
+        count -= batch
+
+
+def _check_retarget(path: str) -> None:
+    with HeaderStore(path, HEADER_STORE_BITS) as store:
+        _extend_chain(store, RETARGET_INTERVAL, HEADER_SPACING // 2)
+        target = bits_to_target(int(store.next_bits(), 16))
+        expected = (
+            bits_to_target(HEADER_STORE_BITS)
+            * (RETARGET_INTERVAL - 1)
+            // (RETARGET_INTERVAL * 2)
+        )
+        if abs(target - expected) > expected >> 16:
+            raise ValueError("Retarget did not halve the target")
+
+
+def _load_headers_naive(path: str) -> None:
+    with open(path, "rb") as file:
+        data = file.read()
+    index = {}
+    tip = None
+    for position in range(len(data) // RECORD_SIZE):
+        record = data[position * RECORD_SIZE : (position + 1) * RECORD_SIZE]
+        index[record[80:112]] = position
+        if tip is None or record[112:144] > tip[112:144]:
+            tip = record
+
+
+def _load_headers(path: str) -> None:
+    with HeaderStore(path, HEADER_STORE_BITS) as store:
+        if len(store) != HEADER_STORE_SIZE:
+            raise ValueError("Header store lost headers")
+
+
+def benchmark_header_store() -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        _check_retarget(os.path.join(directory, "retarget.dat"))
+        print("retarget halves the target after a 2x faster interval")
+        path = os.path.join(directory, "headers.dat")
+        with HeaderStore(path, HEADER_STORE_BITS) as store:
+            _extend_chain(store, HEADER_STORE_SIZE, HEADER_SPACING)
+        baseline = _per_second(lambda _: _load_headers_naive(path), HEADER_STORE_SIZE)
+        _report(f"dict index load ({HEADER_STORE_SIZE:,} headers)", baseline)
+        os.remove(path + INDEX_SUFFIX)
+        rate = _per_second(lambda _: _load_headers(path), HEADER_STORE_SIZE)
+        _report("HeaderStore index rebuild", rate, baseline)
+        rate = _per_second(lambda _: _load_headers(path), HEADER_STORE_SIZE)
+        _report("HeaderStore load", rate, baseline)
+
+
+WORK_SERVER_BLOCKS = 10
+WORK_SERVER_WORKERS = 3
+WORK_SERVER_BITS = 0x1F00FFFF
+WORK_SERVER_CHUNK_SIZE = 2**12
+
+
+def _work_server_block(store: HeaderStore) -> BitcoinBlock:
+    coinbase = CMutableTransaction(
+        [CMutableTxIn(COutPoint(), CScript([os.urandom(8)]))],  # type: ignore
+        [CMutableTxOut(COIN, CScript([os.urandom(20)]))],  # type: ignore
+    )
+    if store.tip is None:
+        return BitcoinBlock([coinbase], "00" * 32, store.next_bits())
+    return BitcoinBlock.from_header_store(store, [coinbase])
+
+
+def _mine_blocks_serial(path: str, count: int) -> None:
+    with HeaderStore(path, WORK_SERVER_BITS) as store:
+        for _ in range(count):
+            block = _work_server_block(store)
+            block.mine(monitor=MiningMonitor())
+            store.add(block.header)
+
+
+async def _mine_blocks_served(path: str, count: int) -> None:
+    server = WorkServer(port=0, chunk_size=WORK_SERVER_CHUNK_SIZE)
+    async with server:
+        host, port = server.address
+        with HeaderStore(path, WORK_SERVER_BITS) as store:
+            block = _work_server_block(store)
+            server.set_block(block)
+            workers = [
+                multiprocessing.Process(target=run_worker, args=(host, port))
+                for _ in range(WORK_SERVER_WORKERS)
+            ]
+            for worker in workers:
+                worker.start()
+            for _ in range(count):
+                await server.solve()
+                store.add(block.header)
+                block = _work_server_block(store)
+                server.set_block(block)
+    for worker in workers:
+        worker.join()
+
+
+def benchmark_work_server() -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        baseline = _per_second(
+            lambda count: _mine_blocks_serial(
+                os.path.join(directory, "serial.dat"), count
+            ),
+            WORK_SERVER_BLOCKS,
+        )
+        _report("BitcoinBlock.mine (blocks)", baseline)
+        path = os.path.join(directory, "served.dat")
+        start = time.perf_counter()
+        asyncio.run(_mine_blocks_served(path, WORK_SERVER_BLOCKS))
+        rate = WORK_SERVER_BLOCKS / (time.perf_counter() - start)
+        _report(f"WorkServer x{WORK_SERVER_WORKERS} (blocks)", rate, baseline)
+
+
+def _load_transactions(private_key: Callable[[], str | KeyMaterial]):
+    while True:
+        yield Transaction(private_key())
+
+
+def benchmark_keystore() -> None:
+    keystore = Keystore()
+    baseline = _rate(_load_transactions(lambda: SIGNING_PRIVATE_KEY))
+    _report("Transaction(wif)", baseline)
+    rate = _rate(_load_transactions(lambda: keystore.get(SIGNING_PRIVATE_KEY)))
+    _report("Transaction(keystore.get(wif))", rate, baseline)
+
+
+PAYOUT_OUTPUTS = 10_000
+PAYOUT_ADDRESSES = 1_000
+
+
+def _build_txouts_naive(destinations: list[tuple[str, int]]) -> list[CMutableTxOut]:
+    return [
+        CMutableTxOut(
+            amount,
+            CScript(
+                [OP_DUP, OP_HASH160, base58check.decode(address)[1:], OP_EQUALVERIFY, OP_CHECKSIG]  # type: ignore
+            ),
+        )
+        for address, amount in destinations
+    ]
+
+
+def _build_txouts(destinations: list[tuple[str, int]]) -> list[CMutableTxOut]:
+    return [
+        CMutableTxOut(amount, address_to_script_pub_key(address))
+        for address, amount in destinations
+    ]
+
+
+def benchmark_script_templates() -> None:
+    addresses = base58check.encode_many(
+        b"\x6f" + os.urandom(20) for _ in range(PAYOUT_ADDRESSES)
+    )
+    destinations = [
+        (random.choice(addresses), random.randrange(1, COIN))
+        for _ in range(PAYOUT_OUTPUTS)
+    ]
+    baseline = _per_second(lambda _: _build_txouts_naive(destinations), PAYOUT_OUTPUTS)
+    _report(f"decode+CScript ({PAYOUT_OUTPUTS:,} outputs)", baseline)
+    rate = _per_second(lambda _: _build_txouts(destinations), PAYOUT_OUTPUTS)
+    _report(f"address_to_script_pub_key ({PAYOUT_OUTPUTS:,} outputs)", rate, baseline)
+
+
+UTXO_STORE_SIZE = 1_000_000
+UTXO_SELECTIONS = 1_000
+UTXO_NAIVE_SELECTIONS = 10
+
+
+def _select_naive(utxos: list[StoredUtxo], target: int) -> list[StoredUtxo]:
+    selected = []
+    total = 0
+    for utxo in sorted(utxos, key=lambda utxo: utxo.amount, reverse=True):
+        selected.append(utxo)
+        total += utxo.amount
+        if total >= target + p2pkh_input_size(65) * len(selected):
+            return selected
+    raise ValueError("Insufficient funds")
+
+
+def benchmark_coin_selection() -> None:
+    tx = Transaction(SIGNING_PRIVATE_KEY)
+    script_pub_key = tx.my_P2PKH_script_pub_key()
+    utxos = [
+        StoredUtxo(f"{i:064x}", 0, script_pub_key, tx.address, random.randrange(10**8))
+        for i in range(UTXO_STORE_SIZE)
+    ]
+    targets = [random.randrange(10**9) for _ in range(UTXO_SELECTIONS)]
+    baseline = _per_second(
+        lambda count: [_select_naive(utxos, target) for target in targets[:count]],
+        UTXO_NAIVE_SELECTIONS,
+    )
+    _report(f"sort+largest first ({UTXO_STORE_SIZE:,} UTXOs)", baseline)
+    with UtxoStore() as store:
+        store.add_many(utxos)
+        selector = CoinSelector(store)
+        rate = _per_second(
+            lambda count: [
+                selector.select(tx.address, target, 1, P2PKH_OUTPUT_SIZE)
+                for target in targets[:count]
+            ],
+            UTXO_SELECTIONS,
+        )
+        _report(f"CoinSelector.select ({UTXO_STORE_SIZE:,} UTXOs)", rate, baseline)
+
+
+BENCHMARKS: dict[str, Callable[[], None]] = {
+    "key_generation": benchmark_key_generation,
+    "bulk_wallets": benchmark_bulk_wallets,
+    "prefix_matching": benchmark_prefix_matching,
+    "base58": benchmark_base58,
+    "header_hashing": benchmark_header_hashing,
+    "merkle_tree": benchmark_merkle_tree,
+    "block_reader": benchmark_block_reader,
+    "header_store": benchmark_header_store,
+    "work_server": benchmark_work_server,
+    "signing": benchmark_signing,
+    "verification": benchmark_verification,
+    "template_verification": benchmark_template_verification,
+    "multisig": benchmark_multisig,
+    "keystore": benchmark_keystore,
+    "script_templates": benchmark_script_templates,
+    "coin_selection": benchmark_coin_selection,
+}
+
+
+def main():
+    names = sys.argv[1:] or list(BENCHMARKS)
+    for name in names:
+        print(f"[{name}]")
+        BENCHMARKS[name]()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,396 @@
+import hashlib
+import mmap
+import multiprocessing
+import os
+import struct
+import sys
+from typing import Iterator
+
+from bitcoin.core import b2lx
+
+from header_store import hash_meets_target
+from merkle import MerkleTree
+from part3 import BLOCK_MAGIC, BitcoinBlock
+
+HEADER_SIZE = 80
+RECORD_HEADER_SIZE = 8
+NULL_PREVOUT = bytes(32) + b"\xff\xff\xff\xff"
+OUTPOINT_SIZE = 36
+COINBASE_SCRIPT_SIZES = range(2, 101)
+VALIDATION_CHUNK_SIZE = 16
+RELEASE_INTERVAL = 64 * 2**20
+PROCESSES = multiprocessing.cpu_count()
+
+_worker_reader: "BlockReader | None" = None
+
+
+class BlockValidation:
+    def __init__(self, offset: int, block_hash: str, errors: list[str]):
+        self._offset = offset
+        self._block_hash = block_hash
+        self._errors = errors
+
+    def __str__(self):
+        status = "ok" if self.passed else "failed: " + "; ".join(self._errors)
+        return f"Block {self._block_hash} at {self._offset}: {status}"
+
+    @property
+    def offset(self) -> int:
+        return self._offset
+
+    @property
+    def block_hash(self) -> str:
+        return self._block_hash
+
+    @property
+    def passed(self) -> bool:
+        return not self._errors
+
+    @property
+    def errors(self) -> list[str]:
+        return self._errors
+
+
+class _TransactionLayout:
+    def __init__(
+        self,
+        start: int,
+        end: int,
+        witness: tuple[int, int] | None,
+        inputs: int,
+        null_prevouts: int,
+        first_script_sig_size: int,
+    ):
+        self._start = start
+        self._end = end
+        self._witness = witness
+        self._inputs = inputs
+        self._null_prevouts = null_prevouts
+        self._first_script_sig_size = first_script_sig_size
+
+    @property
+    def end(self) -> int:
+        return self._end
+
+    @property
+    def inputs(self) -> int:
+        return self._inputs
+
+    @property
+    def null_prevouts(self) -> int:
+        return self._null_prevouts
+
+    @property
+    def first_script_sig_size(self) -> int:
+        return self._first_script_sig_size
+
+    def slice(self, view: memoryview) -> memoryview:
+        return view[self._start : self._end]
+
+    def txid(self, view: memoryview) -> bytes:
+        if self._witness is None:
+            first = hashlib.sha256(view[self._start : self._end]).digest()
+        else:
+            witness_start, witness_end = self._witness
+            hasher = hashlib.sha256(view[self._start : self._start + 4])
+            hasher.update(view[self._start + 6 : witness_start])
+            hasher.update(view[witness_end : self._end])
+            first = hasher.digest()
+        return hashlib.sha256(first).digest()
+
+
+class ParsedBlock:
+    def __init__(self, offset: int, view: memoryview):
+        if len(view) < HEADER_SIZE:
+            raise ValueError(f"Truncated block header at offset {offset}")
+        self._offset = offset
+        self._view = view
+        (
+            self._version,
+            prev_block_hash,
+            merkle_root,
+            self._timestamp,
+            self._bits,
+            self._nonce,
+        ) = struct.unpack_from("<L32s32sLLL", view)
+        self._prev_block_hash = b2lx(prev_block_hash)
+        self._merkle_root = b2lx(merkle_root)
+        self._hash = hashlib.sha256(
+            hashlib.sha256(view[:HEADER_SIZE]).digest()
+        ).digest()
+
+    @property
+    def offset(self) -> int:
+        return self._offset
+
+    @property
+    def size(self) -> int:
+        return len(self._view)
+
+    @property
+    def header(self) -> memoryview:
+        return self._view[:HEADER_SIZE]
+
+    @property
+    def hash(self) -> bytes:
+        return self._hash
+
+    @property
+    def hash_hex(self) -> str:
+        return b2lx(self._hash)
+
+    @property
+    def version(self) -> int:
+        return self._version
+
+    @property
+    def prev_block_hash(self) -> str:
+        return self._prev_block_hash
+
+    @property
+    def merkle_root(self) -> str:
+        return self._merkle_root
+
+    @property
+    def timestamp(self) -> int:
+        return self._timestamp
+
+    @property
+    def bits(self) -> int:
+        return self._bits
+
+    @property
+    def nonce(self) -> int:
+        return self._nonce
+
+    @property
+    def target(self) -> bytes:
+        try:
+            return BitcoinBlock._get_target(f"0x{self._bits:08x}")
+        except (TypeError, ValueError):
+            raise ValueError("Invalid bits") from None
+
+    @property
+    def transaction_count(self) -> int:
+        count, _ = _read_compact_size(self._view, HEADER_SIZE)
+        return count
+
+    def transactions(self) -> Iterator[memoryview]:
+        for layout in self._layouts():
+            yield layout.slice(self._view)
+
+    def meets_target(self) -> bool:
+        return hash_meets_target(self._hash, int.from_bytes(self.target, "big"))
+
+    def validate(self) -> BlockValidation:
+        errors = []
+        try:
+            if not self.meets_target():
+                errors.append("hash does not meet the target of its bits")
+        except ValueError as e:
+            errors.append(str(e))
+
+        try:
+            layouts = list(self._layouts())
+        except ValueError as e:
+            errors.append(str(e))
+            return BlockValidation(self._offset, self.hash_hex, errors)
+
+        if not layouts:
+            errors.append("block has no transactions")
+            return BlockValidation(self._offset, self.hash_hex, errors)
+        if layouts[-1].end != len(self._view):
+            errors.append("block size does not match its transactions")
+
+        root = MerkleTree(layout.txid(self._view) for layout in layouts).root
+        if b2lx(root) != self._merkle_root:
+            errors.append("merkle root mismatch")
+
+        coinbase = layouts[0]
+        if coinbase.inputs != 1 or coinbase.null_prevouts != 1:
+            errors.append("first transaction is not a coinbase")
+        elif coinbase.first_script_sig_size not in COINBASE_SCRIPT_SIZES:
+            errors.append("coinbase script size out of range")
+        if any(layout.null_prevouts for layout in layouts[1:]):
+            errors.append("coinbase transaction after the first")
+        return BlockValidation(self._offset, self.hash_hex, errors)
+
+    def _layouts(self) -> Iterator[_TransactionLayout]:
+        view = self._view
+        count, offset = _read_compact_size(view, HEADER_SIZE)
+        for _ in range(count):
+            layout = _parse_transaction(view, offset)
+            offset = layout.end
+            yield layout
+
+
+class BlockReader:
+    def __init__(self, path: str):
+        self._path = path
+        self._file = open(path, "rb")
+        size = os.fstat(self._file.fileno()).st_size
+        self._mmap = (
+            mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if size else None
+        )
+        if self._mmap is not None and hasattr(mmap, "MADV_SEQUENTIAL"):
+            self._mmap.madvise(mmap.MADV_SEQUENTIAL)
+
+    def __enter__(self) -> "BlockReader":
+        return self
+
+    def __exit__(self, *_) -> None:
+        self.close()
+
+    def __iter__(self) -> Iterator[ParsedBlock]:
+        for offset, size in self.records():
+            yield self.block_at(offset, size)
+
+    @property
+    def path(self) -> str:
+        return self._path
+
+    def close(self) -> None:
+        if self._mmap is not None:
+            try:
+                self._mmap.close()
+            except BufferError:
+                pass
+            self._mmap = None
+        self._file.close()
+
+    def records(self) -> Iterator[tuple[int, int]]:
+        if self._mmap is None:
+            return
+        data = self._mmap
+        offset = 0
+        released = 0
+        while offset < len(data):
+            if offset - released >= RELEASE_INTERVAL:
+                released = self._release(released, offset)
+            if offset + RECORD_HEADER_SIZE > len(data):
+                raise ValueError(f"Truncated block record at offset {offset}")
+            if data[offset : offset + 4] != BLOCK_MAGIC:
+                raise ValueError(f"Invalid block magic at offset {offset}")
+            (size,) = struct.unpack_from("<L", data, offset + 4)
+            if offset + RECORD_HEADER_SIZE + size > len(data):
+                raise ValueError(f"Truncated block record at offset {offset}")
+            yield offset, size
+            offset += RECORD_HEADER_SIZE + size
+
+    def _release(self, start: int, end: int) -> int:
+        start -= start % mmap.PAGESIZE
+        end -= end % mmap.PAGESIZE
+        if end <= start:
+            return start
+        if hasattr(mmap, "MADV_DONTNEED") and self._mmap is not None:
+            self._mmap.madvise(mmap.MADV_DONTNEED, start, end - start)
+        return end
+
+    def block_at(self, offset: int, size: int) -> ParsedBlock:
+        if self._mmap is None:
+            raise ValueError("Block reader is closed or empty")
+        start = offset + RECORD_HEADER_SIZE
+        return ParsedBlock(offset, memoryview(self._mmap)[start : start + size])
+
+    def validate(self, processes: int = 1) -> Iterator[BlockValidation]:
+        if processes < 1:
+            raise ValueError("Number of processes must be positive")
+        if processes == 1:
+            for block in self:
+                yield block.validate()
+            return
+
+        with multiprocessing.Pool(
+            processes, initializer=_init_worker, initargs=(self._path,)
+        ) as pool:
+            yield from pool.imap(
+                _validate_worker, self.records(), VALIDATION_CHUNK_SIZE
+            )
+
+
+def _init_worker(path: str) -> None:
+    global _worker_reader
+    _worker_reader = BlockReader(path)
+
+
+def _validate_worker(record: tuple[int, int]) -> BlockValidation:
+    offset, size = record
+    validation = _worker_reader.block_at(offset, size).validate()
+    _worker_reader._release(offset, offset + RECORD_HEADER_SIZE + size)
+    return validation
+
+
+def _read_compact_size(view: memoryview, offset: int) -> tuple[int, int]:
+    if offset >= len(view):
+        raise ValueError("Truncated compact size")
+    first = view[offset]
+    if first < 0xFD:
+        return first, offset + 1
+    size = {0xFD: 2, 0xFE: 4, 0xFF: 8}[first]
+    end = offset + 1 + size
+    if end > len(view):
+        raise ValueError("Truncated compact size")
+    return int.from_bytes(view[offset + 1 : end], "little"), end
+
+
+def _skip(view: memoryview, offset: int, size: int) -> int:
+    if offset + size > len(view):
+        raise ValueError("Truncated transaction")
+    return offset + size
+
+
+def _parse_transaction(view: memoryview, start: int) -> _TransactionLayout:
+    offset = _skip(view, start, 4)
+    segwit = offset + 1 < len(view) and view[offset] == 0 and view[offset + 1] == 1
+    if segwit:
+        offset += 2
+
+    inputs, offset = _read_compact_size(view, offset)
+    null_prevouts = 0
+    first_script_sig_size = 0
+    for i in range(inputs):
+        prevout_end = _skip(view, offset, OUTPOINT_SIZE)
+        if view[offset:prevout_end] == NULL_PREVOUT:
+            null_prevouts += 1
+        script_size, offset = _read_compact_size(view, prevout_end)
+        if i == 0:
+            first_script_sig_size = script_size
+        offset = _skip(view, offset, script_size + 4)
+
+    outputs, offset = _read_compact_size(view, offset)
+    for _ in range(outputs):
+        script_size, offset = _read_compact_size(view, _skip(view, offset, 8))
+        offset = _skip(view, offset, script_size)
+
+    witness = None
+    if segwit:
+        witness_start = offset
+        for _ in range(inputs):
+            items, offset = _read_compact_size(view, offset)
+            for _ in range(items):
+                item_size, offset = _read_compact_size(view, offset)
+                offset = _skip(view, offset, item_size)
+        witness = (witness_start, offset)
+
+    end = _skip(view, offset, 4)
+    return _TransactionLayout(
+        start, end, witness, inputs, null_prevouts, first_script_sig_size
+    )
+
+
+def main():
+    path = sys.argv[1]
+    blocks = 0
+    failures = 0
+    with BlockReader(path) as reader:
+        for validation in reader.validate(PROCESSES):
+            blocks += 1
+            if not validation.passed:
+                failures += 1
+                print(validation)
+    print(f"Blocks:   {blocks}")
+    print(f"Failures: {failures}")
+
+
+if __name__ == "__main__":
+    main()
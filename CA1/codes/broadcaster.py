@@ -0,0 +1,227 @@
+import asyncio
+import concurrent.futures
+import random
+from typing import Iterable
+
+import requests
+import requests.adapters
+from bitcoin.core import Hash, b2lx, b2x
+
+TRANSACTION_BROADCAST_URL = "https://api.blockcypher.com/v1/btc/test3/txs/push"
+CONCURRENCY = 8
+RETRIES = 4
+BACKOFF = 0.5
+MAX_BACKOFF = 30.0
+TIMEOUT = 15.0
+RETRY_STATUS_CODES = frozenset([429, 500, 502, 503, 504])
+
+
+class BroadcastResult:
+    def __init__(
+        self,
+        txid: str,
+        response: requests.Response | None = None,
+        error: Exception | None = None,
+        attempts: int = 0,
+        duplicate: bool = False,
+    ):
+        self._txid = txid
+        self._response = response
+        self._error = error
+        self._attempts = attempts
+        self._duplicate = duplicate
+
+    def __str__(self):
+        if self._error is not None:
+            status = f"error: {self._error}"
+        else:
+            status = f"[{self.status_code}] {self._response.reason}"
+        duplicate = " (duplicate)" if self._duplicate else ""
+        return f"{self._txid}: {status} after {self._attempts} attempt(s){duplicate}"
+
+    @property
+    def txid(self) -> str:
+        return self._txid
+
+    @property
+    def response(self) -> requests.Response | None:
+        return self._response
+
+    @property
+    def error(self) -> Exception | None:
+        return self._error
+
+    @property
+    def status_code(self) -> int | None:
+        return None if self._response is None else self._response.status_code
+
+    @property
+    def attempts(self) -> int:
+        return self._attempts
+
+    @property
+    def duplicate(self) -> bool:
+        return self._duplicate
+
+    @property
+    def accepted(self) -> bool:
+        return self._response is not None and self._response.ok
+
+    def as_duplicate(self) -> "BroadcastResult":
+        return BroadcastResult(
+            self._txid, self._response, self._error, self._attempts, duplicate=True
+        )
+
+
+class Broadcaster:
+    def __init__(
+        self,
+        url: str = TRANSACTION_BROADCAST_URL,
+        concurrency: int = CONCURRENCY,
+        retries: int = RETRIES,
+        backoff: float = BACKOFF,
+        max_backoff: float = MAX_BACKOFF,
+        timeout: float = TIMEOUT,
+    ):
+        if concurrency < 1:
+            raise ValueError("Concurrency must be positive")
+        if retries < 0:
+            raise ValueError("Number of retries must not be negative")
+        self._url = url
+        self._concurrency = concurrency
+        self._retries = retries
+        self._backoff = backoff
+        self._max_backoff = max_backoff
+        self._timeout = timeout
+        self._accepted: dict[str, BroadcastResult] = {}
+        self._session: requests.Session | None = None
+        self._executor: concurrent.futures.ThreadPoolExecutor | None = None
+
+    def __enter__(self) -> "Broadcaster":
+        return self
+
+    def __exit__(self, *_) -> None:
+        self.close()
+
+    @property
+    def url(self) -> str:
+        return self._url
+
+    @property
+    def concurrency(self) -> int:
+        return self._concurrency
+
+    def close(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+        if self._session is not None:
+            self._session.close()
+            self._session = None
+
+    def broadcast(self, raw_transaction: bytes) -> BroadcastResult:
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return asyncio.run(self.broadcast_async(raw_transaction))
+        raise RuntimeError(
+            "Broadcaster.broadcast cannot run inside an event loop,"
+            " await broadcast_async instead"
+        )
+
+    async def broadcast_async(self, raw_transaction: bytes) -> BroadcastResult:
+        return (await self.broadcast_many([raw_transaction]))[0]
+
+    async def broadcast_many(
+        self, raw_transactions: Iterable[bytes]
+    ) -> list[BroadcastResult]:
+        semaphore = asyncio.Semaphore(self._concurrency)
+        pending: dict[str, asyncio.Task] = {}
+        txids = []
+        for raw_transaction in raw_transactions:
+            txid = b2lx(Hash(raw_transaction))
+            txids.append(txid)
+            if txid not in pending and txid not in self._accepted:
+                pending[txid] = asyncio.create_task(
+                    self._broadcast_limited(semaphore, txid, raw_transaction)
+                )
+
+        results = []
+        broadcast = set()
+        for txid in txids:
+            if txid in pending:
+                result = await pending[txid]
+                if txid in broadcast:
+                    result = result.as_duplicate()
+                broadcast.add(txid)
+            else:
+                result = self._accepted[txid].as_duplicate()
+            results.append(result)
+        return results
+
+    async def _broadcast_limited(
+        self, semaphore: asyncio.Semaphore, txid: str, raw_transaction: bytes
+    ) -> BroadcastResult:
+        async with semaphore:
+            result = await self._broadcast_with_retries(txid, raw_transaction)
+        if result.accepted:
+            self._accepted[txid] = result
+        return result
+
+    async def _broadcast_with_retries(
+        self, txid: str, raw_transaction: bytes
+    ) -> BroadcastResult:
+        loop = asyncio.get_running_loop()
+        executor = self._get_executor()
+        session = self._get_session()
+        response = None
+        error = None
+        for attempt in range(self._retries + 1):
+            if attempt:
+                await asyncio.sleep(self._get_delay(attempt, response))
+            try:
+                response = await loop.run_in_executor(
+                    executor, self._post, session, raw_transaction
+                )
+                error = None
+            except requests.RequestException as e:
+                response = None
+                error = e
+                continue
+            if response.status_code not in RETRY_STATUS_CODES:
+                break
+        return BroadcastResult(txid, response, error, attempt + 1)
+
+    def _get_delay(self, attempt: int, response: requests.Response | None) -> float:
+        if response is not None:
+            retry_after = response.headers.get("Retry-After", "")
+            if retry_after.isdigit():
+                return min(float(retry_after), self._max_backoff)
+        delay = min(self._backoff * 2 ** (attempt - 1), self._max_backoff)
+        return random.uniform(delay / 2, delay)
+
+    def _post(
+        self, session: requests.Session, raw_transaction: bytes
+    ) -> requests.Response:
+        headers = {"content-type": "application/x-www-form-urlencoded"}
+        return session.post(
+            self._url,
+            headers=headers,
+            data='{"tx": "%s"}' % b2x(raw_transaction),
+            timeout=self._timeout,
+        )
+
+    def _get_session(self) -> requests.Session:
+        if self._session is None:
+            adapter = requests.adapters.HTTPAdapter(
+                pool_connections=1, pool_maxsize=self._concurrency
+            )
+            self._session = requests.Session()
+            self._session.mount("http://", adapter)
+            self._session.mount("https://", adapter)
+        return self._session
+
+    def _get_executor(self) -> concurrent.futures.ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = concurrent.futures.ThreadPoolExecutor(self._concurrency)
+        return self._executor
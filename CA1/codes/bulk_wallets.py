@@ -0,0 +1,198 @@
+import csv
+import enum
+import itertools
+import json
+import multiprocessing
+import sys
+import time
+from typing import BinaryIO, Iterator, TextIO
+
+import base58check
+from key_walk import BATCH_SIZE, RandomKeyGenerator
+from part1_q1 import Wallet
+
+BINARY_MAGIC = b"WLT1"
+PRIVATE_KEY_SIZE = 32
+PUBLIC_KEY_SIZE = 65
+RECORD_SIZE = PRIVATE_KEY_SIZE + PUBLIC_KEY_SIZE
+PROCESSES = multiprocessing.cpu_count()
+
+
+class WalletRecord:
+    def __init__(self, private_key: bytes, wif: str, public_key: bytes, address: str):
+        self._private_key = private_key
+        self._wif = wif
+        self._public_key = public_key
+        self._address = address
+
+    @property
+    def private_key(self) -> bytes:
+        return self._private_key
+
+    @property
+    def wif(self) -> str:
+        return self._wif
+
+    @property
+    def public_key(self) -> bytes:
+        return self._public_key
+
+    @property
+    def address(self) -> str:
+        return self._address
+
+    def to_dict(self) -> dict[str, str]:
+        return {
+            "address": self._address,
+            "wif": self._wif,
+            "private_key": self._private_key.hex(),
+            "public_key": self._public_key.hex(),
+        }
+
+
+class BulkWalletGenerator:
+    class Format(enum.Enum):
+        CSV = "csv"
+        JSONL = "jsonl"
+        BINARY = "bin"
+
+    def __init__(
+        self,
+        network: Wallet.Network = Wallet.Network.TESTNET,
+        processes: int = 1,
+        batch_size: int = BATCH_SIZE,
+    ):
+        if processes < 1:
+            raise ValueError("Number of processes must be positive")
+        self._network = network
+        self._processes = processes
+        self._batch_size = batch_size
+        self._number_of_keys = 0
+        self._elapsed_time = 0.0
+
+    @property
+    def network(self) -> Wallet.Network:
+        return self._network
+
+    @property
+    def number_of_keys(self) -> int:
+        return self._number_of_keys
+
+    @property
+    def elapsed_time(self) -> float:
+        return self._elapsed_time
+
+    @property
+    def keys_per_second(self) -> float:
+        if self._elapsed_time == 0:
+            return 0.0
+        return self._number_of_keys / self._elapsed_time
+
+    @classmethod
+    def format_of(cls, path: str) -> Format:
+        for format in cls.Format:
+            if path.endswith(f".{format.value}"):
+                return format
+        raise ValueError(f"Unknown wallet file format: {path}")
+
+    def generate(self, count: int) -> Iterator[WalletRecord]:
+        wallet = Wallet(self._network)
+        start = time.time() - self._elapsed_time
+        if self._processes == 1:
+            batches = _generate_batches(self._batch_size, count)
+        else:
+            batches = self._generate_parallel(count)
+        try:
+            for batch in batches:
+                for record in _to_records(wallet, batch):
+                    self._number_of_keys += 1
+                    yield record
+                self._elapsed_time = time.time() - start
+        finally:
+            self._elapsed_time = time.time() - start
+
+    def write(self, count: int, file: TextIO | BinaryIO, format: Format) -> None:
+        records = self.generate(count)
+        if format == self.Format.CSV:
+            writer = csv.DictWriter(
+                file, ["address", "wif", "private_key", "public_key"]
+            )
+            writer.writeheader()
+            writer.writerows(record.to_dict() for record in records)
+        elif format == self.Format.JSONL:
+            for record in records:
+                file.write(json.dumps(record.to_dict()) + "\n")
+        else:
+            file.write(BINARY_MAGIC + bytes([self._network.value]))
+            for record in records:
+                file.write(record.private_key + record.public_key)
+
+    def _generate_parallel(self, count: int) -> Iterator[list[tuple[bytes, bytes]]]:
+        sizes = [self._batch_size] * (count // self._batch_size)
+        if count % self._batch_size:
+            sizes.append(count % self._batch_size)
+        with multiprocessing.Pool(self._processes) as pool:
+            yield from pool.imap_unordered(_generate_batch, sizes)
+
+
+def read_binary_wallets(file: BinaryIO) -> Iterator[WalletRecord]:
+    header = file.read(len(BINARY_MAGIC) + 1)
+    if header[: len(BINARY_MAGIC)] != BINARY_MAGIC:
+        raise ValueError("Not a binary wallet file")
+    wallet = Wallet(Wallet.Network(header[-1]))
+    while data := file.read(RECORD_SIZE * BATCH_SIZE):
+        if len(data) % RECORD_SIZE:
+            raise ValueError("Truncated binary wallet file")
+        batch = [
+            (
+                data[i : i + PRIVATE_KEY_SIZE],
+                data[i + PRIVATE_KEY_SIZE : i + RECORD_SIZE],
+            )
+            for i in range(0, len(data), RECORD_SIZE)
+        ]
+        yield from _to_records(wallet, batch)
+
+
+def _generate_batches(
+    batch_size: int, count: int
+) -> Iterator[list[tuple[bytes, bytes]]]:
+    keys = iter(RandomKeyGenerator(batch_size))
+    while count > 0:
+        size = min(batch_size, count)
+        yield list(itertools.islice(keys, size))
+        count -= size
+
+
+def _generate_batch(size: int) -> list[tuple[bytes, bytes]]:
+    return list(itertools.islice(RandomKeyGenerator(size), size))
+
+
+def _to_records(wallet: Wallet, batch: list[tuple[bytes, bytes]]) -> list[WalletRecord]:
+    private_byte = wallet._get_network_byte()
+    public_byte = wallet._get_network_byte(is_private=False)
+    hashes = []
+    for _, public_key in batch:
+        wallet._public_key = public_key
+        hashes.append(public_byte + wallet._get_public_key_hash())
+    wifs = base58check.encode_many(private_byte + key for key, _ in batch)
+    addresses = base58check.encode_many(hashes)
+    return [
+        WalletRecord(private_key, wif, public_key, address)
+        for (private_key, public_key), wif, address in zip(batch, wifs, addresses)
+    ]
+
+
+def main():
+    count = int(sys.argv[1])
+    path = sys.argv[2]
+    generator = BulkWalletGenerator(Wallet.Network.TESTNET, processes=PROCESSES)
+    format = generator.format_of(path)
+    mode = "wb" if format == BulkWalletGenerator.Format.BINARY else "w"
+    with open(path, mode, newline="" if mode == "w" else None) as file:
+        generator.write(count, file, format)
+    print(f"Number of keys:    {generator.number_of_keys}")
+    print(f"Keys per second:   {generator.keys_per_second:.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,269 @@
+import enum
+
+from transaction import Transaction
+from utxo_store import StoredUtxo, UtxoStore
+
+TX_OVERHEAD_SIZE = 8
+OUTPOINT_AND_SEQUENCE_SIZE = 40
+SIGNATURE_PUSH_SIZE = 74
+P2PKH_OUTPUT_SIZE = 34
+FEE_RATE = 1
+DUST_LIMIT = 546
+BNB_CANDIDATES = 64
+BNB_TRIES = 5_000
+
+
+def p2pkh_input_size(public_key_size: int) -> int:
+    return OUTPOINT_AND_SEQUENCE_SIZE + 1 + SIGNATURE_PUSH_SIZE + 1 + public_key_size
+
+
+P2PKH_INPUT_SIZE = p2pkh_input_size(65)
+
+
+def _var_int_size(value: int) -> int:
+    if value < 0xFD:
+        return 1
+    if value <= 0xFFFF:
+        return 3
+    if value <= 0xFFFFFFFF:
+        return 5
+    return 9
+
+
+class CoinSelection:
+    class Algorithm(enum.Enum):
+        SINGLE = "single"
+        BRANCH_AND_BOUND = "branch_and_bound"
+        LARGEST_FIRST = "largest_first"
+
+    def __init__(
+        self,
+        utxos: list[StoredUtxo],
+        target: int,
+        fee: int,
+        change: int,
+        algorithm: Algorithm,
+    ):
+        self._utxos = utxos
+        self._target = target
+        self._fee = fee
+        self._change = change
+        self._algorithm = algorithm
+
+    def __str__(self):
+        return (
+            f"{self._algorithm.value}: {len(self._utxos)} input(s), "
+            f"{self.total} sat in, {self._fee} sat fee, {self._change} sat change"
+        )
+
+    @property
+    def utxos(self) -> list[StoredUtxo]:
+        return self._utxos
+
+    @property
+    def total(self) -> int:
+        return sum(utxo.amount for utxo in self._utxos)
+
+    @property
+    def target(self) -> int:
+        return self._target
+
+    @property
+    def fee(self) -> int:
+        return self._fee
+
+    @property
+    def change(self) -> int:
+        return self._change
+
+    @property
+    def algorithm(self) -> Algorithm:
+        return self._algorithm
+
+
+class CoinSelector:
+    def __init__(
+        self,
+        store: UtxoStore,
+        fee_rate: int = FEE_RATE,
+        change_size: int = P2PKH_OUTPUT_SIZE,
+        candidates: int = BNB_CANDIDATES,
+        max_tries: int = BNB_TRIES,
+    ):
+        self._store = store
+        self._fee_rate = fee_rate
+        self._change_size = change_size
+        self._candidates = candidates
+        self._max_tries = max_tries
+
+    @property
+    def store(self) -> UtxoStore:
+        return self._store
+
+    def fund(self, tx: Transaction) -> CoinSelection:
+        tx.set_change(0)
+        txouts = [destination.TxOut for destination in tx.destinations]
+        selection = self.select(
+            tx.address,
+            sum(txout.nValue for txout in txouts),
+            len(txouts),
+            sum(len(txout.serialize()) for txout in txouts),
+            p2pkh_input_size(len(tx.public_key)),
+        )
+        tx.set_inputs(selection.utxos, self._store)
+        tx.set_change(selection.change)
+        return selection
+
+    def select(
+        self,
+        address: str,
+        target: int,
+        outputs: int,
+        outputs_size: int,
+        input_size: int = P2PKH_INPUT_SIZE,
+    ) -> CoinSelection:
+        input_fee = input_size * self._fee_rate
+        change_fee = self._change_size * self._fee_rate
+        cost_of_change = change_fee + max(DUST_LIMIT, input_fee)
+        base_fee = self._base_size(0, 0, outputs, outputs_size) * self._fee_rate
+        changeless_target = target + base_fee
+
+        single = self._store.smallest_at_least(address, changeless_target + input_fee)
+        if (
+            single is not None
+            and single.amount - input_fee <= changeless_target + cost_of_change
+        ):
+            return self._finish(
+                [single],
+                target,
+                outputs,
+                outputs_size,
+                input_size,
+                CoinSelection.Algorithm.SINGLE,
+            )
+
+        candidates = self._store.sample(
+            address,
+            self._candidates,
+            below=changeless_target + cost_of_change + input_fee + 1,
+            above=input_fee,
+        )
+        selected = self._branch_and_bound(
+            [utxo.amount - input_fee for utxo in candidates],
+            changeless_target,
+            cost_of_change,
+        )
+        if selected is not None:
+            utxos = [candidates[i] for i in selected]
+            return self._finish(
+                utxos,
+                target,
+                outputs,
+                outputs_size,
+                input_size,
+                CoinSelection.Algorithm.BRANCH_AND_BOUND,
+            )
+
+        if single is not None:
+            return self._finish(
+                [single],
+                target,
+                outputs,
+                outputs_size,
+                input_size,
+                CoinSelection.Algorithm.SINGLE,
+            )
+        return self._largest_first(address, target, outputs, outputs_size, input_size)
+
+    def _largest_first(
+        self,
+        address: str,
+        target: int,
+        outputs: int,
+        outputs_size: int,
+        input_size: int,
+    ) -> CoinSelection:
+        utxos = []
+        total = 0
+        for utxo in self._store.largest_first(
+            address, above=input_size * self._fee_rate
+        ):
+            utxos.append(utxo)
+            total += utxo.amount
+            size = self._base_size(len(utxos), input_size, outputs + 1, outputs_size)
+            if total >= target + (size + self._change_size) * self._fee_rate:
+                return self._finish(
+                    utxos,
+                    target,
+                    outputs,
+                    outputs_size,
+                    input_size,
+                    CoinSelection.Algorithm.LARGEST_FIRST,
+                )
+        raise ValueError("Insufficient funds")
+
+    def _branch_and_bound(
+        self, values: list[int], target: int, tolerance: int
+    ) -> list[int] | None:
+        count = len(values)
+        remaining = [0] * (count + 1)
+        for i in range(count - 1, -1, -1):
+            remaining[i] = remaining[i + 1] + values[i]
+
+        best: list[int] | None = None
+        best_excess = tolerance + 1
+        selection: list[int] = []
+        tries = 0
+
+        def search(i: int, total: int) -> None:
+            nonlocal best, best_excess, tries
+            tries += 1
+            if tries > self._max_tries or best_excess == 0:
+                return
+            if total >= target:
+                excess = total - target
+                if excess < best_excess or (
+                    excess == best_excess and len(selection) < len(best)
+                ):
+                    best, best_excess = list(selection), excess
+                return
+            if i == count or total + remaining[i] < target:
+                return
+            if total + values[i] <= target + tolerance:
+                selection.append(i)
+                search(i + 1, total + values[i])
+                selection.pop()
+            j = i + 1
+            while j < count and values[j] == values[i]:
+                j += 1
+            search(j, total)
+
+        search(0, 0)
+        return best
+
+    def _finish(
+        self,
+        utxos: list[StoredUtxo],
+        target: int,
+        outputs: int,
+        outputs_size: int,
+        input_size: int,
+        algorithm: CoinSelection.Algorithm,
+    ) -> CoinSelection:
+        total = sum(utxo.amount for utxo in utxos)
+        size = self._base_size(len(utxos), input_size, outputs + 1, outputs_size)
+        change = total - target - (size + self._change_size) * self._fee_rate
+        if change < DUST_LIMIT:
+            return CoinSelection(utxos, target, total - target, 0, algorithm)
+        return CoinSelection(utxos, target, total - target - change, change, algorithm)
+
+    def _base_size(
+        self, inputs: int, input_size: int, outputs: int, outputs_size: int
+    ) -> int:
+        return (
+            TX_OVERHEAD_SIZE
+            + _var_int_size(inputs)
+            + inputs * input_size
+            + _var_int_size(outputs)
+            + outputs_size
+        )
@@ -0,0 +1,379 @@
+import hashlib
+import mmap
+import os
+import struct
+from typing import Iterable, Iterator
+
+from bitcoin.core import b2lx, lx
+
+HEADER_SIZE = 80
+HASH_SIZE = 32
+CHAINWORK_SIZE = 32
+CHAINWORK_OFFSET = HEADER_SIZE + HASH_SIZE
+HEIGHT_OFFSET = CHAINWORK_OFFSET + CHAINWORK_SIZE
+RECORD_SIZE = HEIGHT_OFFSET + 4
+RETARGET_INTERVAL = 2016
+TARGET_SPACING = 10 * 60
+TARGET_TIMESPAN = RETARGET_INTERVAL * TARGET_SPACING
+MAX_ADJUSTMENT = 4
+POW_LIMIT_BITS = 0x1F010000
+INDEX_SUFFIX = ".idx"
+INDEX_MAGIC = b"HIX1"
+INDEX_HEADER = struct.Struct("<4sLLL")
+INDEX_SLOT = struct.Struct("<LQ")
+MIN_INDEX_CAPACITY = 1024
+RECORD_KEYS = struct.Struct(f"<{HEADER_SIZE}xQ{RECORD_SIZE - HEADER_SIZE - 8}x")
+RECORD_CHAINWORKS = struct.Struct(f"<{CHAINWORK_OFFSET}x{CHAINWORK_SIZE}s4x")
+
+
+def bits_to_target(bits: int) -> int:
+    exponent, coefficient = bits >> 24, bits & 0x007FFFFF
+    if exponent <= 3:
+        return coefficient >> (8 * (3 - exponent))
+    return coefficient << (8 * (exponent - 3))
+
+
+def target_to_bits(target: int) -> int:
+    size = (target.bit_length() + 7) // 8
+    if size <= 3:
+        coefficient = target << (8 * (3 - size))
+    else:
+        coefficient = target >> (8 * (size - 3))
+    if coefficient & 0x00800000:
+        coefficient >>= 8
+        size += 1
+    return size << 24 | coefficient
+
+
+def header_work(bits: int) -> int:
+    return 2**256 // (bits_to_target(bits) + 1)
+
+
+def hash_meets_target(hash_value: bytes, target: int) -> bool:
+    return int.from_bytes(hash_value, "little") <= target
+
+
+class HeaderEntry:
+    def __init__(self, record: bytes):
+        self._record = record
+        self._header = record[:HEADER_SIZE]
+        self._hash = record[HEADER_SIZE : HEADER_SIZE + HASH_SIZE]
+        self._chainwork = int.from_bytes(record[CHAINWORK_OFFSET:HEIGHT_OFFSET], "big")
+        (self._height,) = struct.unpack_from("<L", record, HEIGHT_OFFSET)
+
+    def __repr__(self):
+        return f"HeaderEntry({self._height}, {self.hash_hex})"
+
+    @property
+    def record(self) -> bytes:
+        return self._record
+
+    @property
+    def header(self) -> bytes:
+        return self._header
+
+    @property
+    def hash(self) -> bytes:
+        return self._hash
+
+    @property
+    def hash_hex(self) -> str:
+        return b2lx(self._hash)
+
+    @property
+    def prev_hash(self) -> bytes:
+        return self._header[4:36]
+
+    @property
+    def prev_hash_hex(self) -> str:
+        return b2lx(self.prev_hash)
+
+    @property
+    def timestamp(self) -> int:
+        return struct.unpack_from("<L", self._header, 68)[0]
+
+    @property
+    def bits(self) -> int:
+        return struct.unpack_from("<L", self._header, 72)[0]
+
+    @property
+    def height(self) -> int:
+        return self._height
+
+    @property
+    def chainwork(self) -> int:
+        return self._chainwork
+
+
+def _key(block_hash: bytes) -> int:
+    return int.from_bytes(block_hash[:8], "little")
+
+
+def _slot_offset(slot: int) -> int:
+    return INDEX_HEADER.size + slot * INDEX_SLOT.size
+
+
+class _HeaderIndex:
+    def __init__(self, path: str):
+        self._path = path
+        open(path, "ab").close()
+        self._file = open(path, "r+b")
+        self._map: mmap.mmap | None = None
+        self._capacity = 0
+        self._count = 0
+        self._tip = 0
+        size = os.fstat(self._file.fileno()).st_size
+        if size >= INDEX_HEADER.size:
+            self._map = mmap.mmap(self._file.fileno(), 0)
+            magic, capacity, self._count, self._tip = INDEX_HEADER.unpack_from(
+                self._map
+            )
+            if magic == INDEX_MAGIC and capacity and size == _slot_offset(capacity):
+                self._capacity = capacity
+            else:
+                self._count = self._tip = 0
+
+    @property
+    def count(self) -> int:
+        return self._count
+
+    @property
+    def tip(self) -> int | None:
+        return self._tip - 1 if self._tip else None
+
+    def close(self) -> None:
+        if self._map is not None:
+            self._map.close()
+        self._file.close()
+
+    def positions(self, key: int) -> Iterator[int]:
+        if not self._capacity:
+            return
+        mask = self._capacity - 1
+        slot = key & mask
+        while True:
+            position, slot_key = INDEX_SLOT.unpack_from(self._map, _slot_offset(slot))
+            if not position:
+                return
+            if slot_key == key:
+                yield position - 1
+            slot = (slot + 1) & mask
+
+    def add(self, key: int, position: int) -> None:
+        if (self._count + 1) * 2 > self._capacity:
+            self._resize(max(MIN_INDEX_CAPACITY, self._capacity * 2))
+        self._insert(self._map, self._capacity, key, position)
+        self._count += 1
+
+    def set_tip(self, position: int) -> None:
+        self._tip = position + 1
+
+    def flush(self) -> None:
+        if self._map is not None:
+            INDEX_HEADER.pack_into(
+                self._map, 0, INDEX_MAGIC, self._capacity, self._count, self._tip
+            )
+            self._map.flush()
+
+    def rebuild(self, keys: list[int], tip: int | None) -> None:
+        capacity = MIN_INDEX_CAPACITY
+        while len(keys) * 2 > capacity:
+            capacity *= 2
+        slots = bytearray(_slot_offset(capacity))
+        for position, key in enumerate(keys):
+            self._insert(slots, capacity, key, position)
+        self._count = len(keys)
+        self._tip = 0 if tip is None else tip + 1
+        self._write(slots, capacity)
+
+    def _resize(self, capacity: int) -> None:
+        slots = bytearray(_slot_offset(capacity))
+        if self._capacity:
+            for position, key in INDEX_SLOT.iter_unpack(self._map[INDEX_HEADER.size :]):
+                if position:
+                    self._insert(slots, capacity, key, position - 1)
+        self._write(slots, capacity)
+
+    def _write(self, slots: bytearray, capacity: int) -> None:
+        INDEX_HEADER.pack_into(slots, 0, INDEX_MAGIC, capacity, self._count, self._tip)
+        if self._map is not None:
+            self._map.close()
+        self._file.seek(0)
+        self._file.truncate()
+        self._file.write(slots)
+        self._file.flush()
+        self._map = mmap.mmap(self._file.fileno(), 0)
+        self._capacity = capacity
+
+    @staticmethod
+    def _insert(
+        slots: bytearray | mmap.mmap, capacity: int, key: int, position: int
+    ) -> None:
+        mask = capacity - 1
+        slot = key & mask
+        while slots[_slot_offset(slot) : _slot_offset(slot) + 4] != bytes(4):
+            slot = (slot + 1) & mask
+        INDEX_SLOT.pack_into(slots, _slot_offset(slot), position + 1, key)
+
+
+class HeaderStore:
+    def __init__(self, path: str, pow_limit_bits: int = POW_LIMIT_BITS):
+        self._path = path
+        self._pow_limit = bits_to_target(pow_limit_bits)
+        self._file = open(path, "a+b")
+        self._index = _HeaderIndex(path + INDEX_SUFFIX)
+        self._tip: HeaderEntry | None = None
+        self._load()
+
+    def __enter__(self) -> "HeaderStore":
+        return self
+
+    def __exit__(self, *_) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        return self._index.count
+
+    def __contains__(self, block_hash: str) -> bool:
+        return self.get(block_hash) is not None
+
+    @property
+    def path(self) -> str:
+        return self._path
+
+    @property
+    def tip(self) -> HeaderEntry | None:
+        return self._tip
+
+    def close(self) -> None:
+        self._index.close()
+        self._file.close()
+
+    def get(self, block_hash: str) -> HeaderEntry | None:
+        return self._get(lx(block_hash))
+
+    def next_bits(self, prev_block_hash: str | None = None) -> str:
+        parent = self._tip if prev_block_hash is None else self.get(prev_block_hash)
+        if parent is None:
+            return f"0x{target_to_bits(self._pow_limit):08x}"
+        return f"0x{self._next_bits(parent):08x}"
+
+    def add(self, header: bytes) -> HeaderEntry:
+        return self.add_many([header])[-1]
+
+    def add_many(self, headers: Iterable[bytes]) -> list[HeaderEntry]:
+        entries = []
+        records = []
+        pending: dict[bytes, HeaderEntry] = {}
+        try:
+            for header in headers:
+                entry = self._entry(header, pending)
+                entries.append(entry)
+                if entry.hash not in pending and self._get(entry.hash) is None:
+                    pending[entry.hash] = entry
+                    records.append(entry.record)
+        finally:
+            self._commit(pending, records)
+        return entries
+
+    def ancestors(self, entry: HeaderEntry) -> Iterator[HeaderEntry]:
+        current: HeaderEntry | None = entry
+        while current is not None:
+            yield current
+            current = self._get(current.prev_hash) if current.height else None
+
+    def _entry(self, header: bytes, pending: dict[bytes, HeaderEntry]) -> HeaderEntry:
+        if len(header) != HEADER_SIZE:
+            raise ValueError("Block header must be 80 bytes")
+        block_hash = hashlib.sha256(hashlib.sha256(header).digest()).digest()
+        existing = self._lookup(block_hash, pending)
+        if existing is not None:
+            return existing
+
+        bits = struct.unpack_from("<L", header, 72)[0]
+        target = bits_to_target(bits)
+        if target > self._pow_limit:
+            raise ValueError("Header target exceeds the proof-of-work limit")
+        if not hash_meets_target(block_hash, target):
+            raise ValueError("Header hash does not meet its target")
+
+        prev_hash = header[4:36]
+        parent = self._lookup(prev_hash, pending)
+        if parent is None:
+            if self._index.count or pending:
+                raise ValueError(f"Unknown previous block {b2lx(prev_hash)}")
+            height, chainwork = 0, 0
+        else:
+            if bits != self._next_bits(parent, pending):
+                raise ValueError(f"Unexpected bits 0x{bits:08x}")
+            height, chainwork = parent.height + 1, parent.chainwork
+
+        return HeaderEntry(
+            header
+            + block_hash
+            + (chainwork + header_work(bits)).to_bytes(CHAINWORK_SIZE, "big")
+            + struct.pack("<L", height)
+        )
+
+    def _commit(self, pending: dict[bytes, HeaderEntry], records: list[bytes]) -> None:
+        if not records:
+            return
+        self._file.seek(0, os.SEEK_END)
+        first = self._file.tell() // RECORD_SIZE
+        self._file.write(b"".join(records))
+        self._file.flush()
+        for position, entry in enumerate(pending.values(), first):
+            self._index.add(_key(entry.hash), position)
+            if self._tip is None or entry.chainwork > self._tip.chainwork:
+                self._tip = entry
+                self._index.set_tip(position)
+        self._index.flush()
+
+    def _next_bits(
+        self, parent: HeaderEntry, pending: dict[bytes, HeaderEntry] | None = None
+    ) -> int:
+        if (parent.height + 1) % RETARGET_INTERVAL != 0:
+            return parent.bits
+
+        first = parent
+        for _ in range(RETARGET_INTERVAL - 1):
+            first = self._lookup(first.prev_hash, pending)
+        timespan = parent.timestamp - first.timestamp
+        timespan = max(TARGET_TIMESPAN // MAX_ADJUSTMENT, timespan)
+        timespan = min(TARGET_TIMESPAN * MAX_ADJUSTMENT, timespan)
+        target = bits_to_target(parent.bits) * timespan // TARGET_TIMESPAN
+        return target_to_bits(min(target, self._pow_limit))
+
+    def _lookup(
+        self, block_hash: bytes, pending: dict[bytes, HeaderEntry] | None
+    ) -> HeaderEntry | None:
+        if pending and block_hash in pending:
+            return pending[block_hash]
+        return self._get(block_hash)
+
+    def _get(self, block_hash: bytes) -> HeaderEntry | None:
+        for position in self._index.positions(_key(block_hash)):
+            entry = self._read(position)
+            if entry.hash == block_hash:
+                return entry
+        return None
+
+    def _read(self, position: int) -> HeaderEntry:
+        return HeaderEntry(
+            os.pread(self._file.fileno(), RECORD_SIZE, position * RECORD_SIZE)
+        )
+
+    def _load(self) -> None:
+        size = os.fstat(self._file.fileno()).st_size
+        count = size // RECORD_SIZE
+        if size != count * RECORD_SIZE:
+            raise ValueError("Header store has a truncated record")
+        if self._index.count != count or (count and self._index.tip is None):
+            self._file.seek(0)
+            data = self._file.read()
+            chainworks = [work for (work,) in RECORD_CHAINWORKS.iter_unpack(data)]
+            tip = chainworks.index(max(chainworks)) if chainworks else None
+            self._index.rebuild([key for (key,) in RECORD_KEYS.iter_unpack(data)], tip)
+            self._index.flush()
+        if self._index.tip is not None:
+            self._tip = self._read(self._index.tip)
@@ -0,0 +1,179 @@
+import secrets
+from typing import Iterator
+
+import ecdsa
+
+from part1_q1 import Wallet
+
+BATCH_SIZE = 256
+WINDOW_SIZE = 256
+WINDOWS = 32
+
+CURVE_P = ecdsa.SECP256k1.curve.p()
+CURVE_ORDER = ecdsa.SECP256k1.order
+GENERATOR = ecdsa.SECP256k1.generator
+
+
+def _multiply_generator(scalar: int) -> tuple[int, int]:
+    point = GENERATOR * scalar
+    return point.x(), point.y()
+
+
+def _batch_inverse(values: list[int]) -> list[int]:
+    prefix_products = []
+    product = 1
+    for value in values:
+        product = product * value % CURVE_P
+        prefix_products.append(product)
+
+    inverse = pow(product, -1, CURVE_P)
+    inverses = [0] * len(values)
+    for i in range(len(values) - 1, 0, -1):
+        inverses[i] = inverse * prefix_products[i - 1] % CURVE_P
+        inverse = inverse * values[i] % CURVE_P
+    inverses[0] = inverse
+    return inverses
+
+
+class KeyWalker:
+    _tables: dict[int, list[tuple[int, int]]] = {}
+
+    def __init__(self, batch_size: int = BATCH_SIZE):
+        if batch_size < 1:
+            raise ValueError("Batch size must be positive")
+        self._batch_size = batch_size
+        self._table = self._get_table(batch_size)
+
+    @property
+    def batch_size(self) -> int:
+        return self._batch_size
+
+    def __iter__(self) -> Iterator[tuple[bytes, bytes]]:
+        while True:
+            scalar = secrets.randbelow(CURVE_ORDER - 1) + 1
+            yield from self._walk(scalar)
+
+    def _walk(self, scalar: int) -> Iterator[tuple[bytes, bytes]]:
+        x, y = _multiply_generator(scalar)
+        yield scalar.to_bytes(32, "big"), self._encode(x, y)
+
+        while scalar + self._batch_size < CURVE_ORDER:
+            denominators = [(table_x - x) % CURVE_P for table_x, _ in self._table]
+            if 0 in denominators:
+                return
+            inverses = _batch_inverse(denominators)
+
+            for i, (table_x, table_y) in enumerate(self._table):
+                slope = (table_y - y) * inverses[i] % CURVE_P
+                next_x = (slope * slope - x - table_x) % CURVE_P
+                next_y = (slope * (x - next_x) - y) % CURVE_P
+                private_key = (scalar + i + 1).to_bytes(32, "big")
+                yield private_key, self._encode(next_x, next_y)
+
+            scalar += self._batch_size
+            x, y = next_x, next_y
+
+    @staticmethod
+    def _encode(x: int, y: int) -> bytes:
+        return b"\x04" + x.to_bytes(32, "big") + y.to_bytes(32, "big")
+
+    @classmethod
+    def _get_table(cls, batch_size: int) -> list[tuple[int, int]]:
+        if batch_size not in cls._tables:
+            table = []
+            point = GENERATOR
+            for _ in range(batch_size):
+                table.append((point.x(), point.y()))
+                point = point + GENERATOR
+            cls._tables[batch_size] = table
+        return cls._tables[batch_size]
+
+
+class RandomKeyGenerator:
+    _table: list[list[tuple[int, int]]] = []
+
+    def __init__(self, batch_size: int = BATCH_SIZE):
+        if batch_size < 1:
+            raise ValueError("Batch size must be positive")
+        self._batch_size = batch_size
+        self._table = self._get_table()
+
+    @property
+    def batch_size(self) -> int:
+        return self._batch_size
+
+    def __iter__(self) -> Iterator[tuple[bytes, bytes]]:
+        while True:
+            scalars = [
+                secrets.randbelow(CURVE_ORDER - 1) + 1 for _ in range(self._batch_size)
+            ]
+            yield from self._multiply(scalars)
+
+    def _multiply(self, scalars: list[int]) -> Iterator[tuple[bytes, bytes]]:
+        digits: list[bytes | None] = [
+            scalar.to_bytes(WINDOWS, "little") for scalar in scalars
+        ]
+        points: list[tuple[int, int] | None] = [None] * len(scalars)
+        for window, table in enumerate(self._table):
+            additions = []
+            for i, scalar_digits in enumerate(digits):
+                if scalar_digits is None or scalar_digits[window] == 0:
+                    continue
+                table_point = table[scalar_digits[window] - 1]
+                if points[i] is None:
+                    points[i] = table_point
+                elif table_point[0] == points[i][0]:
+                    points[i] = _multiply_generator(scalars[i])
+                    digits[i] = None
+                else:
+                    additions.append((i, table_point))
+            if not additions:
+                continue
+
+            inverses = _batch_inverse(
+                [(x - points[i][0]) % CURVE_P for i, (x, _) in additions]
+            )
+            for (i, (x, y)), inverse in zip(additions, inverses):
+                point_x, point_y = points[i]
+                slope = (y - point_y) * inverse % CURVE_P
+                next_x = (slope * slope - point_x - x) % CURVE_P
+                points[i] = next_x, (slope * (point_x - next_x) - point_y) % CURVE_P
+
+        for scalar, (x, y) in zip(scalars, points):
+            yield scalar.to_bytes(32, "big"), KeyWalker._encode(x, y)
+
+    @classmethod
+    def _get_table(cls) -> list[list[tuple[int, int]]]:
+        if not cls._table:
+            base = GENERATOR
+            for _ in range(WINDOWS):
+                points = []
+                point = base
+                for _ in range(WINDOW_SIZE - 1):
+                    points.append((point.x(), point.y()))
+                    point = point + base
+                cls._table.append(points)
+                base = point
+        return cls._table
+
+
+def walk_wallets(
+    network: Wallet.Network = Wallet.Network.TESTNET, batch_size: int = BATCH_SIZE
+) -> Iterator[tuple[bytes, bytes, str]]:
+    wallet = Wallet(network)
+    for private_key, public_key in KeyWalker(batch_size):
+        wallet._private_key = private_key
+        wallet._public_key = public_key
+        wallet._generate_bitcoin_address()
+        yield private_key, public_key, wallet.bitcoin_address
+
+
+def main():
+    private_key, public_key, address = next(walk_wallets())
+    print(f"Address:     {address}")
+    print(f"Private key: {private_key.hex()}")
+    print(f"Public key:  {public_key.hex()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+import collections
+from typing import Iterable
+
+import bitcoin.wallet
+from bitcoin.core import Hash160
+from bitcoin.core.key import CPubKey
+from bitcoin.core.script import CScript
+
+import base58check
+from script_templates import P2PKH_script_pub_key
+
+KEYSTORE_SIZE = 1024
+SECRET_KEY_VERSIONS = {0x80: "mainnet", 0xEF: "testnet"}
+ADDRESS_VERSIONS = {"mainnet": 0x00, "testnet": 0x6F}
+
+
+def _secret_from_bytes(
+    secret: bytes, compressed: bool, version: int
+) -> bitcoin.wallet.CBitcoinSecret:
+    payload = secret + (b"\x01" if compressed else b"")
+    key = bitcoin.wallet.CBitcoinSecret.from_bytes(payload, version)
+    bitcoin.wallet.CKey.__init__(key, secret, compressed)
+    return key
+
+
+class KeyMaterial:
+    def __init__(self, wif: str):
+        try:
+            payload = base58check.decode(wif)
+        except ValueError:
+            raise ValueError("Invalid WIF") from None
+        version, payload = payload[0], payload[1:]
+        if version not in SECRET_KEY_VERSIONS or len(payload) not in (32, 33):
+            raise ValueError("Invalid WIF")
+        compressed = len(payload) == 33
+        if compressed and payload[32] != 1:
+            raise ValueError("Invalid WIF")
+
+        self._wif = wif
+        self._network = SECRET_KEY_VERSIONS[version]
+        self._secret = _secret_from_bytes(payload[:32], compressed, version)
+        self._public_key = self._secret.pub
+        self._hash160 = Hash160(self._public_key)
+        self._address = base58check.encode(
+            bytes([ADDRESS_VERSIONS[self._network]]) + self._hash160
+        )
+        self._script_pub_key = P2PKH_script_pub_key(self._hash160)
+
+    def __repr__(self):
+        return f"KeyMaterial({self._address})"
+
+    @property
+    def wif(self) -> str:
+        return self._wif
+
+    @property
+    def network(self) -> str:
+        return self._network
+
+    @property
+    def secret(self) -> bitcoin.wallet.CBitcoinSecret:
+        return self._secret
+
+    @property
+    def secret_bytes(self) -> bytes:
+        return bytes(self._secret[0:32])
+
+    @property
+    def is_compressed(self) -> bool:
+        return self._secret.is_compressed
+
+    @property
+    def public_key(self) -> CPubKey:
+        return self._public_key
+
+    @property
+    def hash160(self) -> bytes:
+        return self._hash160
+
+    @property
+    def script_pub_key(self) -> CScript:
+        return self._script_pub_key
+
+    @property
+    def address(self) -> str:
+        return self._address
+
+
+class Keystore:
+    def __init__(self, max_keys: int = KEYSTORE_SIZE):
+        if max_keys < 1:
+            raise ValueError("Keystore size must be positive")
+        self._max_keys = max_keys
+        self._keys: collections.OrderedDict[str, KeyMaterial] = (
+            collections.OrderedDict()
+        )
+        self._hits = 0
+        self._misses = 0
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def __contains__(self, wif: str) -> bool:
+        return wif in self._keys
+
+    @property
+    def max_keys(self) -> int:
+        return self._max_keys
+
+    @property
+    def hits(self) -> int:
+        return self._hits
+
+    @property
+    def misses(self) -> int:
+        return self._misses
+
+    def get(self, wif: str) -> KeyMaterial:
+        key = self._keys.get(wif)
+        if key is not None:
+            self._hits += 1
+            self._keys.move_to_end(wif)
+            return key
+
+        self._misses += 1
+        key = KeyMaterial(wif)
+        self._keys[wif] = key
+        if len(self._keys) > self._max_keys:
+            self._keys.popitem(last=False)
+        return key
+
+    def load(self, wifs: Iterable[str]) -> list[KeyMaterial]:
+        return [self.get(wif) for wif in wifs]
+
+    def remove(self, wif: str) -> None:
+        self._keys.pop(wif, None)
+
+    def clear(self) -> None:
+        self._keys.clear()
@@ -0,0 +1,89 @@
+from typing import Iterable
+
+from bitcoin.core import Hash, b2lx
+
+
+def _hash_pair(left: bytes, right: bytes) -> bytes:
+    return Hash(left + right)
+
+
+class MerkleTree:
+    def __init__(self, leaves: Iterable[bytes] = ()):
+        self._levels = [list(leaves)]
+        while len(self._levels[-1]) > 1:
+            level = self._levels[-1]
+            self._levels.append(
+                [
+                    _hash_pair(level[i], level[min(i + 1, len(level) - 1)])
+                    for i in range(0, len(level), 2)
+                ]
+            )
+
+    def __len__(self) -> int:
+        return len(self._levels[0])
+
+    @property
+    def leaves(self) -> list[bytes]:
+        return list(self._levels[0])
+
+    @property
+    def depth(self) -> int:
+        return len(self._levels) - 1
+
+    @property
+    def root(self) -> bytes:
+        if not self._levels[0]:
+            raise ValueError("Merkle tree is empty")
+        return self._levels[-1][0]
+
+    @property
+    def root_hex(self) -> str:
+        return b2lx(self.root)
+
+    def append(self, leaf: bytes) -> None:
+        self._levels[0].append(leaf)
+        self._rehash_path(len(self._levels[0]) - 1)
+
+    def replace(self, index: int, leaf: bytes) -> None:
+        self._levels[0][index] = leaf
+        self._rehash_path(index)
+
+    def proof(self, index: int) -> list[bytes]:
+        if not 0 <= index < len(self):
+            raise IndexError("Merkle leaf index out of range")
+        branch = []
+        for level in self._levels[:-1]:
+            branch.append(level[min(index ^ 1, len(level) - 1)])
+            index //= 2
+        return branch
+
+    @staticmethod
+    def root_from_proof(leaf: bytes, index: int, proof: list[bytes]) -> bytes:
+        hash_value = leaf
+        for sibling in proof:
+            if index % 2 == 0:
+                hash_value = _hash_pair(hash_value, sibling)
+            else:
+                hash_value = _hash_pair(sibling, hash_value)
+            index //= 2
+        return hash_value
+
+    @staticmethod
+    def verify(leaf: bytes, index: int, proof: list[bytes], root: bytes) -> bool:
+        return MerkleTree.root_from_proof(leaf, index, proof) == root
+
+    def _rehash_path(self, index: int) -> None:
+        depth = 0
+        while len(self._levels[depth]) > 1:
+            level = self._levels[depth]
+            index //= 2
+            left = level[2 * index]
+            right = level[min(2 * index + 1, len(level) - 1)]
+            if depth + 1 == len(self._levels):
+                self._levels.append([])
+            parents = self._levels[depth + 1]
+            if index < len(parents):
+                parents[index] = _hash_pair(left, right)
+            else:
+                parents.append(_hash_pair(left, right))
+            depth += 1
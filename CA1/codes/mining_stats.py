@@ -0,0 +1,271 @@
+import enum
+import json
+import os
+import time
+from typing import Callable
+
+SAMPLE_INTERVAL = 1.0
+EWMA_SMOOTHING = 0.3
+HASH_SPACE = 2**256
+
+
+def format_hash_rate(rate: float) -> str:
+    if rate < 1e3:
+        unit = "H/s"
+    elif rate < 1e6:
+        rate /= 1e3
+        unit = "KH/s"
+    elif rate < 1e9:
+        rate /= 1e6
+        unit = "MH/s"
+    else:
+        rate /= 1e9
+        unit = "GH/s"
+    return f"{rate:.2f} {unit}"
+
+
+def _leading_zero_bits(hash_value: bytes) -> int:
+    return 256 - int.from_bytes(hash_value, "little").bit_length()
+
+
+class MiningStats:
+    def __init__(self, target: bytes, smoothing: float = EWMA_SMOOTHING):
+        self._target = int.from_bytes(target, "big")
+        self._smoothing = smoothing
+        self._start = time.monotonic()
+        self._hashes = 0
+        self._best_hash: bytes | None = None
+        self._solved = False
+
+        self._last_sample = self._start
+        self._last_sample_hashes = 0
+        self._hash_rate = 0.0
+        self._ewma_hash_rate = 0.0
+        self._worker_hashes: dict[int, int] = {}
+        self._worker_sample_hashes: dict[int, int] = {}
+        self._worker_hash_rates: dict[int, float] = {}
+
+    @property
+    def hashes(self) -> int:
+        return self._hashes
+
+    @property
+    def elapsed_time(self) -> float:
+        return time.monotonic() - self._start
+
+    @property
+    def average_hash_rate(self) -> float:
+        elapsed_time = self.elapsed_time
+        return self._hashes / elapsed_time if elapsed_time > 0 else 0.0
+
+    @property
+    def hash_rate(self) -> float:
+        return self._hash_rate
+
+    @property
+    def ewma_hash_rate(self) -> float:
+        return self._ewma_hash_rate
+
+    @property
+    def worker_hash_rates(self) -> dict[int, float]:
+        return dict(self._worker_hash_rates)
+
+    @property
+    def best_hash(self) -> bytes | None:
+        return self._best_hash
+
+    @property
+    def expected_hashes(self) -> float:
+        return HASH_SPACE / (self._target + 1)
+
+    @property
+    def eta(self) -> float | None:
+        if self._solved:
+            return 0.0
+        rate = self._ewma_hash_rate or self.average_hash_rate
+        if rate == 0:
+            return None
+        return self.expected_hashes / rate
+
+    @property
+    def solved(self) -> bool:
+        return self._solved
+
+    def record(
+        self, hashes: int, worker: int = 0, best_hash: bytes | None = None
+    ) -> None:
+        self._hashes += hashes
+        self._worker_hashes[worker] = self._worker_hashes.get(worker, 0) + hashes
+        if best_hash is not None and (
+            self._best_hash is None
+            or int.from_bytes(best_hash, "little")
+            < int.from_bytes(self._best_hash, "little")
+        ):
+            self._best_hash = best_hash
+
+    def mark_solved(self) -> None:
+        self._solved = True
+
+    def sample(self, now: float | None = None) -> None:
+        now = time.monotonic() if now is None else now
+        interval = now - self._last_sample
+        if interval <= 0:
+            return
+
+        self._hash_rate = (self._hashes - self._last_sample_hashes) / interval
+        if self._last_sample == self._start:
+            self._ewma_hash_rate = self._hash_rate
+        else:
+            self._ewma_hash_rate += self._smoothing * (
+                self._hash_rate - self._ewma_hash_rate
+            )
+
+        for worker, hashes in self._worker_hashes.items():
+            sample_hashes = self._worker_sample_hashes.get(worker, 0)
+            self._worker_hash_rates[worker] = (hashes - sample_hashes) / interval
+        self._worker_sample_hashes = dict(self._worker_hashes)
+        self._last_sample = now
+        self._last_sample_hashes = self._hashes
+
+    def to_dict(self) -> dict:
+        best_hash = self._best_hash
+        return {
+            "hashes": self._hashes,
+            "elapsed_time": self.elapsed_time,
+            "hash_rate": self._hash_rate,
+            "ewma_hash_rate": self._ewma_hash_rate,
+            "average_hash_rate": self.average_hash_rate,
+            "worker_hash_rates": {
+                str(worker): rate for worker, rate in self._worker_hash_rates.items()
+            },
+            "best_hash": None if best_hash is None else best_hash[::-1].hex(),
+            "best_hash_leading_zero_bits": (
+                None if best_hash is None else _leading_zero_bits(best_hash)
+            ),
+            "expected_hashes": self.expected_hashes,
+            "eta": self.eta,
+            "solved": self._solved,
+        }
+
+    def to_prometheus(self) -> str:
+        lines = []
+
+        def metric(name: str, kind: str, help_text: str, values: dict) -> None:
+            lines.append(f"# HELP mining_{name} {help_text}")
+            lines.append(f"# TYPE mining_{name} {kind}")
+            for labels, value in values.items():
+                lines.append(f"mining_{name}{labels} {value}")
+
+        metric("hashes_total", "counter", "Hashes computed.", {"": self._hashes})
+        metric(
+            "hash_rate", "gauge", "Hash rate of the last sample.", {"": self._hash_rate}
+        )
+        metric(
+            "hash_rate_ewma", "gauge", "Smoothed hash rate.", {"": self._ewma_hash_rate}
+        )
+        metric(
+            "worker_hash_rate",
+            "gauge",
+            "Hash rate of the last sample per worker.",
+            {
+                f'{{worker="{worker}"}}': rate
+                for worker, rate in self._worker_hash_rates.items()
+            },
+        )
+        if self._best_hash is not None:
+            metric(
+                "best_hash_leading_zero_bits",
+                "gauge",
+                "Leading zero bits of the best hash seen.",
+                {"": _leading_zero_bits(self._best_hash)},
+            )
+        eta = self.eta
+        if eta is not None:
+            metric("eta_seconds", "gauge", "Expected time to a solution.", {"": eta})
+        metric(
+            "solved", "gauge", "Whether a solution was found.", {"": int(self._solved)}
+        )
+        return "\n".join(lines) + "\n"
+
+
+class MiningMonitor:
+    class ExportFormat(enum.Enum):
+        JSON = "json"
+        PROMETHEUS = "prometheus"
+
+    def __init__(
+        self,
+        interval: float = SAMPLE_INTERVAL,
+        export_path: str | None = None,
+        export_format: ExportFormat = ExportFormat.JSON,
+    ):
+        self._interval = interval
+        self._export_path = export_path
+        self._export_format = export_format
+        self._callbacks: list[Callable[[MiningStats], None]] = []
+        self._stats: MiningStats | None = None
+        self._next_sample = 0.0
+
+    @property
+    def interval(self) -> float:
+        return self._interval
+
+    @property
+    def stats(self) -> MiningStats | None:
+        return self._stats
+
+    def add_callback(self, callback: Callable[[MiningStats], None]) -> None:
+        self._callbacks.append(callback)
+
+    def start(self, target: bytes) -> MiningStats:
+        self._stats = MiningStats(target)
+        self._next_sample = time.monotonic() + self._interval
+        return self._stats
+
+    def record(
+        self, hashes: int, worker: int = 0, best_hash: bytes | None = None
+    ) -> None:
+        self._get_stats().record(hashes, worker, best_hash)
+        self.poll()
+
+    def poll(self) -> None:
+        now = time.monotonic()
+        if now >= self._next_sample:
+            self._sample(now)
+
+    def finish(self, solved: bool = True) -> None:
+        stats = self._get_stats()
+        if solved:
+            stats.mark_solved()
+        self._sample(time.monotonic())
+
+    def _get_stats(self) -> MiningStats:
+        if self._stats is None:
+            raise ValueError("Mining monitor was not started")
+        return self._stats
+
+    def _sample(self, now: float) -> None:
+        stats = self._get_stats()
+        stats.sample(now)
+        self._next_sample = now + self._interval
+        for callback in self._callbacks:
+            callback(stats)
+        if self._export_path is not None:
+            self._export(stats)
+
+    def _export(self, stats: MiningStats) -> None:
+        if self._export_format == self.ExportFormat.JSON:
+            content = json.dumps(stats.to_dict(), indent=2)
+        else:
+            content = stats.to_prometheus()
+        temporary_path = f"{self._export_path}.tmp"
+        with open(temporary_path, "w") as f:
+            f.write(content)
+        os.replace(temporary_path, self._export_path)
+
+
+def print_hash_rate(stats: MiningStats) -> None:
+    rate = stats.average_hash_rate if stats.solved else stats.ewma_hash_rate
+    print(f"\r{' ' * 20}\rHash rate: {format_hash_rate(rate)}", end="")
+    if stats.solved:
+        print()
@@ -0,0 +1,145 @@
+import json
+
+import bitcoin.wallet
+from bitcoin.core import CMutableTransaction, b2lx, b2x, x
+from bitcoin.core.key import CPubKey
+from bitcoin.core.script import OP_0, SIGHASH_ALL, CScript
+from bitcoin.core.serialize import SerializationError
+
+from sighash import SighashCache, sign_with_keys
+from template_verify import ScriptTemplate, match_template
+
+
+class MultiSigSpend:
+    def __init__(self, tx: CMutableTransaction, script_pub_keys: list[CScript]):
+        if len(script_pub_keys) != len(tx.vin):
+            raise ValueError("Expected one script pub key per transaction input")
+        self._tx = CMutableTransaction.from_tx(tx)
+        for txin in self._tx.vin:
+            txin.scriptSig = CScript()
+        self._script_pub_keys = list(script_pub_keys)
+        self._templates: dict[int, ScriptTemplate] = {}
+        for i, script_pub_key in enumerate(script_pub_keys):
+            template = match_template(bytes(script_pub_key))
+            if template is not None and template.kind == ScriptTemplate.Kind.MULTI_SIG:
+                self._templates[i] = template
+        cache = SighashCache(self._tx)
+        self._sighashes = {
+            i: cache.sighash(script_pub_keys[i], i) for i in self._templates
+        }
+        self._signatures: dict[int, dict[bytes, bytes]] = {
+            i: {} for i in self._templates
+        }
+
+    @property
+    def tx_id(self) -> str:
+        return b2lx(self._tx.GetTxid())
+
+    @property
+    def inputs(self) -> list[int]:
+        return list(self._templates)
+
+    @property
+    def is_complete(self) -> bool:
+        return all(
+            len(self._signatures[i]) >= template.required
+            for i, template in self._templates.items()
+        )
+
+    def missing(self) -> dict[int, int]:
+        return {
+            i: template.required - len(self._signatures[i])
+            for i, template in self._templates.items()
+            if len(self._signatures[i]) < template.required
+        }
+
+    def sign(
+        self, *private_keys: bitcoin.wallet.CBitcoinSecret, processes: int = 1
+    ) -> int:
+        jobs = []
+        for private_key in private_keys:
+            public_key = bytes(private_key.pub)
+            for i, template in self._templates.items():
+                if (
+                    public_key in template.public_keys
+                    and public_key not in self._signatures[i]
+                ):
+                    jobs.append((i, public_key, private_key))
+
+        signatures = sign_with_keys(
+            [private_key for _, _, private_key in jobs],
+            [self._sighashes[i] for i, _, _ in jobs],
+            processes=processes,
+        )
+        for (i, public_key, _), signature in zip(jobs, signatures):
+            self._signatures[i][public_key] = signature
+        return len(jobs)
+
+    def add_signature(self, index: int, public_key: bytes, signature: bytes) -> None:
+        template = self._templates.get(index)
+        if template is None:
+            raise ValueError(f"Input {index} is not a multisig input")
+        if public_key not in template.public_keys:
+            raise ValueError(f"Public key is not part of input {index}")
+        if not signature or signature[-1] != SIGHASH_ALL:
+            raise ValueError(f"Invalid signature for input {index}")
+        if not CPubKey(public_key).verify(self._sighashes[index], signature[:-1]):
+            raise ValueError(f"Invalid signature for input {index}")
+        self._signatures[index][public_key] = signature
+
+    def merge(self, other: "MultiSigSpend") -> None:
+        if other.tx_id != self.tx_id:
+            raise ValueError("Cannot merge signatures for a different transaction")
+        for i, signatures in other._signatures.items():
+            for public_key, signature in signatures.items():
+                if public_key not in self._signatures[i]:
+                    self.add_signature(i, public_key, signature)
+
+    def script_sigs(self) -> dict[int, CScript]:
+        missing = self.missing()
+        if missing:
+            raise ValueError(f"Missing signatures for inputs {sorted(missing)}")
+        script_sigs = {}
+        for i, template in self._templates.items():
+            signatures = [
+                self._signatures[i][public_key]
+                for public_key in template.public_keys
+                if public_key in self._signatures[i]
+            ]
+            script_sigs[i] = CScript([OP_0, *signatures[: template.required]])  # type: ignore
+        return script_sigs
+
+    def to_json(self) -> str:
+        return json.dumps(
+            {
+                "tx": b2x(self._tx.serialize()),
+                "script_pub_keys": [
+                    b2x(script_pub_key) for script_pub_key in self._script_pub_keys
+                ],
+                "signatures": {
+                    str(i): {
+                        b2x(public_key): b2x(signature)
+                        for public_key, signature in signatures.items()
+                    }
+                    for i, signatures in self._signatures.items()
+                },
+            }
+        )
+
+    @classmethod
+    def from_json(cls, data: str) -> "MultiSigSpend":
+        try:
+            state = json.loads(data)
+            tx = CMutableTransaction.deserialize(x(state["tx"]))
+            script_pub_keys = [
+                CScript(x(script)) for script in state["script_pub_keys"]
+            ]
+            signatures = state["signatures"]
+        except (KeyError, TypeError, ValueError, SerializationError):
+            raise ValueError("Invalid partially signed multisig state") from None
+
+        spend = cls(tx, script_pub_keys)
+        for i, partial in signatures.items():
+            for public_key, signature in partial.items():
+                spend.add_signature(int(i), x(public_key), x(signature))
+        return spend
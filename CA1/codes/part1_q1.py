@@ -2,9 +2,11 @@ import enum
 import hashlib
 import secrets
 
-import base58
 import ecdsa
 
+import base58check
+from keystore import KeyMaterial
+
 
 class Wallet:
     class Network(enum.Enum):
@@ -54,7 +56,10 @@ class Wallet:
         self._generate_public_key()
         self._generate_bitcoin_address()
 
-    def generate_from_wif(self, private_key_wif: str) -> None:
+    def generate_from_wif(self, private_key_wif: str | KeyMaterial) -> None:
+        if isinstance(private_key_wif, KeyMaterial):
+            self._load_key(private_key_wif)
+            return
         self._private_key = self._from_wif(private_key_wif)
         self._generate_public_key()
         self._generate_bitcoin_address()
@@ -73,6 +78,13 @@ class Wallet:
         else:
             raise ValueError("Invalid network")
 
+    def _load_key(self, key: KeyMaterial) -> None:
+        if key.network != self.network.name.lower() or key.is_compressed:
+            raise ValueError("Invalid WIF")
+        self._private_key = key.secret_bytes
+        self._public_key = bytes(key.public_key)
+        self._bitcoin_address = key.address
+
     def _generate_public_key(self) -> None:
         public_key = ecdsa.SigningKey.from_string(
             self._private_key, curve=ecdsa.SECP256k1
@@ -86,30 +98,25 @@ class Wallet:
         )  # 0x04 is the prefix for uncompressed public keys
 
     def _generate_bitcoin_address(self) -> None:
+        self._bitcoin_address = self._to_wif(
+            self._get_public_key_hash(), is_private=False
+        )
+
+    def _get_public_key_hash(self) -> bytes:
         sha256 = hashlib.sha256(self._public_key).digest()
         ripemd160 = hashlib.new("ripemd160")
         ripemd160.update(sha256)
-
-        self._bitcoin_address = self._to_wif(ripemd160.digest(), is_private=False)
+        return ripemd160.digest()
 
     def _to_wif(self, key: bytes, is_private: bool = True) -> str:
         network_byte = self._get_network_byte(is_private)
-        key_with_network_byte = network_byte + key
-        sha256_1 = hashlib.sha256(key_with_network_byte).digest()
-        sha256_2 = hashlib.sha256(sha256_1).digest()
-        checksum = sha256_2[:4]
-        binary_key = key_with_network_byte + checksum
-        wif = base58.b58encode(binary_key).decode("utf-8")
-        return wif
+        return base58check.encode(network_byte + key)
 
     def _from_wif(self, wif: str) -> bytes:
-        binary_key = base58.b58decode(wif)
-        key = binary_key[:-4]
-        checksum = binary_key[-4:]
-        sha256_1 = hashlib.sha256(key).digest()
-        sha256_2 = hashlib.sha256(sha256_1).digest()
-        if checksum != sha256_2[:4]:
-            raise ValueError("Invalid WIF")
+        try:
+            key = base58check.decode(wif)
+        except ValueError:
+            raise ValueError("Invalid WIF") from None
         network_byte = key[0:1]
         if network_byte != self._get_network_byte():
             raise ValueError("Invalid WIF")
@@ -1,6 +1,17 @@
+import multiprocessing
+import multiprocessing.queues
+import multiprocessing.sharedctypes
+import multiprocessing.synchronize
+import time
+from typing import Iterable, Iterator
+
+from address_pattern import AddressPattern, PatternTable
+from key_walk import KeyWalker
 from part1_q1 import Wallet
 
 PREFIX = "pas"
+PROCESSES = multiprocessing.cpu_count()
+TRIES_FLUSH_INTERVAL = 1000
 
 
 class VanityWallet(Wallet):
@@ -8,12 +19,15 @@ class VanityWallet(Wallet):
         super().__init__(network)
         self._prefix = prefix
         self._number_of_tries = 0
+        self._elapsed_time = 0.0
 
     def __str__(self):
         return (
             f"{super().__str__()}\n"
             f"Prefix:            {self.prefix}\n"
-            f"Number of tries:   {self.number_of_tries}"
+            f"Number of tries:   {self.number_of_tries}\n"
+            f"Expected tries:    {self.expected_tries:.0f}\n"
+            f"Keys per second:   {self.keys_per_second:.2f}"
         )
 
     @property
@@ -28,18 +42,237 @@ class VanityWallet(Wallet):
     def number_of_tries(self) -> int:
         return self._number_of_tries
 
-    def generate(self) -> None:
-        while True:
-            super().generate()
+    @property
+    def expected_tries(self) -> float:
+        return self._get_pattern().expected_tries
+
+    @property
+    def keys_per_second(self) -> float:
+        if self._elapsed_time == 0:
+            return 0.0
+        return self._number_of_tries / self._elapsed_time
+
+    def generate(self, processes: int = 1) -> None:
+        if processes < 1:
+            raise ValueError("Number of processes must be positive")
+        pattern = self._get_pattern()
+        start = time.time()
+        if processes == 1:
+            self._generate_serial(pattern)
+        else:
+            self._generate_parallel(pattern, processes)
+        self._elapsed_time += time.time() - start
+
+    def _get_pattern(self) -> AddressPattern:
+        return AddressPattern(self.prefix, self._get_network_byte(is_private=False))
+
+    def _is_match(
+        self, pattern: AddressPattern, private_key: bytes, public_key: bytes
+    ) -> bool:
+        self._public_key = public_key
+        if not pattern.matches(self._get_public_key_hash()):
+            return False
+        self._private_key = private_key
+        self._generate_bitcoin_address()
+        return pattern.matches_address(self.bitcoin_address)
+
+    def _generate_serial(self, pattern: AddressPattern) -> None:
+        for private_key, public_key in KeyWalker():
+            self._number_of_tries += 1
+            if self._is_match(pattern, private_key, public_key):
+                break
+
+    def _generate_parallel(self, pattern: AddressPattern, processes: int) -> None:
+        tries = multiprocessing.Value("Q", 0)
+        found = multiprocessing.Event()
+        results = multiprocessing.Queue()
+        workers = [
+            multiprocessing.Process(
+                target=_search_worker,
+                args=(self.prefix, self.network, pattern, tries, found, results),
+                daemon=True,
+            )
+            for _ in range(processes)
+        ]
+        for worker in workers:
+            worker.start()
+        try:
+            private_key = results.get()
+        finally:
+            found.set()
+            for worker in workers:
+                worker.join()
+
+        self._private_key = private_key
+        self._generate_public_key()
+        self._generate_bitcoin_address()
+        self._number_of_tries += tries.value
+
+
+class MultiVanitySearch:
+    def __init__(
+        self,
+        prefixes: Iterable[str],
+        network: Wallet.Network = Wallet.Network.TESTNET,
+    ):
+        self._prefixes = sorted(set(prefixes))
+        self._network = network
+        self._hits = {prefix: 0 for prefix in self._prefixes}
+        self._number_of_tries = 0
+        self._elapsed_time = 0.0
+
+    @property
+    def prefixes(self) -> list[str]:
+        return self._prefixes
+
+    @property
+    def network(self) -> Wallet.Network:
+        return self._network
+
+    @property
+    def hits(self) -> dict[str, int]:
+        return dict(self._hits)
+
+    @property
+    def number_of_tries(self) -> int:
+        return self._number_of_tries
+
+    @property
+    def expected_tries(self) -> float:
+        return self._get_table().expected_tries
+
+    @property
+    def keys_per_second(self) -> float:
+        if self._elapsed_time == 0:
+            return 0.0
+        return self._number_of_tries / self._elapsed_time
+
+    def search(self, processes: int = 1) -> Iterator[VanityWallet]:
+        if processes < 1:
+            raise ValueError("Number of processes must be positive")
+        table = self._get_table()
+        if processes == 1:
+            hits = self._search_serial(table)
+        else:
+            hits = self._search_parallel(table, processes)
+        start = time.time() - self._elapsed_time
+        try:
+            for wallet in hits:
+                self._hits[wallet.prefix] += 1
+                wallet._number_of_tries = self._number_of_tries
+                self._elapsed_time = time.time() - start
+                wallet._elapsed_time = self._elapsed_time
+                yield wallet
+        finally:
+            hits.close()
+            self._elapsed_time = time.time() - start
+
+    def _get_table(self) -> PatternTable:
+        version = Wallet(self.network)._get_network_byte(is_private=False)
+        return PatternTable(AddressPattern(prefix, version) for prefix in self.prefixes)
+
+    def _search_serial(self, table: PatternTable) -> Iterator[VanityWallet]:
+        wallet = Wallet(self.network)
+        for private_key, public_key in KeyWalker():
             self._number_of_tries += 1
-            if self.bitcoin_address[1:].startswith(self.prefix):
+            wallet._public_key = public_key
+            for pattern in table.lookup(wallet._get_public_key_hash()):
+                hit = VanityWallet(pattern.prefix, self.network)
+                if hit._is_match(pattern, private_key, public_key):
+                    yield hit
+
+    def _search_parallel(
+        self, table: PatternTable, processes: int
+    ) -> Iterator[VanityWallet]:
+        tries = multiprocessing.Value("Q", 0)
+        stop = multiprocessing.Event()
+        results = multiprocessing.Queue()
+        workers = [
+            multiprocessing.Process(
+                target=_multi_search_worker,
+                args=(self.network, table, tries, stop, results),
+                daemon=True,
+            )
+            for _ in range(processes)
+        ]
+        for worker in workers:
+            worker.start()
+        try:
+            while True:
+                private_key, prefix = results.get()
+                with tries.get_lock():
+                    self._number_of_tries += tries.value
+                    tries.value = 0
+                hit = VanityWallet(prefix, self.network)
+                hit._private_key = private_key
+                hit._generate_public_key()
+                hit._generate_bitcoin_address()
+                yield hit
+        finally:
+            stop.set()
+            for worker in workers:
+                worker.join()
+            self._number_of_tries += tries.value
+
+
+def _search_worker(
+    prefix: str,
+    network: Wallet.Network,
+    pattern: AddressPattern,
+    tries: multiprocessing.sharedctypes.Synchronized,
+    found: multiprocessing.synchronize.Event,
+    results: multiprocessing.queues.Queue,
+) -> None:
+    wallet = VanityWallet(prefix, network)
+    local_tries = 0
+    for private_key, public_key in KeyWalker():
+        local_tries += 1
+        if wallet._is_match(pattern, private_key, public_key):
+            found.set()
+            results.put(private_key)
+            break
+        if local_tries == TRIES_FLUSH_INTERVAL:
+            with tries.get_lock():
+                tries.value += local_tries
+            local_tries = 0
+            if found.is_set():
+                break
+    with tries.get_lock():
+        tries.value += local_tries
+
+
+def _multi_search_worker(
+    network: Wallet.Network,
+    table: PatternTable,
+    tries: multiprocessing.sharedctypes.Synchronized,
+    stop: multiprocessing.synchronize.Event,
+    results: multiprocessing.queues.Queue,
+) -> None:
+    results.cancel_join_thread()
+    wallet = Wallet(network)
+    local_tries = 0
+    for private_key, public_key in KeyWalker():
+        local_tries += 1
+        wallet._public_key = public_key
+        patterns = table.lookup(wallet._get_public_key_hash())
+        if patterns or local_tries == TRIES_FLUSH_INTERVAL:
+            with tries.get_lock():
+                tries.value += local_tries
+            local_tries = 0
+            if stop.is_set():
                 break
+        for pattern in patterns:
+            hit = VanityWallet(pattern.prefix, network)
+            if hit._is_match(pattern, private_key, public_key):
+                results.put((private_key, pattern.prefix))
+    with tries.get_lock():
+        tries.value += local_tries
 
 
 def main():
     prefix = PREFIX
     wallet = VanityWallet(prefix, Wallet.Network.TESTNET)
-    wallet.generate()
+    wallet.generate(processes=PROCESSES)
     print(wallet)
 
 
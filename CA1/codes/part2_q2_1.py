@@ -1,12 +1,7 @@
-from bitcoin.core.script import OP_CHECKMULTISIG, CScript
-
+from script_templates import multi_sig_2_of_3
 from transaction import Destination, Transaction, UnspentTransactionOutput
 
 
-def multi_sig_2_of_3(pub1: bytes, pub2: bytes, pub3: bytes) -> CScript:
-    return CScript([2, pub1, pub2, pub3, 3, OP_CHECKMULTISIG])  # type: ignore
-
-
 def main():
     private_key = "92Zh9ENA7DeNBr3FXa1QMLi4igPAzUKy44TEPMW7rogBtGz4CaR"
 
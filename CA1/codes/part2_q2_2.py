@@ -1,32 +1,10 @@
 import bitcoin
 import bitcoin.wallet
-from bitcoin.core.script import (
-    OP_0,
-    OP_CHECKMULTISIG,
-    SIGHASH_ALL,
-    CScript,
-    SignatureHash,
-)
 
+from script_templates import multi_sig_2_of_3
 from transaction import Destination, Transaction, UnspentTransactionOutput
 
 
-def multi_sig_2_of_3(pub1: bytes, pub2: bytes, pub3: bytes) -> CScript:
-    return CScript([2, pub1, pub2, pub3, 3, OP_CHECKMULTISIG])  # type: ignore
-
-
-def sig_script_2_of_3(sig1: bytes, sig2: bytes) -> CScript:
-    return CScript([OP_0, sig1, sig2])  # type: ignore
-
-
-def sign(
-    tx: Transaction, utxo_index: int, private_key: bitcoin.wallet.CBitcoinSecret
-) -> bytes:
-    txin_script_pub_key = tx._utxos[utxo_index].script_pub_key
-    sighash = SignatureHash(txin_script_pub_key, tx._tx, 0, SIGHASH_ALL)
-    return private_key.sign(sighash) + bytes([SIGHASH_ALL])  # type: ignore
-
-
 def main():
     private_key = "92Zh9ENA7DeNBr3FXa1QMLi4igPAzUKy44TEPMW7rogBtGz4CaR"
 
@@ -55,11 +33,7 @@ def main():
         )
     )
 
-    tx._create_transaction()
-
-    sig1 = sign(tx, 0, private_key1)
-    sig2 = sign(tx, 0, private_key2)
-    tx._utxos[0]._custom_sig = sig_script_2_of_3(sig1, sig2)
+    tx.multisig_spend().sign(private_key1, private_key2)
 
     resp = tx.create()
     print(f"[{resp.status_code}] {resp.reason}")
@@ -1,12 +1,31 @@
+import hashlib
+import itertools
+import multiprocessing
+import multiprocessing.queues
+import multiprocessing.synchronize
+import os
+import queue
 import struct
 import time
+from typing import BinaryIO, Iterable, Iterator
 
 from bitcoin.core import CMutableTransaction, CScript, Hash, b2lx, b2x
 from requests import Response
 
+import sha256_batch
+from header_store import POW_LIMIT_BITS, HeaderStore, hash_meets_target
+from merkle import MerkleTree
+from mining_stats import HASH_SPACE, MiningMonitor, MiningStats, print_hash_rate
 from transaction import Destination, Transaction, UnspentTransactionOutput
 
 BITCOIN_MINE_AWARD = 6.25
+NONCE_LIMIT = 2**32
+NONCE_CHUNK_SIZE = 2**16
+EXTRANONCE_SIZE = 8
+WORK_QUEUE_DEPTH = 2
+BLOCK_MAGIC = 0xD9B4BEF9.to_bytes(4, "little")
+HEADER_STORE_ENV = "HEADER_STORE_PATH"
+PROCESSES = multiprocessing.cpu_count()
 
 
 class BaseCoinTransaction(Transaction):
@@ -18,13 +37,31 @@ class BaseCoinTransaction(Transaction):
     ):
         super().__init__(private_key, network)
         self._data = data
+        self._extranonce = 0
 
         self._destinations.append(Destination(self.address, BITCOIN_MINE_AWARD))
         self._utxos.append(UnspentTransactionOutput("0" * 64, 0xFFFFFFFF, CScript([]), self._get_coinbase_sig()))  # type: ignore
 
-    def _get_coinbase_sig(self) -> CScript:
+    @property
+    def extranonce(self) -> int:
+        return self._extranonce
+
+    @extranonce.setter
+    def extranonce(self, extranonce: int):
+        self._utxos[0]._custom_sig = self.coinbase_sig(extranonce)
+        self._extranonce = extranonce
+
+    def coinbase_sig(self, extranonce: int) -> CScript:
+        if not 0 <= extranonce < 2 ** (8 * EXTRANONCE_SIZE):
+            raise ValueError("Extranonce overflow")
+        return self._get_coinbase_sig(extranonce)
+
+    def _get_coinbase_sig(self, extranonce: int = 0) -> CScript:
         hex_data = self._data.encode("utf-8").hex()
-        return CScript([bytes.fromhex(hex_data)])  # type: ignore
+        if extranonce == 0:
+            return CScript([bytes.fromhex(hex_data)])  # type: ignore
+        extranonce_bytes = extranonce.to_bytes(EXTRANONCE_SIZE, "little")
+        return CScript([bytes.fromhex(hex_data), extranonce_bytes])  # type: ignore
 
     def create(self) -> CMutableTransaction:
         self._create_transaction()
@@ -38,6 +75,119 @@ class BaseCoinTransaction(Transaction):
         raise NotImplementedError("BaseCoinTransaction cannot be verified")
 
 
+def _zero_suffix(big_endian_value: bytes) -> bytes:
+    return bytes(len(big_endian_value) - len(big_endian_value.lstrip(b"\x00")))
+
+
+def compact_size(value: int) -> bytes:
+    if value < 0xFD:
+        return value.to_bytes(1, "little")
+    if value <= 0xFFFF:
+        return b"\xfd" + value.to_bytes(2, "little")
+    if value <= 0xFFFFFFFF:
+        return b"\xfe" + value.to_bytes(4, "little")
+    return b"\xff" + value.to_bytes(8, "little")
+
+
+class HeaderHasher:
+    def __init__(self, partial_header: bytes, target: bytes):
+        self._midstate = hashlib.sha256(partial_header)
+        self._target = int.from_bytes(target, "big")
+        self._zero_suffix = _zero_suffix(target)
+        self._best_hash: bytes | None = None
+        self._best_suffix = b""
+
+    @property
+    def best_hash(self) -> bytes | None:
+        return self._best_hash
+
+    def hash(self, nonce: int) -> bytes:
+        header_hash = self._midstate.copy()
+        header_hash.update(nonce.to_bytes(4, "little"))
+        return hashlib.sha256(header_hash.digest()).digest()
+
+    def meets_target(self, hash_value: bytes) -> bool:
+        return hash_value.endswith(self._zero_suffix) and hash_meets_target(
+            hash_value, self._target
+        )
+
+    def sweep(self, first_nonce: int, last_nonce: int) -> int | None:
+        midstate_copy = self._midstate.copy
+        sha256 = hashlib.sha256
+        target = self._target
+        target_suffix = self._zero_suffix
+        prefilter = min(self._best_suffix, target_suffix, key=len)
+        best_value = (
+            HASH_SPACE
+            if self._best_hash is None
+            else int.from_bytes(self._best_hash, "little")
+        )
+        for nonce in range(first_nonce, last_nonce):
+            header_hash = midstate_copy()
+            header_hash.update(nonce.to_bytes(4, "little"))
+            hash_value = sha256(header_hash.digest()).digest()
+            if hash_value.endswith(prefilter):
+                value = int.from_bytes(hash_value, "little")
+                if value < best_value:
+                    best_value = value
+                    self._best_hash = hash_value
+                    self._best_suffix = _zero_suffix(hash_value[::-1])
+                    prefilter = min(self._best_suffix, target_suffix, key=len)
+                if hash_meets_target(hash_value, target):
+                    return nonce
+        return None
+
+
+def get_header_hasher(
+    partial_header: bytes, target: bytes, batched: bool = False
+) -> HeaderHasher | sha256_batch.BatchHeaderHasher:
+    if batched and sha256_batch.AVAILABLE:
+        return sha256_batch.BatchHeaderHasher(partial_header, target)
+    return HeaderHasher(partial_header, target)
+
+
+class WorkUnit:
+    def __init__(
+        self,
+        partial_header: bytes,
+        target: bytes,
+        first_nonce: int,
+        last_nonce: int,
+        extranonce: int,
+        timestamp: int,
+    ):
+        self._partial_header = partial_header
+        self._target = target
+        self._first_nonce = first_nonce
+        self._last_nonce = last_nonce
+        self._extranonce = extranonce
+        self._timestamp = timestamp
+
+    @property
+    def partial_header(self) -> bytes:
+        return self._partial_header
+
+    @property
+    def target(self) -> bytes:
+        return self._target
+
+    @property
+    def first_nonce(self) -> int:
+        return self._first_nonce
+
+    @property
+    def last_nonce(self) -> int:
+        return self._last_nonce
+
+    @property
+    def extranonce(self) -> int:
+        return self._extranonce
+
+    @property
+    def timestamp(self) -> int:
+        return self._timestamp
+
+
 class BitcoinBlock:
     def __init__(
         self,
@@ -45,9 +195,14 @@ class BitcoinBlock:
         prev_block_hash: str,
         bits: str = "0x1f010000",
         timespamp: int = int(time.time()),
+        coinbase: BaseCoinTransaction | None = None,
     ):
         self._transactions = transactions
         self._prev_block_hash = prev_block_hash
+        self._coinbase = coinbase
+        self._extranonce = 0 if coinbase is None else coinbase.extranonce
+        self._transaction_bytes = [tx.serialize() for tx in transactions]
+        self._merkle_tree = MerkleTree(Hash(tx) for tx in self._transaction_bytes)
         self._merkle_root = self._calculate_merkle_root()
         self._timestamp = timespamp
         self._bits = int(bits, 16)
@@ -56,7 +211,26 @@ class BitcoinBlock:
         self._nonce = 0
         self._partial_header = self._get_partial_header()
         self._header = self._partial_header
-        self._body = self._get_body()
+        self._body: bytes | None = None
+        self._mining_stats: MiningStats | None = None
+
+    @classmethod
+    def from_header_store(
+        cls,
+        store: HeaderStore,
+        transactions: list[CMutableTransaction],
+        timestamp: int | None = None,
+        coinbase: BaseCoinTransaction | None = None,
+    ) -> "BitcoinBlock":
+        if store.tip is None:
+            raise ValueError("Header store has no tip to build on")
+        return cls(
+            transactions,
+            store.tip.hash_hex,
+            store.next_bits(),
+            int(time.time()) if timestamp is None else timestamp,
+            coinbase,
+        )
 
     @property
     def header(self) -> bytes:
@@ -64,6 +238,8 @@ class BitcoinBlock:
 
     @property
     def body(self) -> bytes:
+        if self._body is None:
+            self._body = self._get_body()
         return self._body
 
     @property
@@ -83,29 +259,65 @@ class BitcoinBlock:
         return self._merkle_root
 
     @property
-    def block(self) -> bytes:
-        magic_number = 0xD9B4BEF9.to_bytes(4, "little")
-        header = self._header
-        transaction_counter = len(self._transactions).to_bytes(1, "little")
-        body = self._body
-        block_size = len(header) + len(transaction_counter) + len(body)
+    def timestamp(self) -> int:
+        return self._timestamp
+
+    @property
+    def extranonce(self) -> int:
+        return self._extranonce
+
+    @property
+    def mining_stats(self) -> MiningStats | None:
+        return self._mining_stats
+
+    @property
+    def block_size(self) -> int:
         return (
-            magic_number
-            + struct.pack("<L", block_size)
-            + header
-            + transaction_counter
-            + body
+            len(self._header)
+            + len(compact_size(len(self._transactions)))
+            + sum(len(tx) for tx in self._transaction_bytes)
         )
 
+    @property
+    def block(self) -> bytes:
+        return b"".join(self._get_block_parts())
+
+    def write_to(self, stream: BinaryIO) -> int:
+        written = 0
+        for part in self._get_block_parts():
+            stream.write(part)
+            written += len(part)
+        return written
+
+    def write_into(self, buffer: bytearray | memoryview, offset: int = 0) -> int:
+        view = memoryview(buffer)
+        for part in self._get_block_parts():
+            view[offset : offset + len(part)] = part
+            offset += len(part)
+        return offset
+
+    def _get_block_parts(self) -> Iterator[bytes]:
+        yield BLOCK_MAGIC
+        yield struct.pack("<L", self.block_size)
+        yield self._header
+        yield compact_size(len(self._transactions))
+        yield from self._transaction_bytes
+
     def _calculate_merkle_root(self) -> str:
-        hashes = [Hash(tx.serialize()) for tx in self._transactions]
-        while len(hashes) > 1:
-            if len(hashes) % 2 != 0:
-                hashes.append(hashes[-1])
-            hashes = [
-                Hash(hash1 + hash2) for hash1, hash2 in zip(hashes[::2], hashes[1::2])
-            ]
-        return b2lx(hashes[0])
+        return self._merkle_tree.root_hex
+
+    def _get_coinbase_merkle_root(self, coinbase: CMutableTransaction) -> str:
+        root = MerkleTree.root_from_proof(
+            Hash(coinbase.serialize()), 0, self._merkle_tree.proof(0)
+        )
+        return b2lx(root)
+
+    def _get_rolled_coinbase(self, extranonce: int) -> CMutableTransaction:
+        if self._coinbase is None:
+            raise ValueError("Extranonce rolling requires the coinbase transaction")
+        coinbase = CMutableTransaction.from_tx(self._transactions[0])
+        coinbase.vin[0].scriptSig = self._coinbase.coinbase_sig(extranonce)
+        return coinbase
 
     @staticmethod
     def _get_target(bits: str) -> bytes:
@@ -120,62 +332,207 @@ class BitcoinBlock:
         self._header = self._partial_header + nonce
         return Hash(self._header)
 
-    def _get_partial_header(self) -> bytes:
+    def _get_partial_header(
+        self, merkle_root: str | None = None, timestamp: int | None = None
+    ) -> bytes:
+        merkle_root = self._merkle_root if merkle_root is None else merkle_root
+        timestamp = self._timestamp if timestamp is None else timestamp
         return (
             struct.pack("<L", self._version)
             + bytes.fromhex(self._prev_block_hash)[::-1]
-            + bytes.fromhex(self._merkle_root)[::-1]
-            + struct.pack("<LL", self._timestamp, self._bits)
+            + bytes.fromhex(merkle_root)[::-1]
+            + struct.pack("<LL", timestamp, self._bits)
         )
 
     def _get_body(self) -> bytes:
-        return b"".join(tx.serialize() for tx in self._transactions)
-
-    def _print_hash_rate(self, start: float, end: bool = False) -> None:
-        elapsed_time = time.time() - start
-        rate = self._nonce / elapsed_time
-        if rate < 1e3:
-            unit = "H/s"
-        elif rate < 1e6:
-            rate /= 1e3
-            unit = "KH/s"
-        elif rate < 1e9:
-            rate /= 1e6
-            unit = "MH/s"
-        else:
-            rate /= 1e9
-            unit = "GH/s"
-        print(f"\r{' ' * 20}\rHash rate: {rate:.2f} {unit}", end="")
-        if end:
-            print()
-
-    def mine(self) -> bytes:
-        start = time.time()
-        while self._nonce < 2**32:
-            hash_value = self._get_hash_value()
-            if hash_value[::-1] < self._target:
-                self._print_hash_rate(start, end=True)
+        return b"".join(self._transaction_bytes)
+
+    def add_transaction(self, transaction: CMutableTransaction) -> None:
+        transaction_bytes = transaction.serialize()
+        self._transactions.append(transaction)
+        self._transaction_bytes.append(transaction_bytes)
+        self._merkle_tree.append(Hash(transaction_bytes))
+        self._body = None
+        self._reset_template()
+
+    def replace_coinbase(self, coinbase: CMutableTransaction) -> None:
+        coinbase_bytes = coinbase.serialize()
+        self._transactions[0] = coinbase
+        self._transaction_bytes[0] = coinbase_bytes
+        self._merkle_tree.replace(0, Hash(coinbase_bytes))
+        self._body = None
+        self._reset_template()
+
+    def _reset_template(self) -> None:
+        self._merkle_root = self._calculate_merkle_root()
+        self._nonce = 0
+        self._partial_header = self._get_partial_header()
+        self._header = self._partial_header
+
+    def work_units(self, chunk_size: int = NONCE_CHUNK_SIZE) -> Iterator[WorkUnit]:
+        extranonce = self.extranonce
+        timestamp = self._timestamp
+        partial_header = self._partial_header
+        first_nonce = self._nonce
+        while True:
+            for nonce in range(first_nonce, NONCE_LIMIT, chunk_size):
+                last_nonce = min(nonce + chunk_size, NONCE_LIMIT)
+                yield WorkUnit(
+                    partial_header,
+                    self._target,
+                    nonce,
+                    last_nonce,
+                    extranonce,
+                    timestamp,
+                )
+
+            first_nonce = 0
+            if self._coinbase is None:
+                timestamp += 1
+                merkle_root = self._merkle_root
+            else:
+                extranonce += 1
+                coinbase = self._get_rolled_coinbase(extranonce)
+                merkle_root = self._get_coinbase_merkle_root(coinbase)
+            partial_header = self._get_partial_header(merkle_root, timestamp)
+
+    def mine(
+        self,
+        processes: int = 1,
+        batched: bool = False,
+        monitor: MiningMonitor | None = None,
+    ) -> bytes:
+        if processes < 1:
+            raise ValueError("Number of processes must be positive")
+        if monitor is None:
+            monitor = MiningMonitor()
+            monitor.add_callback(print_hash_rate)
+        self._mining_stats = monitor.start(self._target)
+        if processes == 1:
+            return self._mine_serial(batched, monitor)
+        return self._mine_parallel(processes, batched, monitor)
+
+    def load_solution(self, unit: WorkUnit, nonce: int) -> bytes:
+        self._load_work_unit(unit, nonce)
+        return self._get_hash_value()
+
+    def _load_work_unit(self, unit: WorkUnit, nonce: int) -> None:
+        if unit.extranonce != self._extranonce:
+            self.replace_coinbase(self._get_rolled_coinbase(unit.extranonce))
+            self._extranonce = unit.extranonce
+        self._timestamp = unit.timestamp
+        self._partial_header = unit.partial_header
+        self._nonce = nonce
+
+    def _mine_serial(self, batched: bool, monitor: MiningMonitor) -> bytes:
+        for unit, nonce, best_hash in sweep_work_units(self.work_units(), batched):
+            if nonce is not None:
+                hash_value = self.load_solution(unit, nonce)
+                monitor.record(nonce - unit.first_nonce + 1, best_hash=best_hash)
+                monitor.finish()
                 return hash_value
-            self._nonce += 1
-            if self._nonce % 1000 == 0:
-                self._print_hash_rate(start)
-        raise ValueError("Nonce overflow")
+            monitor.record(unit.last_nonce - unit.first_nonce, best_hash=best_hash)
+        raise ValueError("Work units exhausted")
+
+    def _mine_parallel(
+        self, processes: int, batched: bool, monitor: MiningMonitor
+    ) -> bytes:
+        work = multiprocessing.Queue()
+        results = multiprocessing.Queue()
+        found = multiprocessing.Event()
+        workers = [
+            multiprocessing.Process(
+                target=_mine_worker,
+                args=(worker_id, batched, work, results, found),
+                daemon=True,
+            )
+            for worker_id in range(processes)
+        ]
+
+        units = self.work_units()
+        for _ in range(processes * WORK_QUEUE_DEPTH):
+            work.put(next(units))
+
+        for worker in workers:
+            worker.start()
+        try:
+            while True:
+                try:
+                    worker_id, unit, nonce, best_hash = results.get(
+                        timeout=monitor.interval
+                    )
+                except queue.Empty:
+                    if not any(worker.is_alive() for worker in workers):
+                        raise ValueError("All mining workers exited")
+                    monitor.poll()
+                    continue
+                if nonce is not None:
+                    break
+                monitor.record(unit.last_nonce - unit.first_nonce, worker_id, best_hash)
+                work.put(next(units))
+        finally:
+            found.set()
+            for _ in workers:
+                work.put(None)
+            for worker in workers:
+                worker.join()
+
+        hash_value = self.load_solution(unit, nonce)
+        monitor.record(nonce - unit.first_nonce + 1, worker_id, best_hash)
+        monitor.finish()
+        return hash_value
+
+
+def sweep_work_units(
+    units: Iterable[WorkUnit], batched: bool = False
+) -> Iterator[tuple[WorkUnit, int | None, bytes | None]]:
+    hasher = None
+    partial_header = b""
+    for unit in units:
+        if hasher is None or unit.partial_header != partial_header:
+            partial_header = unit.partial_header
+            hasher = get_header_hasher(partial_header, unit.target, batched)
+        nonce = hasher.sweep(unit.first_nonce, unit.last_nonce)
+        yield unit, nonce, hasher.best_hash
+
+
+def _mine_worker(
+    worker_id: int,
+    batched: bool,
+    work: multiprocessing.queues.Queue,
+    results: multiprocessing.queues.Queue,
+    found: multiprocessing.synchronize.Event,
+) -> None:
+    units = itertools.takewhile(lambda _: not found.is_set(), iter(work.get, None))
+    for unit, nonce, best_hash in sweep_work_units(units, batched):
+        results.put((worker_id, unit, nonce, best_hash))
+        if nonce is not None:
+            found.set()
 
 
 def main():
     data = "810199385PashaBarahimi"
     private_key = "5JWoEUpPb1BCRMTYUqNNq4L7eEAptfiz9FKsBAj7niAJWaQ6uZJ"
-    bits = "0x1f010000"  # 16 bits leading 0s
     timestamp = int(time.time())
-    _ = int(input("Enter the previous block number: "))  # unused
-    prev_hash = input("Enter the previous block hash: ")
+    path = os.environ.get(HEADER_STORE_ENV)
+    store = None if path is None else HeaderStore(path)
 
     basecoin = BaseCoinTransaction(private_key, data, Transaction.Network.MAINNET)
     tx = basecoin.create()
 
-    block = BitcoinBlock([tx], prev_hash, bits, timestamp)
+    bits = f"0x{POW_LIMIT_BITS:08x}" if store is None else store.next_bits()
+    if store is None or store.tip is None:
+        _ = int(input("Enter the previous block number: "))  # unused
+        prev_hash = input("Enter the previous block hash: ")
+        block = BitcoinBlock([tx], prev_hash, bits, timestamp, basecoin)
+    else:
+        block = BitcoinBlock.from_header_store(store, [tx], timestamp, basecoin)
     print("Mining...")
-    hash_value = block.mine()
+    hash_value = block.mine(processes=PROCESSES)
+    entry = None
+    if store is not None:
+        entry = store.add(block.header)
+        store.close()
 
     print(f"Block hash:   {b2lx(hash_value)}")
     print(f"Block header: {b2x(block.header)}")
@@ -185,9 +542,13 @@ def main():
     print(f"Merkle root:  {block.merkle_root}")
     print(f"Nonce:        {block.nonce}")
     print(f"Version:      {block.version}")
-    print(f"Timestamp:    {timestamp}")
+    print(f"Timestamp:    {block.timestamp}")
+    print(f"Extranonce:   {block.extranonce}")
     print(f"Bits:         {bits}")
     print(f"Target:       {block.target}")
+    if entry is not None:
+        print(f"Height:       {entry.height}")
+        print(f"Chainwork:    {entry.chainwork}")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,306 @@
+import csv
+import enum
+import json
+import sys
+import time
+from decimal import Decimal
+from typing import Iterable, Iterator, TextIO
+
+from bitcoin.core import COIN, CMutableTransaction, CMutableTxOut, b2x
+from bitcoin.core.script import CScript
+from bitcoin.core.serialize import VarIntSerializer
+
+from coin_selection import DUST_LIMIT, FEE_RATE, TX_OVERHEAD_SIZE, p2pkh_input_size
+from script_templates import address_to_script_pub_key
+from transaction import Transaction, UnspentTransactionOutput
+
+MAX_TRANSACTION_SIZE = 100_000
+
+
+class Payout:
+    def __init__(self, address: str, amount: int):
+        self._address = address
+        self._amount = amount
+
+    @property
+    def address(self) -> str:
+        return self._address
+
+    @property
+    def amount(self) -> int:
+        return self._amount
+
+    @property
+    def TxOut(self) -> CMutableTxOut:
+        return CMutableTxOut(self._amount, address_to_script_pub_key(self._address))
+
+
+class FundingOutput:
+    def __init__(
+        self,
+        tx_id: str,
+        index: int,
+        amount: int,
+        script_pub_key: CScript | None = None,
+    ):
+        self._tx_id = tx_id
+        self._index = index
+        self._amount = amount
+        self._script_pub_key = script_pub_key
+
+    @property
+    def tx_id(self) -> str:
+        return self._tx_id
+
+    @property
+    def index(self) -> int:
+        return self._index
+
+    @property
+    def amount(self) -> int:
+        return self._amount
+
+    @property
+    def script_pub_key(self) -> CScript | None:
+        return self._script_pub_key
+
+
+class PayoutReader:
+    class Format(enum.Enum):
+        CSV = "csv"
+        JSONL = "jsonl"
+
+    def __init__(self, file: TextIO, format: Format):
+        self._file = file
+        self._format = format
+
+    @classmethod
+    def format_of(cls, path: str) -> Format:
+        if path.endswith(".csv"):
+            return cls.Format.CSV
+        if path.endswith((".jsonl", ".ndjson")):
+            return cls.Format.JSONL
+        raise ValueError(f"Unknown payout file format: {path}")
+
+    def __iter__(self) -> Iterator[Payout]:
+        if self._format == self.Format.CSV:
+            rows = csv.DictReader(self._file)
+        else:
+            rows = (json.loads(line) for line in self._file if line.strip())
+        for row in rows:
+            yield Payout(row["address"], to_satoshis(row["amount"]))
+
+
+def to_satoshis(amount: str | float) -> int:
+    satoshis = Decimal(str(amount)) * COIN
+    if satoshis != satoshis.to_integral_value() or satoshis <= 0:
+        raise ValueError(f"Invalid payout amount: {amount}")
+    return int(satoshis)
+
+
+class PayoutStats:
+    def __init__(self):
+        self._transactions = 0
+        self._outputs = 0
+        self._amount = 0
+        self._fees = 0
+        self._start = time.perf_counter()
+        self._elapsed_time = 0.0
+
+    def __str__(self):
+        return (
+            f"Transactions:      {self.transactions}\n"
+            f"Payouts:           {self.outputs}\n"
+            f"Amount paid:       {Decimal(self.amount) / COIN} BTC\n"
+            f"Fees:              {Decimal(self.fees) / COIN} BTC\n"
+            f"Elapsed time:      {self.elapsed_time:.2f} s\n"
+            f"Transactions/s:    {self.transactions_per_second:.2f}\n"
+            f"Outputs/s:         {self.outputs_per_second:.2f}"
+        )
+
+    @property
+    def transactions(self) -> int:
+        return self._transactions
+
+    @property
+    def outputs(self) -> int:
+        return self._outputs
+
+    @property
+    def amount(self) -> int:
+        return self._amount
+
+    @property
+    def fees(self) -> int:
+        return self._fees
+
+    @property
+    def elapsed_time(self) -> float:
+        return self._elapsed_time
+
+    @property
+    def transactions_per_second(self) -> float:
+        return self._transactions / self._elapsed_time if self._elapsed_time else 0.0
+
+    @property
+    def outputs_per_second(self) -> float:
+        return self._outputs / self._elapsed_time if self._elapsed_time else 0.0
+
+    def record(self, payouts: list[Payout], fee: int) -> None:
+        self._transactions += 1
+        self._outputs += len(payouts)
+        self._amount += sum(payout.amount for payout in payouts)
+        self._fees += fee
+        self._elapsed_time = time.perf_counter() - self._start
+
+
+class _PayoutBatch:
+    def __init__(self):
+        self.inputs: list[FundingOutput] = []
+        self.payouts: list[Payout] = []
+        self.txouts: list[CMutableTxOut] = []
+        self.funded = 0
+        self.required = 0
+        self.outputs_size = 0
+
+    def add_input(self, funding: FundingOutput) -> None:
+        self.inputs.append(funding)
+        self.funded += funding.amount
+
+    def add_output(self, payout: Payout, txout: CMutableTxOut, size: int) -> None:
+        self.payouts.append(payout)
+        self.txouts.append(txout)
+        self.required += payout.amount
+        self.outputs_size += size
+
+    def remove_last_output(self, size: int) -> None:
+        payout = self.payouts.pop()
+        self.txouts.pop()
+        self.required -= payout.amount
+        self.outputs_size -= size
+
+    def remove_inputs(self, inputs: list[FundingOutput]) -> None:
+        del self.inputs[len(self.inputs) - len(inputs) :]
+        self.funded -= sum(funding.amount for funding in inputs)
+
+
+class PayoutBuilder:
+    def __init__(
+        self,
+        private_key: str,
+        funding: Iterable[FundingOutput],
+        network: Transaction.Network = Transaction.Network.TESTNET,
+        max_size: int = MAX_TRANSACTION_SIZE,
+        fee_rate: int = FEE_RATE,
+        processes: int = 1,
+    ):
+        self._signer = Transaction(private_key, network)
+        self._funding = iter(funding)
+        self._max_size = max_size
+        self._fee_rate = fee_rate
+        self._processes = processes
+        self._change_script = self._signer.my_P2PKH_script_pub_key()
+        self._input_size = p2pkh_input_size(len(self._signer.public_key))
+        self._change_size = len(CMutableTxOut(0, self._change_script).serialize())
+        self._stats = PayoutStats()
+
+    @property
+    def stats(self) -> PayoutStats:
+        return self._stats
+
+    def build(self, payouts: Iterable[Payout]) -> Iterator[CMutableTransaction]:
+        batch = _PayoutBatch()
+        for payout in payouts:
+            txout = payout.TxOut
+            txout_size = len(txout.serialize())
+            batch.add_output(payout, txout, txout_size)
+            added = self._fund(batch)
+            if not self._fits(batch) and len(batch.payouts) > 1:
+                batch.remove_last_output(txout_size)
+                batch.remove_inputs(added)
+                yield self._sign(batch)
+                batch = _PayoutBatch()
+                for funding in added:
+                    batch.add_input(funding)
+                batch.add_output(payout, txout, txout_size)
+                self._fund(batch)
+            if not self._fits(batch):
+                raise ValueError(
+                    f"Payout to {payout.address} does not fit in "
+                    f"{self._max_size} bytes"
+                )
+        if batch.payouts:
+            yield self._sign(batch)
+
+    def write(self, payouts: Iterable[Payout], file: TextIO) -> PayoutStats:
+        for tx in self.build(payouts):
+            file.write(f"{b2x(tx.serialize())}\n")
+        return self._stats
+
+    def _fund(self, batch: _PayoutBatch) -> list[FundingOutput]:
+        added = []
+        while batch.funded < batch.required + self._get_fee(batch):
+            funding = next(self._funding, None)
+            if funding is None:
+                raise ValueError("Not enough funds for the payouts")
+            batch.add_input(funding)
+            added.append(funding)
+        return added
+
+    def _fits(self, batch: _PayoutBatch) -> bool:
+        return self._estimate_size(batch) + self._change_size <= self._max_size
+
+    def _sign(self, batch: _PayoutBatch) -> CMutableTransaction:
+        txouts = list(batch.txouts)
+        change = batch.funded - batch.required - self._get_fee(batch)
+        if change >= DUST_LIMIT:
+            txouts.append(CMutableTxOut(change, self._change_script))
+
+        utxos = [
+            UnspentTransactionOutput(
+                funding.tx_id,
+                funding.index,
+                funding.script_pub_key or self._change_script,
+            )
+            for funding in batch.inputs
+        ]
+        tx = self._signer.sign_prepared(utxos, txouts, self._processes)
+        fee = batch.funded - sum(txout.nValue for txout in txouts)
+        self._stats.record(batch.payouts, fee)
+        return tx
+
+    def _get_fee(self, batch: _PayoutBatch) -> int:
+        return (self._estimate_size(batch) + self._change_size) * self._fee_rate
+
+    def _estimate_size(self, batch: _PayoutBatch) -> int:
+        return (
+            TX_OVERHEAD_SIZE
+            + len(VarIntSerializer.serialize(len(batch.inputs)))
+            + len(batch.inputs) * self._input_size
+            + len(VarIntSerializer.serialize(len(batch.txouts) + 1))
+            + batch.outputs_size
+        )
+
+
+def read_funding(file: TextIO) -> Iterator[FundingOutput]:
+    for row in csv.DictReader(file):
+        yield FundingOutput(row["tx_id"], int(row["index"]), to_satoshis(row["amount"]))
+
+
+def main():
+    private_key = "92Zh9ENA7DeNBr3FXa1QMLi4igPAzUKy44TEPMW7rogBtGz4CaR"
+    payouts_path, funding_path, output_path = sys.argv[1:4]
+
+    with (
+        open(payouts_path) as payouts_file,
+        open(funding_path) as funding_file,
+        open(output_path, "w") as output_file,
+    ):
+        builder = PayoutBuilder(private_key, read_funding(funding_file))
+        payouts = PayoutReader(payouts_file, PayoutReader.format_of(payouts_path))
+        stats = builder.write(payouts, output_file)
+    print(stats)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+import functools
+
+from bitcoin.core.script import (
+    OP_2,
+    OP_3,
+    OP_CHECKMULTISIG,
+    OP_CHECKSIG,
+    OP_DUP,
+    OP_EQUAL,
+    OP_EQUALVERIFY,
+    OP_HASH160,
+    CScript,
+)
+
+import base58check
+
+ADDRESS_CACHE_SIZE = 4096
+HASH160_SIZE = 20
+P2PKH_VERSIONS = (0x00, 0x6F)
+P2SH_VERSIONS = (0x05, 0xC4)
+PUBLIC_KEY_SIZES = (33, 65)
+
+P2PKH_PREFIX = bytes([OP_DUP, OP_HASH160, HASH160_SIZE])
+P2PKH_SUFFIX = bytes([OP_EQUALVERIFY, OP_CHECKSIG])
+P2SH_PREFIX = bytes([OP_HASH160, HASH160_SIZE])
+P2SH_SUFFIX = bytes([OP_EQUAL])
+MULTI_SIG_2_OF_3_PREFIX = bytes([OP_2])
+MULTI_SIG_2_OF_3_SUFFIX = bytes([OP_3, OP_CHECKMULTISIG])
+
+
+def P2PKH_script_pub_key(pub_key_hash: bytes) -> CScript:
+    if len(pub_key_hash) != HASH160_SIZE:
+        raise ValueError("Invalid public key hash")
+    return CScript(P2PKH_PREFIX + pub_key_hash + P2PKH_SUFFIX)
+
+
+def P2SH_script_pub_key(script_hash: bytes) -> CScript:
+    if len(script_hash) != HASH160_SIZE:
+        raise ValueError("Invalid script hash")
+    return CScript(P2SH_PREFIX + script_hash + P2SH_SUFFIX)
+
+
+def multi_sig_2_of_3(pub1: bytes, pub2: bytes, pub3: bytes) -> CScript:
+    pushes = []
+    for pub in (pub1, pub2, pub3):
+        if len(pub) not in PUBLIC_KEY_SIZES:
+            raise ValueError("Invalid public key")
+        pushes.append(bytes([len(pub)]) + pub)
+    return CScript(MULTI_SIG_2_OF_3_PREFIX + b"".join(pushes) + MULTI_SIG_2_OF_3_SUFFIX)
+
+
+@functools.lru_cache(maxsize=ADDRESS_CACHE_SIZE)
+def address_to_script_pub_key(address: str) -> CScript:
+    payload = base58check.decode(address)
+    if len(payload) != HASH160_SIZE + 1:
+        raise ValueError("Invalid address")
+    version, hash160 = payload[0], payload[1:]
+    if version in P2PKH_VERSIONS:
+        return P2PKH_script_pub_key(hash160)
+    if version in P2SH_VERSIONS:
+        return P2SH_script_pub_key(hash160)
+    raise ValueError("Invalid address")
@@ -0,0 +1,159 @@
+import collections
+import multiprocessing
+from typing import Iterable, Iterator
+
+from bitcoin.core import CMutableTransaction
+from bitcoin.core.script import CScript
+from bitcoin.core.scripteval import SCRIPT_VERIFY_P2SH
+
+import template_verify
+from sighash import SighashCache
+
+VERIFY_CACHE_SIZE = 10_000
+VERIFY_CHUNK_SIZE = 16
+DEFAULT_FLAGS = (SCRIPT_VERIFY_P2SH,)
+
+_worker_tx: CMutableTransaction | None = None
+_worker_sighashes: SighashCache | None = None
+
+
+class InputVerification:
+    def __init__(self, index: int, error: str | None = None, cached: bool = False):
+        self._index = index
+        self._error = error
+        self._cached = cached
+
+    def __str__(self):
+        status = "ok" if self.passed else f"failed: {self.error}"
+        cached = " (cached)" if self.cached else ""
+        return f"Input {self.index}: {status}{cached}"
+
+    @property
+    def index(self) -> int:
+        return self._index
+
+    @property
+    def passed(self) -> bool:
+        return self._error is None
+
+    @property
+    def error(self) -> str | None:
+        return self._error
+
+    @property
+    def cached(self) -> bool:
+        return self._cached
+
+
+class VerificationReport:
+    def __init__(self, results: Iterable[InputVerification]):
+        self._results = sorted(results, key=lambda result: result.index)
+
+    def __str__(self):
+        return "\n".join(str(result) for result in self._results)
+
+    def __iter__(self) -> Iterator[InputVerification]:
+        return iter(self._results)
+
+    def __len__(self) -> int:
+        return len(self._results)
+
+    def __getitem__(self, index: int) -> InputVerification:
+        return self._results[index]
+
+    @property
+    def passed(self) -> bool:
+        return all(result.passed for result in self._results)
+
+    @property
+    def failures(self) -> list[InputVerification]:
+        return [result for result in self._results if not result.passed]
+
+    @property
+    def cache_hits(self) -> int:
+        return sum(result.cached for result in self._results)
+
+
+class BatchVerifier:
+    def __init__(self, cache_size: int = VERIFY_CACHE_SIZE):
+        if cache_size < 0:
+            raise ValueError("Cache size must not be negative")
+        self._cache_size = cache_size
+        self._cache: collections.OrderedDict[tuple, None] = collections.OrderedDict()
+
+    @property
+    def cache_size(self) -> int:
+        return self._cache_size
+
+    def __len__(self) -> int:
+        return len(self._cache)
+
+    def clear(self) -> None:
+        self._cache.clear()
+
+    def verify(
+        self,
+        tx: CMutableTransaction,
+        script_pub_keys: list[CScript],
+        flags: Iterable[object] = DEFAULT_FLAGS,
+        processes: int = 1,
+    ) -> VerificationReport:
+        if processes < 1:
+            raise ValueError("Number of processes must be positive")
+        if len(script_pub_keys) != len(tx.vin):
+            raise ValueError("Expected one script pub key per transaction input")
+        flags = frozenset(flags)
+        sighashes = SighashCache(tx)
+
+        results = []
+        pending = []
+        for i, script_pub_key in enumerate(script_pub_keys):
+            key = (
+                sighashes.sighash(script_pub_key, i),
+                bytes(tx.vin[i].scriptSig),
+                bytes(script_pub_key),
+                flags,
+            )
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                results.append(InputVerification(i, cached=True))
+            else:
+                pending.append((key, (i, script_pub_key, flags)))
+
+        checks = [check for _, check in pending]
+        if processes == 1 or len(checks) <= VERIFY_CHUNK_SIZE:
+            errors = [
+                template_verify.verify_input(tx, *check, sighashes) for check in checks
+            ]
+        else:
+            with multiprocessing.Pool(
+                processes, initializer=_init_worker, initargs=(tx,)
+            ) as pool:
+                errors = pool.starmap(_verify_worker_input, checks, VERIFY_CHUNK_SIZE)
+
+        for (key, (i, _, _)), error in zip(pending, errors):
+            if error is None:
+                self._remember(key)
+            results.append(InputVerification(i, error))
+        return VerificationReport(results)
+
+    def _remember(self, key: tuple) -> None:
+        if self._cache_size == 0:
+            return
+        self._cache[key] = None
+        if len(self._cache) > self._cache_size:
+            self._cache.popitem(last=False)
+
+
+def _init_worker(tx: CMutableTransaction) -> None:
+    global _worker_tx, _worker_sighashes
+    _worker_tx = tx
+    _worker_sighashes = SighashCache(tx)
+
+
+def _verify_worker_input(
+    index: int, script_pub_key: CScript, flags: frozenset
+) -> str | None:
+    return template_verify.verify_input(
+        _worker_tx, index, script_pub_key, flags, _worker_sighashes
+    )
@@ -0,0 +1,136 @@
+import hashlib
+import struct
+
+from header_store import hash_meets_target
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+AVAILABLE = np is not None
+BATCH_SIZE = 2**14
+
+K = [
+    0x428A2F98, 0x71374491, 0xB5C0FBCF, 0xE9B5DBA5, 0x3956C25B, 0x59F111F1, 0x923F82A4, 0xAB1C5ED5,
+    0xD807AA98, 0x12835B01, 0x243185BE, 0x550C7DC3, 0x72BE5D74, 0x80DEB1FE, 0x9BDC06A7, 0xC19BF174,
+    0xE49B69C1, 0xEFBE4786, 0x0FC19DC6, 0x240CA1CC, 0x2DE92C6F, 0x4A7484AA, 0x5CB0A9DC, 0x76F988DA,
+    0x983E5152, 0xA831C66D, 0xB00327C8, 0xBF597FC7, 0xC6E00BF3, 0xD5A79147, 0x06CA6351, 0x14292967,
+    0x27B70A85, 0x2E1B2138, 0x4D2C6DFC, 0x53380D13, 0x650A7354, 0x766A0ABB, 0x81C2C92E, 0x92722C85,
+    0xA2BFE8A1, 0xA81A664B, 0xC24B8B70, 0xC76C51A3, 0xD192E819, 0xD6990624, 0xF40E3585, 0x106AA070,
+    0x19A4C116, 0x1E376C08, 0x2748774C, 0x34B0BCB5, 0x391C0CB3, 0x4ED8AA4A, 0x5B9CCA4F, 0x682E6FF3,
+    0x748F82EE, 0x78A5636F, 0x84C87814, 0x8CC70208, 0x90BEFFFA, 0xA4506CEB, 0xBEF9A3F7, 0xC67178F2,
+]  # fmt: skip
+INITIAL_STATE = [
+    0x6A09E667, 0xBB67AE85, 0x3C6EF372, 0xA54FF53A,
+    0x510E527F, 0x9B05688C, 0x1F83D9AB, 0x5BE0CD19,
+]  # fmt: skip
+HEADER_TAIL_PADDING = [0x80000000] + [0] * 10 + [80 * 8]
+DIGEST_PADDING = [0x80000000] + [0] * 6 + [32 * 8]
+
+
+def _rotr(x, n: int):
+    return (x >> np.uint32(n)) | (x << np.uint32(32 - n))
+
+
+def _compress(state: list, words: list) -> list:
+    words = list(words)
+    for i in range(16, 64):
+        w15, w2 = words[i - 15], words[i - 2]
+        s0 = _rotr(w15, 7) ^ _rotr(w15, 18) ^ (w15 >> np.uint32(3))
+        s1 = _rotr(w2, 17) ^ _rotr(w2, 19) ^ (w2 >> np.uint32(10))
+        words.append(words[i - 16] + s0 + words[i - 7] + s1)
+
+    a, b, c, d, e, f, g, h = state
+    for i in range(64):
+        s1 = _rotr(e, 6) ^ _rotr(e, 11) ^ _rotr(e, 25)
+        choice = (e & f) ^ (~e & g)
+        temp1 = h + s1 + choice + np.uint32(K[i]) + words[i]
+        s0 = _rotr(a, 2) ^ _rotr(a, 13) ^ _rotr(a, 22)
+        majority = (a & b) ^ (a & c) ^ (b & c)
+        temp2 = s0 + majority
+        a, b, c, d, e, f, g, h = temp1 + temp2, a, b, c, d + temp1, e, f, g
+
+    return [x + y for x, y in zip(state, [a, b, c, d, e, f, g, h])]
+
+
+def _to_words(values: list[int]) -> list:
+    return [np.uint32(value) for value in values]
+
+
+def _byte_swap(x):
+    return (
+        (x >> np.uint32(24))
+        | ((x >> np.uint32(8)) & np.uint32(0xFF00))
+        | ((x << np.uint32(8)) & np.uint32(0xFF0000))
+        | (x << np.uint32(24))
+    )
+
+
+class BatchHeaderHasher:
+    def __init__(
+        self, partial_header: bytes, target: bytes, batch_size: int = BATCH_SIZE
+    ):
+        if not AVAILABLE:
+            raise RuntimeError("NumPy is required for batched header hashing")
+        if len(partial_header) != 76:
+            raise ValueError("Partial header must be 76 bytes")
+        self._partial_header = partial_header
+        self._target = int.from_bytes(target, "big")
+        self._target_top_word = np.uint32(int.from_bytes(target[:4], "big"))
+        self._batch_size = batch_size
+        self._best_hash: bytes | None = None
+
+        with np.errstate(over="ignore"):
+            first_block = _to_words(struct.unpack(">16L", partial_header[:64]))
+            self._midstate = _compress(_to_words(INITIAL_STATE), first_block)
+        self._tail_words = _to_words(struct.unpack(">3L", partial_header[64:]))
+
+    @property
+    def batch_size(self) -> int:
+        return self._batch_size
+
+    @property
+    def best_hash(self) -> bytes | None:
+        return self._best_hash
+
+    def hash(self, nonce: int) -> bytes:
+        header = self._partial_header + nonce.to_bytes(4, "little")
+        return hashlib.sha256(hashlib.sha256(header).digest()).digest()
+
+    def search(self, first_nonce: int, last_nonce: int):
+        nonces = np.arange(first_nonce, last_nonce, dtype=np.uint64).astype(np.uint32)
+        with np.errstate(over="ignore"):
+            words = (
+                self._tail_words + [_byte_swap(nonces)] + _to_words(HEADER_TAIL_PADDING)
+            )
+            header_digest = _compress(self._midstate, words)
+            digest = _compress(
+                _to_words(INITIAL_STATE), header_digest + _to_words(DIGEST_PADDING)
+            )
+        top_words = _byte_swap(digest[7])
+        self._update_best_hash(int(nonces[top_words.argmin()]))
+        candidates = nonces[top_words <= self._target_top_word]
+        return np.array(
+            [
+                nonce
+                for nonce in candidates.tolist()
+                if hash_meets_target(self.hash(nonce), self._target)
+            ],
+            dtype=np.uint32,
+        )
+
+    def _update_best_hash(self, nonce: int) -> None:
+        hash_value = self.hash(nonce)
+        if self._best_hash is None or int.from_bytes(
+            hash_value, "little"
+        ) < int.from_bytes(self._best_hash, "little"):
+            self._best_hash = hash_value
+
+    def sweep(self, first_nonce: int, last_nonce: int) -> int | None:
+        for batch_start in range(first_nonce, last_nonce, self._batch_size):
+            batch_end = min(batch_start + self._batch_size, last_nonce)
+            found = self.search(batch_start, batch_end)
+            if len(found):
+                return int(found[0])
+        return None
@@ -0,0 +1,132 @@
+import multiprocessing
+import struct
+
+import bitcoin.wallet
+from bitcoin.core import CMutableTransaction, Hash
+from bitcoin.core.script import (
+    OP_CODESEPARATOR,
+    SIGHASH_ALL,
+    SIGHASH_ANYONECANPAY,
+    CScript,
+    FindAndDelete,
+    SignatureHash,
+)
+from bitcoin.core.serialize import BytesSerializer, VarIntSerializer
+
+SIGNING_CHUNK_SIZE = 16
+
+
+class SighashCache:
+    def __init__(self, tx: CMutableTransaction):
+        self._tx = tx
+        self._version = struct.pack("<i", tx.nVersion)
+        self._input_count = VarIntSerializer.serialize(len(tx.vin))
+        self._outpoints = [txin.prevout.serialize() for txin in tx.vin]
+        self._sequences = [struct.pack("<I", txin.nSequence) for txin in tx.vin]
+        self._blank_inputs = [
+            outpoint + b"\x00" + sequence
+            for outpoint, sequence in zip(self._outpoints, self._sequences)
+        ]
+        self._outputs = VarIntSerializer.serialize(len(tx.vout)) + b"".join(
+            txout.serialize() for txout in tx.vout
+        )
+        self._lock_time = struct.pack("<I", tx.nLockTime)
+        self._script_codes: dict[bytes, bytes] = {}
+
+    def sighash(
+        self, script_pub_key: CScript, index: int, hashtype: int = SIGHASH_ALL
+    ) -> bytes:
+        if not 0 <= index < len(self._outpoints):
+            raise IndexError("Transaction input index out of range")
+        if hashtype & 0x1F != SIGHASH_ALL:
+            return SignatureHash(script_pub_key, self._tx, index, hashtype)
+
+        signed_input = (
+            self._outpoints[index]
+            + self._get_script_code(script_pub_key)
+            + self._sequences[index]
+        )
+        if hashtype & SIGHASH_ANYONECANPAY:
+            inputs = [b"\x01", signed_input]
+        else:
+            inputs = [
+                self._input_count,
+                *self._blank_inputs[:index],
+                signed_input,
+                *self._blank_inputs[index + 1 :],
+            ]
+        return Hash(
+            b"".join(
+                [
+                    self._version,
+                    *inputs,
+                    self._outputs,
+                    self._lock_time,
+                    struct.pack("<i", hashtype),
+                ]
+            )
+        )
+
+    def _get_script_code(self, script_pub_key: CScript) -> bytes:
+        script_code = self._script_codes.get(script_pub_key)
+        if script_code is None:
+            script_code = BytesSerializer.serialize(
+                FindAndDelete(script_pub_key, CScript([OP_CODESEPARATOR]))
+            )
+            self._script_codes[script_pub_key] = script_code
+        return script_code
+
+
+def sign_sighashes(
+    private_key: bitcoin.wallet.CBitcoinSecret,
+    sighashes: list[bytes],
+    hashtype: int = SIGHASH_ALL,
+    processes: int = 1,
+) -> list[bytes]:
+    return sign_with_keys(
+        [private_key] * len(sighashes), sighashes, hashtype, processes
+    )
+
+
+def sign_with_keys(
+    private_keys: list[bitcoin.wallet.CBitcoinSecret],
+    sighashes: list[bytes],
+    hashtype: int = SIGHASH_ALL,
+    processes: int = 1,
+) -> list[bytes]:
+    if processes < 1:
+        raise ValueError("Number of processes must be positive")
+    if len(private_keys) != len(sighashes):
+        raise ValueError("Expected one private key per sighash")
+    if processes == 1 or len(sighashes) <= SIGNING_CHUNK_SIZE:
+        return [
+            _sign(private_key, sighash, hashtype)
+            for private_key, sighash in zip(private_keys, sighashes)
+        ]
+
+    secrets = {
+        id(private_key): (bytes(private_key[0:32]), private_key.is_compressed)
+        for private_key in private_keys
+    }
+    with multiprocessing.Pool(processes) as pool:
+        return pool.starmap(
+            _sign_with_secret,
+            [
+                (secrets[id(private_key)], sighash, hashtype)
+                for private_key, sighash in zip(private_keys, sighashes)
+            ],
+            chunksize=SIGNING_CHUNK_SIZE,
+        )
+
+
+def _sign(
+    private_key: bitcoin.wallet.CBitcoinSecret, sighash: bytes, hashtype: int
+) -> bytes:
+    return private_key.sign(sighash) + bytes([hashtype])  # type: ignore
+
+
+def _sign_with_secret(
+    secret: tuple[bytes, bool], sighash: bytes, hashtype: int
+) -> bytes:
+    private_key = bitcoin.wallet.CBitcoinSecret.from_secret_bytes(*secret)
+    return _sign(private_key, sighash, hashtype)
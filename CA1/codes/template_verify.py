@@ -0,0 +1,258 @@
+import enum
+import functools
+
+import bitcoin.core.key
+from bitcoin.core import CMutableTransaction, ValidationError
+from bitcoin.core._bignum import bn2vch, vch2bn
+from bitcoin.core.script import (
+    MAX_SCRIPT_ELEMENT_SIZE,
+    MAX_SCRIPT_SIZE,
+    OP_1,
+    OP_1NEGATE,
+    OP_2DUP,
+    OP_16,
+    OP_ADD,
+    OP_CHECKMULTISIG,
+    OP_CHECKSIG,
+    OP_DUP,
+    OP_EQUAL,
+    OP_EQUALVERIFY,
+    OP_HASH160,
+    OP_PUSHDATA4,
+    OP_SUB,
+    SIGHASH_ALL,
+    CScript,
+    CScriptInvalidError,
+    Hash160,
+    RawSignatureHash,
+)
+from bitcoin.core.scripteval import (
+    MAX_NUM_SIZE,
+    MAX_STACK_ITEMS,
+    SCRIPT_VERIFY_P2SH,
+    VerifyScript,
+)
+
+from sighash import SighashCache
+
+TEMPLATE_CACHE_SIZE = 1024
+PUBLIC_KEY_CACHE_SIZE = 1024
+TEMPLATE_FLAGS = frozenset([SCRIPT_VERIFY_P2SH])
+HASH160_SIZE = 20
+PUBLIC_KEY_SIZES = (33, 65)
+
+
+class ScriptTemplate:
+    class Kind(enum.Enum):
+        P2PKH = "p2pkh"
+        MULTI_SIG = "multi_sig"
+        SUM_DIFF_PUZZLE = "sum_diff_puzzle"
+
+    def __init__(
+        self,
+        kind: Kind,
+        hashes: tuple[bytes, ...] = (),
+        public_keys: tuple[bytes, ...] = (),
+        required: int = 0,
+    ):
+        self._kind = kind
+        self._hashes = hashes
+        self._public_keys = public_keys
+        self._required = required
+
+    def __repr__(self):
+        return f"ScriptTemplate({self._kind.value})"
+
+    @property
+    def kind(self) -> Kind:
+        return self._kind
+
+    @property
+    def hashes(self) -> tuple[bytes, ...]:
+        return self._hashes
+
+    @property
+    def public_keys(self) -> tuple[bytes, ...]:
+        return self._public_keys
+
+    @property
+    def required(self) -> int:
+        return self._required
+
+
+@functools.lru_cache(maxsize=TEMPLATE_CACHE_SIZE)
+def match_template(script_pub_key: bytes) -> ScriptTemplate | None:
+    try:
+        ops = list(CScript(script_pub_key).raw_iter())
+    except CScriptInvalidError:
+        return None
+    codes = [op for op, _, _ in ops]
+    data = [op_data for _, op_data, _ in ops]
+
+    if codes[:2] == [OP_DUP, OP_HASH160] and codes[3:] == [OP_EQUALVERIFY, OP_CHECKSIG]:
+        if len(ops) == 5 and _is_hash(ops[2]):
+            return ScriptTemplate(ScriptTemplate.Kind.P2PKH, (data[2],))
+
+    if (
+        len(ops) == 9
+        and codes[:3] == [OP_2DUP, OP_ADD, OP_HASH160]
+        and codes[4:7] == [OP_EQUALVERIFY, OP_SUB, OP_HASH160]
+        and codes[8] == OP_EQUAL
+        and _is_hash(ops[3])
+        and _is_hash(ops[7])
+    ):
+        return ScriptTemplate(ScriptTemplate.Kind.SUM_DIFF_PUZZLE, (data[3], data[7]))
+
+    if len(ops) >= 4 and codes[-1] == OP_CHECKMULTISIG:
+        required = _small_int(codes[0])
+        total = _small_int(codes[-2])
+        public_keys = tuple(data[1:-2])
+        if (
+            required is not None
+            and total is not None
+            and 1 <= required <= total == len(public_keys)
+            and all(
+                code <= OP_PUSHDATA4 and len(op_data) in PUBLIC_KEY_SIZES
+                for code, op_data in zip(codes[1:-2], public_keys)
+            )
+        ):
+            return ScriptTemplate(
+                ScriptTemplate.Kind.MULTI_SIG,
+                public_keys=public_keys,
+                required=required,
+            )
+    return None
+
+
+def verify_input(
+    tx: CMutableTransaction,
+    index: int,
+    script_pub_key: CScript,
+    flags: frozenset,
+    sighashes: SighashCache,
+) -> str | None:
+    script_sig = tx.vin[index].scriptSig
+    template = match_template(bytes(script_pub_key))
+    stack = _push_stack(script_sig) if flags <= TEMPLATE_FLAGS else None
+    if template is None or stack is None:
+        return _verify_script(tx, index, script_pub_key, flags)
+
+    if template.kind == ScriptTemplate.Kind.P2PKH:
+        if not stack:
+            return "MissingOpArgumentsError: OP_DUP missing arguments"
+        if Hash160(stack[-1]) != template.hashes[0]:
+            return "VerifyOpFailedError: OP_EQUALVERIFY failed"
+        if len(stack) < 2:
+            return "MissingOpArgumentsError: OP_CHECKSIG missing arguments"
+        signature, public_key = stack[-2], stack[-1]
+        if signature == template.hashes[0]:
+            return _verify_script(tx, index, script_pub_key, flags)
+        if not _check_signature(
+            signature, public_key, script_pub_key, tx, index, sighashes
+        ):
+            return "VerifyScriptError: scriptPubKey returned false"
+        return None
+
+    if template.kind == ScriptTemplate.Kind.MULTI_SIG:
+        required = template.required
+        if len(stack) < required:
+            return "ArgumentsInvalidError: not enough sigs on stack"
+        if len(stack) < required + 1:
+            return "ArgumentsInvalidError: missing dummy value"
+        signatures = stack[: -required - 1 : -1]
+        public_keys = template.public_keys[::-1]
+        if any(signature in public_keys for signature in signatures):
+            return _verify_script(tx, index, script_pub_key, flags)
+
+        remaining_keys = len(public_keys)
+        remaining_signatures = required
+        for public_key in public_keys:
+            signature = signatures[required - remaining_signatures]
+            if _check_signature(
+                signature, public_key, script_pub_key, tx, index, sighashes
+            ):
+                remaining_signatures -= 1
+                if remaining_signatures == 0:
+                    return None
+            remaining_keys -= 1
+            if remaining_signatures > remaining_keys:
+                break
+        return "VerifyScriptError: scriptPubKey returned false"
+
+    if len(stack) < 2:
+        return "MissingOpArgumentsError: OP_2DUP missing arguments"
+    if len(stack[-1]) > MAX_NUM_SIZE or len(stack[-2]) > MAX_NUM_SIZE:
+        return "EvalScriptError: CastToBigNum() : overflow"
+    first, second = vch2bn(stack[-2]), vch2bn(stack[-1])
+    if Hash160(bn2vch(first + second)) != template.hashes[0]:
+        return "VerifyOpFailedError: OP_EQUALVERIFY failed"
+    if Hash160(bn2vch(first - second)) != template.hashes[1]:
+        return "VerifyScriptError: scriptPubKey returned false"
+    return None
+
+
+def _verify_script(
+    tx: CMutableTransaction, index: int, script_pub_key: CScript, flags: frozenset
+) -> str | None:
+    try:
+        VerifyScript(tx.vin[index].scriptSig, script_pub_key, tx, index, flags)
+    except (ValidationError, CScriptInvalidError) as e:
+        return f"{type(e).__name__}: {e}"
+    return None
+
+
+def _check_signature(
+    signature: bytes,
+    public_key: bytes,
+    script_pub_key: CScript,
+    tx: CMutableTransaction,
+    index: int,
+    sighashes: SighashCache,
+) -> bool:
+    if not signature:
+        return False
+    hashtype = signature[-1]
+    if hashtype & 0x1F == SIGHASH_ALL:
+        sighash = sighashes.sighash(script_pub_key, index, hashtype)
+    else:
+        sighash, _ = RawSignatureHash(script_pub_key, tx, index, hashtype)
+    return _public_key(public_key).verify(sighash, signature[:-1])
+
+
+@functools.lru_cache(maxsize=PUBLIC_KEY_CACHE_SIZE)
+def _public_key(public_key: bytes) -> bitcoin.core.key.CECKey:
+    key = bitcoin.core.key.CECKey()
+    key.set_pubkey(public_key)
+    return key
+
+
+def _push_stack(script_sig: CScript) -> list[bytes] | None:
+    if len(script_sig) > MAX_SCRIPT_SIZE:
+        return None
+    stack = []
+    try:
+        for op, op_data, _ in script_sig.raw_iter():
+            if op <= OP_PUSHDATA4:
+                if len(op_data) > MAX_SCRIPT_ELEMENT_SIZE:
+                    return None
+                stack.append(op_data)
+            elif op == OP_1NEGATE or OP_1 <= op <= OP_16:
+                stack.append(bn2vch(op - (OP_1 - 1)))
+            else:
+                return None
+    except CScriptInvalidError:
+        return None
+    if len(stack) > MAX_STACK_ITEMS // 2:
+        return None
+    return stack
+
+
+def _is_hash(op: tuple) -> bool:
+    code, op_data, _ = op
+    return code <= OP_PUSHDATA4 and len(op_data) == HASH160_SIZE
+
+
+def _small_int(code: int) -> int | None:
+    if OP_1 <= code <= OP_16:
+        return code - (OP_1 - 1)
+    return None
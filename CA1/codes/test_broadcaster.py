@@ -0,0 +1,62 @@
+import http.server
+import threading
+import unittest
+
+from broadcaster import Broadcaster
+
+RAW_TRANSACTION = bytes(60)
+
+
+class _PushHandler(http.server.BaseHTTPRequestHandler):
+    def do_POST(self):
+        self.rfile.read(int(self.headers["Content-Length"]))
+        self.server.posts += 1
+        self.send_response(201)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, *_):
+        pass
+
+
+class BroadcasterTest(unittest.TestCase):
+    def setUp(self):
+        self._server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), _PushHandler)
+        self._server.posts = 0
+        self._thread = threading.Thread(target=self._server.serve_forever)
+        self._thread.start()
+        host, port = self._server.server_address
+        self._url = f"http://{host}:{port}/txs/push"
+
+    def tearDown(self):
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread.join()
+
+    def test_accepted_txids_are_per_broadcaster(self):
+        with Broadcaster(self._url) as first, Broadcaster(self._url) as second:
+            self.assertTrue(first.broadcast(RAW_TRANSACTION).accepted)
+            self.assertTrue(first.broadcast(RAW_TRANSACTION).duplicate)
+            self.assertTrue(second.broadcast(RAW_TRANSACTION).accepted)
+        self.assertEqual(2, self._server.posts)
+
+    def test_request_errors_become_failed_results(self):
+        for url in ("http://", "http://127.0.0.1:1/txs/push"):
+            with Broadcaster(url, retries=1, backoff=0) as broadcaster:
+                result = broadcaster.broadcast(RAW_TRANSACTION)
+            self.assertFalse(result.accepted)
+            self.assertIsNotNone(result.error)
+            self.assertEqual(2, result.attempts)
+
+
+class BroadcasterLoopTest(unittest.IsolatedAsyncioTestCase):
+    async def test_sync_broadcast_refuses_running_loop(self):
+        with Broadcaster("http://127.0.0.1:1/txs/push", retries=0) as broadcaster:
+            with self.assertRaises(RuntimeError):
+                broadcaster.broadcast(RAW_TRANSACTION)
+            result = await broadcaster.broadcast_async(RAW_TRANSACTION)
+        self.assertIsNotNone(result.error)
+
+
+if __name__ == "__main__":
+    unittest.main()
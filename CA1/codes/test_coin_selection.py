@@ -0,0 +1,68 @@
+import random
+import unittest
+from decimal import Decimal
+
+from bitcoin.core import COIN
+
+from coin_selection import P2PKH_OUTPUT_SIZE, CoinSelection, CoinSelector
+from transaction import Destination, Transaction
+from utxo_store import StoredUtxo, UtxoStore
+
+PRIVATE_KEY = "92Zh9ENA7DeNBr3FXa1QMLi4igPAzUKy44TEPMW7rogBtGz4CaR"
+SEED = 19
+UTXOS = 2_000
+PAYMENT = 5_000_000
+EXACT_PAYMENT = 777_777
+
+
+class CoinSelectorTest(unittest.TestCase):
+    def setUp(self):
+        self._tx = Transaction(PRIVATE_KEY)
+        rng = random.Random(SEED)
+        script_pub_key = self._tx.my_P2PKH_script_pub_key()
+        self._store = UtxoStore()
+        self._store.add_many(
+            StoredUtxo(f"{i:064x}", 0, script_pub_key, self._tx.address, amount)
+            for i, amount in enumerate(
+                rng.randrange(10_000, 10**7) for _ in range(UTXOS)
+            )
+        )
+
+    def tearDown(self):
+        self._store.close()
+
+    def _payment(self) -> Destination:
+        return Destination(self._tx.address, Decimal(PAYMENT) / COIN)
+
+    def test_select_is_reproducible(self):
+        selector = CoinSelector(self._store)
+        selections = [
+            selector.select(self._tx.address, EXACT_PAYMENT, 1, P2PKH_OUTPUT_SIZE)
+            for _ in range(3)
+        ]
+        self.assertEqual(
+            CoinSelection.Algorithm.BRANCH_AND_BOUND, selections[0].algorithm
+        )
+        outpoints = [
+            [(utxo.tx_id, utxo.index) for utxo in selection.utxos]
+            for selection in selections
+        ]
+        self.assertEqual([outpoints[0]] * len(selections), outpoints)
+        self.assertEqual(1, len({selection.change for selection in selections}))
+
+    def test_fund_replaces_change(self):
+        self._tx.add_destination(self._payment())
+        selector = CoinSelector(self._store, candidates=0)
+        first = selector.fund(self._tx)
+        second = selector.fund(self._tx)
+
+        self.assertNotEqual(0, first.change)
+        self.assertEqual(first.change, second.change)
+        self.assertEqual(
+            [PAYMENT, second.change],
+            [destination.TxOut.nValue for destination in self._tx.destinations],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,40 @@
+import unittest
+
+import sha256_batch
+from part3 import HeaderHasher
+
+PARTIAL_HEADER = bytes(range(76))
+TARGET = bytes(1) + b"\xff" * 31
+FIRST_NONCE = 220_000
+LAST_NONCE = 240_000
+
+
+class HeaderHasherTest(unittest.TestCase):
+    def setUp(self):
+        hasher = HeaderHasher(PARTIAL_HEADER, TARGET)
+        self._expected = [
+            nonce
+            for nonce in range(FIRST_NONCE, LAST_NONCE)
+            if hasher.meets_target(hasher.hash(nonce))
+        ]
+
+    def _sweep_all(self, hasher) -> list[int]:
+        nonces = []
+        nonce = hasher.sweep(FIRST_NONCE, LAST_NONCE)
+        while nonce is not None:
+            nonces.append(nonce)
+            nonce = hasher.sweep(nonce + 1, LAST_NONCE)
+        return nonces
+
+    def test_reused_hasher_finds_every_nonce(self):
+        hasher = HeaderHasher(PARTIAL_HEADER, TARGET)
+        self.assertEqual(self._expected, self._sweep_all(hasher))
+
+    @unittest.skipUnless(sha256_batch.AVAILABLE, "NumPy is not installed")
+    def test_batched_hasher_matches(self):
+        hasher = sha256_batch.BatchHeaderHasher(PARTIAL_HEADER, TARGET)
+        self.assertEqual(self._expected, self._sweep_all(hasher))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,30 @@
+import unittest
+
+import bitcoin
+
+from keystore import KeyMaterial
+
+MAINNET_WIF = "5JWoEUpPb1BCRMTYUqNNq4L7eEAptfiz9FKsBAj7niAJWaQ6uZJ"
+TESTNET_WIF = "92Zh9ENA7DeNBr3FXa1QMLi4igPAzUKy44TEPMW7rogBtGz4CaR"
+
+
+class KeyMaterialTest(unittest.TestCase):
+    def tearDown(self):
+        bitcoin.SelectParams("mainnet")
+
+    def test_keys_do_not_touch_selected_params(self):
+        for network in ("mainnet", "testnet"):
+            bitcoin.SelectParams(network)
+            for wif in (MAINNET_WIF, TESTNET_WIF):
+                key = KeyMaterial(wif)
+                self.assertEqual(wif, str(key.secret))
+                self.assertEqual(network, bitcoin.params.NAME)
+
+    def test_network_comes_from_the_wif(self):
+        self.assertEqual("mainnet", KeyMaterial(MAINNET_WIF).network)
+        self.assertEqual("testnet", KeyMaterial(TESTNET_WIF).network)
+        self.assertTrue(KeyMaterial(MAINNET_WIF).address.startswith("1"))
+
+
+if __name__ == "__main__":
+    unittest.main()
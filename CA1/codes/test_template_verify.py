@@ -0,0 +1,163 @@
+import random
+import unittest
+
+from bitcoin.core import (
+    COIN,
+    CMutableTransaction,
+    CMutableTxIn,
+    CMutableTxOut,
+    COutPoint,
+    Hash160,
+    ValidationError,
+)
+from bitcoin.core.script import (
+    OP_NOP,
+    SIGHASH_ALL,
+    SIGHASH_ANYONECANPAY,
+    SIGHASH_NONE,
+    SIGHASH_SINGLE,
+    CScript,
+    CScriptInvalidError,
+    RawSignatureHash,
+)
+from bitcoin.core.scripteval import VerifyScript
+from bitcoin.wallet import CKey
+
+import template_verify
+from part2_q3_2 import (
+    PRIME_NUM1_IN_BYTES,
+    PRIME_NUM2_IN_BYTES,
+    SCRIPT_SUM_DIFF_PUB_KEY,
+)
+from script_templates import P2PKH_script_pub_key, multi_sig_2_of_3
+from script_verify import DEFAULT_FLAGS
+from sighash import SighashCache
+
+SEED = 21
+MUTATIONS = 1_000
+VALID_INPUTS = [0, 1, 2, 8, 9, 10, 11, 12, 18, 19, 24]
+
+
+def _sign_input(
+    tx: CMutableTransaction,
+    index: int,
+    script_pub_key: CScript,
+    key: CKey,
+    hashtype: int = SIGHASH_ALL,
+) -> bytes:
+    sighash, _ = RawSignatureHash(script_pub_key, tx, index, hashtype)
+    return key.sign(sighash) + bytes([hashtype])
+
+
+def template_cases(
+    rng: random.Random,
+) -> tuple[CMutableTransaction, list[CScript]]:
+    keys = [CKey(rng.randbytes(32), compressed=bool(i % 2)) for i in range(4)]
+    p2pkh = P2PKH_script_pub_key(Hash160(keys[0].pub))
+    multi_sig = multi_sig_2_of_3(keys[0].pub, keys[1].pub, keys[2].pub)
+    script_pub_keys = [p2pkh] * 10 + [multi_sig] * 9 + [SCRIPT_SUM_DIFF_PUB_KEY] * 6
+    tx = CMutableTransaction(
+        [
+            CMutableTxIn(COutPoint(rng.randbytes(32), i))
+            for i in range(len(script_pub_keys))
+        ],
+        [CMutableTxOut(COIN, p2pkh)],
+    )
+    sig = lambda i, key, hashtype=SIGHASH_ALL: _sign_input(
+        tx, i, script_pub_keys[i], key, hashtype
+    )
+    bad = lambda signature: signature[:10] + bytes([signature[10] ^ 1]) + signature[11:]
+    pub = keys[0].pub
+    script_sigs = [
+        [sig(0, keys[0]), pub],
+        [sig(1, keys[0], SIGHASH_NONE), pub],
+        [sig(2, keys[0], SIGHASH_SINGLE), pub],
+        [bad(sig(3, keys[0])), pub],
+        [sig(4, keys[3]), pub],
+        [sig(5, keys[3]), keys[3].pub],
+        [pub, sig(6, keys[0])],
+        [pub],
+        [b"\x01", sig(8, keys[0]), pub],
+        CScript([OP_NOP, sig(9, keys[0]), pub]),  # type: ignore
+        [b"", sig(10, keys[0]), sig(10, keys[1])],
+        [b"", sig(11, keys[0]), sig(11, keys[2])],
+        [b"", sig(12, keys[1]), sig(12, keys[2])],
+        [b"", sig(13, keys[1]), sig(13, keys[0])],
+        [sig(14, keys[0]), sig(14, keys[1])],
+        [b"", sig(15, keys[0]), sig(15, keys[0])],
+        [b"", sig(16, keys[0]), bad(sig(16, keys[1]))],
+        [b"", sig(17, keys[3]), sig(17, keys[1])],
+        [b"", sig(18, keys[0], SIGHASH_ALL | SIGHASH_ANYONECANPAY), sig(18, keys[2])],
+        [PRIME_NUM1_IN_BYTES, PRIME_NUM2_IN_BYTES],
+        [PRIME_NUM2_IN_BYTES, PRIME_NUM1_IN_BYTES],
+        [b"\x01", b"\x02"],
+        [PRIME_NUM1_IN_BYTES + bytes(3), PRIME_NUM2_IN_BYTES],
+        [PRIME_NUM2_IN_BYTES],
+        [b"\x00", PRIME_NUM1_IN_BYTES, PRIME_NUM2_IN_BYTES],
+    ]
+    for txin, script_sig in zip(tx.vin, script_sigs):
+        txin.scriptSig = CScript(script_sig)
+    return tx, script_pub_keys
+
+
+def _mutate(script_sig: bytes, rng: random.Random) -> bytes:
+    position = rng.randrange(len(script_sig))
+    mutation = rng.randrange(4)
+    if mutation == 0:
+        byte = script_sig[position] ^ (1 << rng.randrange(8))
+        return script_sig[:position] + bytes([byte]) + script_sig[position + 1 :]
+    if mutation == 1:
+        return script_sig[:position] + script_sig[position + 1 :]
+    if mutation == 2:
+        return script_sig[:position] + rng.randbytes(1) + script_sig[position:]
+    return script_sig[:position]
+
+
+class TemplateVerifierTest(unittest.TestCase):
+    def setUp(self):
+        self._rng = random.Random(SEED)
+        self._tx, self._script_pub_keys = template_cases(self._rng)
+        self._sighashes = SighashCache(self._tx)
+
+    def _assert_agrees(self, index: int) -> bool:
+        script_pub_key = self._script_pub_keys[index]
+        error = template_verify.verify_input(
+            self._tx, index, script_pub_key, frozenset(DEFAULT_FLAGS), self._sighashes
+        )
+        try:
+            VerifyScript(
+                self._tx.vin[index].scriptSig,
+                script_pub_key,
+                self._tx,
+                index,
+                DEFAULT_FLAGS,
+            )
+            expected = True
+        except (ValidationError, CScriptInvalidError):
+            expected = False
+        self.assertEqual(
+            expected,
+            error is None,
+            f"input {index}: {self._tx.vin[index].scriptSig.hex()} {error}",
+        )
+        return expected
+
+    def test_fixed_cases_match_verify_script(self):
+        accepted = [
+            i for i in range(len(self._script_pub_keys)) if self._assert_agrees(i)
+        ]
+        self.assertEqual(VALID_INPUTS, accepted)
+
+    def test_mutated_script_sigs_match_verify_script(self):
+        originals = {i: bytes(self._tx.vin[i].scriptSig) for i in VALID_INPUTS}
+        for _ in range(MUTATIONS):
+            index = self._rng.choice(VALID_INPUTS)
+            self._tx.vin[index].scriptSig = CScript(
+                _mutate(originals[index], self._rng)
+            )
+            self._assert_agrees(index)
+            self._tx.vin[index].scriptSig = CScript(originals[index])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,39 @@
+import unittest
+
+from bitcoin.core import COIN, CMutableTxOut
+
+from script_verify import BatchVerifier
+from transaction import Transaction, UnspentTransactionOutput
+
+PRIVATE_KEY = "92Zh9ENA7DeNBr3FXa1QMLi4igPAzUKy44TEPMW7rogBtGz4CaR"
+MAINNET_PRIVATE_KEY = "5JWoEUpPb1BCRMTYUqNNq4L7eEAptfiz9FKsBAj7niAJWaQ6uZJ"
+
+
+def _signed(tx: Transaction) -> Transaction:
+    script_pub_key = tx.my_P2PKH_script_pub_key()
+    tx.sign_prepared(
+        [UnspentTransactionOutput("11" * 32, 0, script_pub_key)],
+        [CMutableTxOut(COIN, script_pub_key)],
+    )
+    return tx
+
+
+class TransactionTest(unittest.TestCase):
+    def test_verifier_is_injected_or_per_transaction(self):
+        verifier = BatchVerifier()
+        _signed(Transaction(PRIVATE_KEY, verifier=verifier))
+        self.assertEqual(1, len(verifier))
+        _signed(Transaction(PRIVATE_KEY))
+        self.assertEqual(1, len(verifier))
+        _signed(Transaction(PRIVATE_KEY, verifier=verifier))
+        self.assertEqual(2, len(verifier))
+
+    def test_key_from_another_network_is_rejected(self):
+        with self.assertRaises(ValueError):
+            Transaction(MAINNET_PRIVATE_KEY, Transaction.Network.TESTNET)
+        with self.assertRaises(ValueError):
+            Transaction(PRIVATE_KEY, Transaction.Network.MAINNET)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,150 @@
+import asyncio
+import json
+import os
+import tempfile
+import time
+import unittest
+
+from bitcoin.core import (
+    COIN,
+    CMutableTransaction,
+    CMutableTxIn,
+    CMutableTxOut,
+    COutPoint,
+    Hash,
+)
+from bitcoin.core.script import CScript
+
+from header_store import HeaderStore
+from part3 import BitcoinBlock
+from work_client import WorkClient
+from work_server import WorkServer
+
+EASY_BITS = 0x1F00FFFF
+HARD_BITS = "0x1d00ffff"
+CHUNK_SIZE = 2**12
+WORKERS = 3
+CHAINED_BLOCKS = 3
+
+
+def _block(store: HeaderStore | None = None, bits: str = HARD_BITS) -> BitcoinBlock:
+    coinbase = CMutableTransaction(
+        [CMutableTxIn(COutPoint(), CScript([os.urandom(8)]))],  # type: ignore
+        [CMutableTxOut(COIN, CScript([os.urandom(20)]))],  # type: ignore
+    )
+    if store is None:
+        return BitcoinBlock([coinbase], "00" * 32, bits)
+    if store.tip is None:
+        return BitcoinBlock([coinbase], "00" * 32, store.next_bits())
+    return BitcoinBlock.from_header_store(store, [coinbase])
+
+
+class _Connection:
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self._reader = reader
+        self._writer = writer
+
+    @classmethod
+    async def open(cls, server: WorkServer) -> "_Connection":
+        return cls(*await asyncio.open_connection(*server.address))
+
+    async def request(self, message: dict) -> dict:
+        self._writer.write(json.dumps(message).encode() + b"\n")
+        await self._writer.drain()
+        return json.loads(await self._reader.readline())
+
+    async def get_work(self) -> dict:
+        return await self.request({"method": "get_work"})
+
+    async def submit(self, work: dict, shares: list, hashes: object = 0) -> dict:
+        return await self.request(
+            {
+                "method": "submit",
+                "job": work["job"],
+                "unit": work["unit"],
+                "shares": shares,
+                "hashes": hashes,
+            }
+        )
+
+    async def close(self) -> None:
+        self._writer.close()
+        await self._writer.wait_closed()
+
+
+class WorkServerTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self._directory = tempfile.TemporaryDirectory()
+        self._server = WorkServer(port=0, chunk_size=CHUNK_SIZE)
+        await self._server.start()
+
+    async def asyncTearDown(self):
+        await self._server.close()
+        self._directory.cleanup()
+
+    async def test_workers_solve_chained_blocks(self):
+        path = os.path.join(self._directory.name, "headers.dat")
+        with HeaderStore(path, EASY_BITS) as store:
+            block = _block(store)
+            self._server.set_block(block)
+            host, port = self._server.address
+            clients = [WorkClient(host, port) for _ in range(WORKERS)]
+            tasks = [asyncio.create_task(client.run()) for client in clients]
+
+            for _ in range(CHAINED_BLOCKS):
+                hash_value = await asyncio.wait_for(self._server.solve(), 60)
+                self.assertEqual(Hash(block.header), hash_value)
+                store.add(block.header)
+                block = _block(store)
+                self._server.set_block(block)
+
+            await self._server.close()
+            await asyncio.gather(*tasks)
+            self.assertEqual(CHAINED_BLOCKS - 1, store.tip.height)
+        self.assertEqual(0, self._server.rejected)
+        self.assertTrue(all(client.units for client in clients))
+
+    async def test_stalled_unit_is_reassigned(self):
+        self._server.set_block(_block())
+        staller = await _Connection.open(self._server)
+        worker = await _Connection.open(self._server)
+        stalled = await staller.get_work()
+
+        self.assertEqual(0, self._server.expire_stalled())
+        self.assertEqual(1, self._server.expire_stalled(time.monotonic() + 60))
+        reassigned = await worker.get_work()
+        self.assertEqual(stalled["unit"], reassigned["unit"])
+        self.assertEqual(stalled["first_nonce"], reassigned["first_nonce"])
+        self.assertEqual(1, self._server.reassigned)
+        self.assertNotEqual(stalled["unit"], (await staller.get_work())["unit"])
+        await staller.close()
+        await worker.close()
+
+    async def test_submit_after_set_block_is_stale(self):
+        self._server.set_block(_block())
+        connection = await _Connection.open(self._server)
+        work = await connection.get_work()
+        self._server.set_block(_block())
+
+        result = await connection.submit(work, [work["first_nonce"]])
+        self.assertTrue(result["stale"])
+        self.assertEqual(0, result["accepted"])
+        self.assertEqual(1, self._server.stale)
+        self.assertEqual(self._server.job, (await connection.get_work())["job"])
+        await connection.close()
+
+    async def test_malformed_submit_is_rejected(self):
+        self._server.set_block(_block())
+        connection = await _Connection.open(self._server)
+        work = await connection.get_work()
+
+        for shares, hashes in (([1.0], 0), ([True], 0), ("1", 0), ([], 1.5)):
+            result = await connection.submit(work, shares, hashes)
+            self.assertEqual("error", result["method"])
+        self.assertEqual(0, self._server.rejected)
+        self.assertEqual("work", (await connection.get_work())["method"])
+        await connection.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,7 +1,8 @@
 import enum
+from decimal import Decimal
+from typing import TYPE_CHECKING
 
-import base58
-import bitcoin.wallet
+import bitcoin
 import requests
 from bitcoin.core import (
     COIN,
@@ -9,23 +10,21 @@ from bitcoin.core import (
     CMutableTxIn,
     CMutableTxOut,
     COutPoint,
-    Hash160,
-    b2x,
+    b2lx,
     lx,
 )
 from bitcoin.core.script import *
-from bitcoin.core.scripteval import SCRIPT_VERIFY_P2SH, VerifyScript
+from bitcoin.core.scripteval import SCRIPT_VERIFY_P2SH
 
-TRANSACTION_BROADCAST_URL = "https://api.blockcypher.com/v1/btc/test3/txs/push"
+from broadcaster import Broadcaster
+from keystore import KeyMaterial
+from multisig import MultiSigSpend
+from script_templates import address_to_script_pub_key
+from script_verify import BatchVerifier, VerificationReport
+from sighash import SighashCache, sign_sighashes
 
-
-def address_to_pub_key_hash160(address: str) -> bytes:
-    pub_key_hash = base58.b58decode_check(address)[1:]
-    return pub_key_hash
-
-
-def P2PKH_script_pub_key(pub_key_hash: bytes) -> CScript:
-    return CScript([OP_DUP, OP_HASH160, pub_key_hash, OP_EQUALVERIFY, OP_CHECKSIG])  # type: ignore
+if TYPE_CHECKING:
+    from utxo_store import UtxoStore
 
 
 class Destination:
@@ -34,7 +33,7 @@ class Destination:
     ):
         self._address = address
         self._script_pub_key = (
-            P2PKH_script_pub_key(address_to_pub_key_hash160(address))
+            address_to_script_pub_key(address)
             if script_pub_key is None
             else script_pub_key
         )
@@ -96,20 +95,44 @@ class Transaction:
         MAINNET = "mainnet"
         TESTNET = "testnet"
 
-    def __init__(self, private_key: str, network: Network = Network.TESTNET):
+    def __init__(
+        self,
+        private_key: str | KeyMaterial,
+        network: Network = Network.TESTNET,
+        broadcaster: Broadcaster | None = None,
+        verifier: BatchVerifier | None = None,
+    ):
         self._network = network
+        self._verifier = BatchVerifier() if verifier is None else verifier
+        self._owns_broadcaster = broadcaster is None
+        self._broadcaster = Broadcaster() if broadcaster is None else broadcaster
         bitcoin.SelectParams(self._network.value)
 
-        self._private_key = bitcoin.wallet.CBitcoinSecret(private_key)
-        self._public_key = self._private_key.pub
-        self._address = bitcoin.wallet.P2PKHBitcoinAddress.from_pubkey(self._public_key)
+        if isinstance(private_key, str):
+            private_key = KeyMaterial(private_key)
+        if private_key.network != self._network.value:
+            raise ValueError("Private key does not belong to the network")
+        self._key = private_key
+        self._private_key = private_key.secret
+        self._public_key = private_key.public_key
         self._destinations = []
+        self._change: Destination | None = None
         self._utxos = []
+        self._utxo_store: "UtxoStore | None" = None
+        self._multisig: MultiSigSpend | None = None
         self._tx = CMutableTransaction()
 
     @property
     def address(self) -> str:
-        return str(self._address)
+        return self._key.address
+
+    @property
+    def public_key(self) -> bytes:
+        return bytes(self._public_key)
+
+    @property
+    def destinations(self) -> list[Destination]:
+        return list(self._destinations)
 
     def add_destination(self, destination: Destination) -> None:
         self._destinations.append(destination)
@@ -117,7 +140,25 @@ class Transaction:
     def add_utxo(self, utxo: UnspentTransactionOutput) -> None:
         self._utxos.append(utxo)
 
-    def create(self) -> requests.Response:
+    def set_inputs(
+        self,
+        utxos: list[UnspentTransactionOutput],
+        store: "UtxoStore | None" = None,
+    ) -> None:
+        self._utxos = list(utxos)
+        self._utxo_store = store
+
+    def set_change(self, amount: int) -> None:
+        if amount < 0:
+            raise ValueError("Change amount must not be negative")
+        if self._change is not None:
+            self._destinations.remove(self._change)
+            self._change = None
+        if amount:
+            self._change = Destination(self.address, Decimal(amount) / COIN)
+            self._destinations.append(self._change)
+
+    def create(self, processes: int = 1) -> requests.Response:
         if not self._destinations:
             raise ValueError("No destinations were added to the transaction")
         if not self._utxos:
@@ -125,47 +166,96 @@ class Transaction:
                 "No unspent transaction outputs were added to the transaction"
             )
         self._create_transaction()
-        self._verify()
-        return self._broadcast_transaction()
+        self._sign(processes)
+        self._verify(processes)
+        if self._utxo_store is None:
+            return self._broadcast_transaction()
+
+        tx_id = b2lx(self._tx.GetTxid())
+        self._utxo_store.mark_spent(self._utxos, tx_id)
+        try:
+            response = self._broadcast_transaction()
+        except Exception:
+            self._utxo_store.release(tx_id)
+            raise
+        if not response.ok:
+            self._utxo_store.release(tx_id)
+        return response
+
+    def sign_prepared(
+        self,
+        utxos: list[UnspentTransactionOutput],
+        txouts: list[CMutableTxOut],
+        processes: int = 1,
+    ) -> CMutableTransaction:
+        if not utxos or not txouts:
+            raise ValueError("Prepared transaction needs inputs and outputs")
+        self._utxos = list(utxos)
+        self._multisig = None
+        self._tx = CMutableTransaction([utxo.TxIn for utxo in self._utxos], txouts)
+        self._sign(processes)
+        self._verify(processes)
+        return self._tx
 
     def my_P2PKH_script_pub_key(self) -> CScript:
-        return P2PKH_script_pub_key(Hash160(self._public_key))
+        return self._key.script_pub_key
 
-    def _my_P2PKH_script_sig(self, txin_script_pub_key: CScript) -> CScript:
-        signature = self._create_OP_CHECKSIG_signature(txin_script_pub_key)
+    def _my_P2PKH_script_sig(self, signature: bytes) -> CScript:
         return CScript([signature, self._public_key])  # type: ignore
 
+    def multisig_spend(self) -> MultiSigSpend:
+        self._create_transaction()
+        self._multisig = MultiSigSpend(
+            self._tx, [utxo.script_pub_key for utxo in self._utxos]
+        )
+        return self._multisig
+
     def _create_transaction(self) -> None:
         txins = [utxo.TxIn for utxo in self._utxos]
         txouts = [destination.TxOut for destination in self._destinations]
         self._tx = CMutableTransaction(txins, txouts)
 
-    def _create_OP_CHECKSIG_signature(self, txin_script_pub_key: CScript) -> bytes:
-        sighash = SignatureHash(txin_script_pub_key, self._tx, 0, SIGHASH_ALL)
-        sig = self._private_key.sign(sighash) + bytes([SIGHASH_ALL])  # type: ignore
-        return sig
-
-    def _verify(self):
-        for i, _ in enumerate(self._utxos):
-            txin_script_pub_key = self._utxos[i].script_pub_key
-            txin_script_sig = self._utxos[i].custom_sig
-            if txin_script_sig is None:
-                txin_script_sig = self._my_P2PKH_script_sig(txin_script_pub_key)
-            self._tx.vin[i].scriptSig = txin_script_sig
-            VerifyScript(
-                self._tx.vin[i].scriptSig,
-                txin_script_pub_key,
-                self._tx,
-                i,
-                (SCRIPT_VERIFY_P2SH,),
-            )
+    def _sign(self, processes: int = 1) -> None:
+        multisig = {}
+        if self._multisig is not None:
+            if self._multisig.tx_id != b2lx(self._tx.GetTxid()):
+                raise ValueError("Transaction changed after multisig signing")
+            multisig = self._multisig.script_sigs()
+        cache = SighashCache(self._tx)
+        unsigned = [
+            i
+            for i, utxo in enumerate(self._utxos)
+            if utxo.custom_sig is None and i not in multisig
+        ]
+        sighashes = [cache.sighash(self._utxos[i].script_pub_key, i) for i in unsigned]
+        signatures = sign_sighashes(self._private_key, sighashes, processes=processes)
+        for i, utxo in enumerate(self._utxos):
+            if utxo.custom_sig is not None:
+                self._tx.vin[i].scriptSig = utxo.custom_sig
+        for i, script_sig in multisig.items():
+            self._tx.vin[i].scriptSig = script_sig
+        for i, signature in zip(unsigned, signatures):
+            self._tx.vin[i].scriptSig = self._my_P2PKH_script_sig(signature)
+
+    def verify(self, processes: int = 1) -> VerificationReport:
+        return self._verifier.verify(
+            self._tx,
+            [utxo.script_pub_key for utxo in self._utxos],
+            (SCRIPT_VERIFY_P2SH,),
+            processes,
+        )
+
+    def _verify(self, processes: int = 1) -> None:
+        report = self.verify(processes)
+        if not report.passed:
+            raise ValueError(f"Transaction failed verification\n{report}")
 
     def _broadcast_transaction(self) -> requests.Response:
-        raw_transaction = b2x(self._tx.serialize())
-        headers = {"content-type": "application/x-www-form-urlencoded"}
-        return requests.post(
-            TRANSACTION_BROADCAST_URL,
-            headers=headers,
-            data='{"tx": "%s"}' % raw_transaction,
-            timeout=60,
-        )
+        try:
+            result = self._broadcaster.broadcast(self._tx.serialize())
+        finally:
+            if self._owns_broadcaster:
+                self._broadcaster.close()
+        if result.response is None:
+            raise result.error
+        return result.response
@@ -0,0 +1,160 @@
+import sqlite3
+from typing import Iterable, Iterator
+
+from bitcoin.core.script import CScript
+
+from transaction import UnspentTransactionOutput
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS utxos (
+    tx_id TEXT NOT NULL,
+    output_index INTEGER NOT NULL,
+    address TEXT NOT NULL,
+    amount INTEGER NOT NULL,
+    script_pub_key BLOB NOT NULL,
+    spent_by TEXT,
+    PRIMARY KEY (tx_id, output_index)
+);
+CREATE INDEX IF NOT EXISTS unspent_by_address_amount
+    ON utxos (address, amount) WHERE spent_by IS NULL;
+CREATE INDEX IF NOT EXISTS utxos_by_spender
+    ON utxos (spent_by) WHERE spent_by IS NOT NULL;
+"""
+COLUMNS = "tx_id, output_index, address, amount, script_pub_key"
+
+
+class StoredUtxo(UnspentTransactionOutput):
+    def __init__(
+        self,
+        tx_id: str,
+        index: int,
+        script_pub_key: CScript,
+        address: str,
+        amount: int,
+    ):
+        super().__init__(tx_id, index, script_pub_key)
+        self._address = address
+        self._amount = amount
+
+    def __repr__(self):
+        return f"StoredUtxo({self.tx_id}:{self.index}, {self.amount})"
+
+    @property
+    def address(self) -> str:
+        return self._address
+
+    @property
+    def amount(self) -> int:
+        return self._amount
+
+    @classmethod
+    def _from_row(cls, row: tuple) -> "StoredUtxo":
+        tx_id, index, address, amount, script_pub_key = row
+        return cls(tx_id, index, CScript(script_pub_key), address, amount)
+
+
+class UtxoStore:
+    def __init__(self, path: str = ":memory:"):
+        self._connection = sqlite3.connect(path)
+        self._connection.executescript(SCHEMA)
+
+    def __enter__(self) -> "UtxoStore":
+        return self
+
+    def __exit__(self, *_) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        return self._connection.execute(
+            "SELECT COUNT(*) FROM utxos WHERE spent_by IS NULL"
+        ).fetchone()[0]
+
+    def close(self) -> None:
+        self._connection.close()
+
+    def add(self, utxo: StoredUtxo) -> None:
+        self.add_many([utxo])
+
+    def add_many(self, utxos: Iterable[StoredUtxo]) -> None:
+        with self._connection:
+            self._connection.executemany(
+                f"INSERT OR IGNORE INTO utxos ({COLUMNS}) VALUES (?, ?, ?, ?, ?)",
+                (
+                    (
+                        utxo.tx_id,
+                        utxo.index,
+                        utxo.address,
+                        utxo.amount,
+                        bytes(utxo.script_pub_key),
+                    )
+                    for utxo in utxos
+                ),
+            )
+
+    def get(self, tx_id: str, index: int) -> StoredUtxo | None:
+        row = self._connection.execute(
+            f"SELECT {COLUMNS} FROM utxos"
+            " WHERE tx_id = ? AND output_index = ? AND spent_by IS NULL",
+            (tx_id, index),
+        ).fetchone()
+        return None if row is None else StoredUtxo._from_row(row)
+
+    def balance(self, address: str) -> int:
+        return self._connection.execute(
+            "SELECT COALESCE(SUM(amount), 0) FROM utxos"
+            " WHERE address = ? AND spent_by IS NULL",
+            (address,),
+        ).fetchone()[0]
+
+    def smallest_at_least(self, address: str, amount: int) -> StoredUtxo | None:
+        row = self._connection.execute(
+            f"SELECT {COLUMNS} FROM utxos"
+            " WHERE address = ? AND spent_by IS NULL AND amount >= ?"
+            " ORDER BY amount LIMIT 1",
+            (address, amount),
+        ).fetchone()
+        return None if row is None else StoredUtxo._from_row(row)
+
+    def largest_first(
+        self,
+        address: str,
+        below: int | None = None,
+        above: int = 0,
+        limit: int = -1,
+    ) -> Iterator[StoredUtxo]:
+        rows = self._connection.execute(
+            f"SELECT {COLUMNS} FROM utxos"
+            " WHERE address = ? AND spent_by IS NULL AND amount > ? AND amount < ?"
+            " ORDER BY amount DESC LIMIT ?",
+            (address, above, 2**63 - 1 if below is None else below, limit),
+        )
+        for row in rows:
+            yield StoredUtxo._from_row(row)
+
+    def sample(
+        self, address: str, count: int, below: int, above: int = 0
+    ) -> list[StoredUtxo]:
+        utxos = {}
+        span = below - above - 1
+        for i in range(count if span > 0 else 0):
+            utxo = self.smallest_at_least(address, above + 1 + span * i // count)
+            if utxo is not None and utxo.amount < below:
+                utxos[utxo.tx_id, utxo.index] = utxo
+        return sorted(utxos.values(), key=lambda utxo: utxo.amount, reverse=True)
+
+    def mark_spent(self, utxos: Iterable[UnspentTransactionOutput], tx_id: str) -> None:
+        outpoints = [(tx_id, utxo.tx_id, utxo.index) for utxo in utxos]
+        with self._connection:
+            cursor = self._connection.executemany(
+                "UPDATE utxos SET spent_by = ?"
+                " WHERE tx_id = ? AND output_index = ? AND spent_by IS NULL",
+                outpoints,
+            )
+            if cursor.rowcount != len(outpoints):
+                raise ValueError("Unspent transaction output is missing or spent")
+
+    def release(self, tx_id: str) -> None:
+        with self._connection:
+            self._connection.execute(
+                "UPDATE utxos SET spent_by = NULL WHERE spent_by = ?", (tx_id,)
+            )
@@ -0,0 +1,149 @@
+import asyncio
+import json
+import multiprocessing
+import sys
+
+from bitcoin.core import x
+
+from part3 import WorkUnit, get_header_hasher
+from work_server import HOST, PORT
+
+PROCESSES = multiprocessing.cpu_count()
+CONNECT_RETRIES = 10
+CONNECT_DELAY = 1.0
+
+
+def sweep_shares(
+    unit: WorkUnit, share_target: bytes, batched: bool = False
+) -> list[int]:
+    shares = []
+    first_nonce = unit.first_nonce
+    while first_nonce < unit.last_nonce:
+        hasher = get_header_hasher(unit.partial_header, share_target, batched)
+        nonce = hasher.sweep(first_nonce, unit.last_nonce)
+        if nonce is None:
+            break
+        shares.append(nonce)
+        first_nonce = nonce + 1
+    return shares
+
+
+class WorkClient:
+    def __init__(self, host: str = HOST, port: int = PORT, batched: bool = False):
+        self._host = host
+        self._port = port
+        self._batched = batched
+        self._units = 0
+        self._hashes = 0
+        self._accepted = 0
+        self._rejected = 0
+        self._stale = 0
+
+    @property
+    def units(self) -> int:
+        return self._units
+
+    @property
+    def hashes(self) -> int:
+        return self._hashes
+
+    @property
+    def accepted(self) -> int:
+        return self._accepted
+
+    @property
+    def rejected(self) -> int:
+        return self._rejected
+
+    @property
+    def stale(self) -> int:
+        return self._stale
+
+    async def run(self, max_units: int | None = None) -> None:
+        loop = asyncio.get_running_loop()
+        reader, writer = await self._connect()
+        try:
+            while max_units is None or self._units < max_units:
+                work = await self._request(reader, writer, {"method": "get_work"})
+                if work is None:
+                    break
+                unit = WorkUnit(
+                    x(work["partial_header"]),
+                    x(work["target"]),
+                    work["first_nonce"],
+                    work["last_nonce"],
+                    0,
+                    0,
+                )
+                shares = await loop.run_in_executor(
+                    None, sweep_shares, unit, x(work["share_target"]), self._batched
+                )
+                result = await self._request(
+                    reader,
+                    writer,
+                    {
+                        "method": "submit",
+                        "job": work["job"],
+                        "unit": work["unit"],
+                        "shares": shares,
+                        "hashes": unit.last_nonce - unit.first_nonce,
+                    },
+                )
+                if result is None:
+                    break
+                self._units += 1
+                self._hashes += unit.last_nonce - unit.first_nonce
+                self._accepted += result["accepted"]
+                self._rejected += result["rejected"]
+                self._stale += len(shares) if result["stale"] else 0
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def _connect(self) -> tuple[asyncio.StreamReader, asyncio.StreamWriter]:
+        for attempt in range(CONNECT_RETRIES + 1):
+            if attempt:
+                await asyncio.sleep(CONNECT_DELAY)
+            try:
+                return await asyncio.open_connection(self._host, self._port)
+            except ConnectionRefusedError:
+                if attempt == CONNECT_RETRIES:
+                    raise
+
+    async def _request(
+        self,
+        reader: asyncio.StreamReader,
+        writer: asyncio.StreamWriter,
+        message: dict,
+    ) -> dict | None:
+        writer.write(json.dumps(message).encode() + b"\n")
+        await writer.drain()
+        line = await reader.readline()
+        if not line:
+            return None
+        reply = json.loads(line)
+        if reply["method"] == "error":
+            raise ValueError(reply["error"])
+        return reply
+
+
+def run_worker(host: str = HOST, port: int = PORT, batched: bool = False) -> None:
+    asyncio.run(WorkClient(host, port, batched).run())
+
+
+def main():
+    host = sys.argv[1] if len(sys.argv) > 1 else HOST
+    port = int(sys.argv[2]) if len(sys.argv) > 2 else PORT
+    workers = [
+        multiprocessing.Process(target=run_worker, args=(host, port))
+        for _ in range(PROCESSES)
+    ]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,344 @@
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+from typing import Iterator
+
+from bitcoin.core import b2lx, b2x
+
+from header_store import HeaderStore, hash_meets_target
+from mining_stats import HASH_SPACE, MiningMonitor, print_hash_rate
+from part3 import (
+    HEADER_STORE_ENV,
+    NONCE_CHUNK_SIZE,
+    BaseCoinTransaction,
+    BitcoinBlock,
+    HeaderHasher,
+    WorkUnit,
+)
+from transaction import Transaction
+
+HOST = "127.0.0.1"
+PORT = 3333
+SHARE_FACTOR = 2**4
+STALL_TIMEOUT = 30.0
+STALL_CHECKS = 4
+GENESIS_PREV_HASH = "00" * 32
+
+
+def share_target(target: bytes, share_factor: int = SHARE_FACTOR) -> bytes:
+    value = min(int.from_bytes(target, "big") * share_factor, HASH_SPACE - 1)
+    return value.to_bytes(32, "big")
+
+
+class WorkServer:
+    def __init__(
+        self,
+        host: str = HOST,
+        port: int = PORT,
+        chunk_size: int = NONCE_CHUNK_SIZE,
+        share_factor: int = SHARE_FACTOR,
+        stall_timeout: float = STALL_TIMEOUT,
+        monitor: MiningMonitor | None = None,
+    ):
+        if chunk_size < 1:
+            raise ValueError("Chunk size must be positive")
+        if share_factor < 1:
+            raise ValueError("Share factor must be positive")
+        if stall_timeout <= 0:
+            raise ValueError("Stall timeout must be positive")
+        self._host = host
+        self._port = port
+        self._chunk_size = chunk_size
+        self._share_factor = share_factor
+        self._stall_timeout = stall_timeout
+        self._monitor = MiningMonitor() if monitor is None else monitor
+        self._server: asyncio.Server | None = None
+        self._watchdog: asyncio.Task | None = None
+        self._handlers: set[asyncio.Task] = set()
+        self._writers: set[asyncio.StreamWriter] = set()
+        self._ready = asyncio.Event()
+        self._closed = False
+
+        self._block: BitcoinBlock | None = None
+        self._job = 0
+        self._units: Iterator[WorkUnit] | None = None
+        self._solution: asyncio.Future | None = None
+        self._issued: dict[int, WorkUnit] = {}
+        self._assignments: dict[int, tuple[int, float]] = {}
+        self._stalled: dict[int, None] = {}
+        self._accepted: set[tuple[int, int]] = set()
+
+        self._next_worker = 0
+        self._shares: dict[int, int] = {}
+        self._rejected = 0
+        self._stale = 0
+        self._reassigned = 0
+
+    async def __aenter__(self) -> "WorkServer":
+        await self.start()
+        return self
+
+    async def __aexit__(self, *_) -> None:
+        await self.close()
+
+    @property
+    def address(self) -> tuple[str, int]:
+        if self._server is None:
+            return self._host, self._port
+        return self._server.sockets[0].getsockname()[:2]
+
+    @property
+    def job(self) -> int:
+        return self._job
+
+    @property
+    def monitor(self) -> MiningMonitor:
+        return self._monitor
+
+    @property
+    def shares(self) -> dict[int, int]:
+        return dict(self._shares)
+
+    @property
+    def rejected(self) -> int:
+        return self._rejected
+
+    @property
+    def stale(self) -> int:
+        return self._stale
+
+    @property
+    def reassigned(self) -> int:
+        return self._reassigned
+
+    async def start(self) -> None:
+        self._server = await asyncio.start_server(self._handle, self._host, self._port)
+        self._watchdog = asyncio.create_task(self._watch_stalled())
+
+    async def close(self) -> None:
+        if self._watchdog is not None:
+            self._watchdog.cancel()
+            self._watchdog = None
+        if self._server is not None:
+            self._server.close()
+        self._closed = True
+        self._ready.set()
+        for writer in list(self._writers):
+            writer.close()
+        await asyncio.gather(*self._handlers, return_exceptions=True)
+        if self._server is not None:
+            await self._server.wait_closed()
+            self._server = None
+        if self._solution is not None and not self._solution.done():
+            self._solution.cancel()
+
+    def set_block(self, block: BitcoinBlock) -> None:
+        if self._solution is not None and not self._solution.done():
+            self._solution.cancel()
+        self._job += 1
+        self._block = block
+        self._units = block.work_units(self._chunk_size)
+        self._solution = asyncio.get_running_loop().create_future()
+        self._issued.clear()
+        self._assignments.clear()
+        self._stalled.clear()
+        self._accepted.clear()
+        self._monitor.start(bytes.fromhex(block.target[2:]))
+        self._ready.set()
+
+    async def solve(self) -> bytes:
+        if self._solution is None:
+            raise ValueError("No block template to mine")
+        return await self._solution
+
+    def expire_stalled(self, now: float | None = None) -> int:
+        now = time.monotonic() if now is None else now
+        expired = [
+            unit_id
+            for unit_id, (_, deadline) in self._assignments.items()
+            if deadline <= now
+        ]
+        for unit_id in expired:
+            del self._assignments[unit_id]
+            self._stalled[unit_id] = None
+        return len(expired)
+
+    async def _handle(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        handler = asyncio.current_task()
+        self._handlers.add(handler)
+        self._writers.add(writer)
+        worker = self._next_worker
+        self._next_worker += 1
+        try:
+            async for line in reader:
+                try:
+                    reply = await self._dispatch(worker, json.loads(line))
+                except (KeyError, TypeError, ValueError) as e:
+                    reply = {"method": "error", "error": str(e)}
+                writer.write(json.dumps(reply).encode() + b"\n")
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            self._release(worker)
+            self._handlers.discard(handler)
+            self._writers.discard(writer)
+            writer.close()
+
+    async def _dispatch(self, worker: int, message: dict) -> dict:
+        method = message["method"]
+        if method == "get_work":
+            return await self._get_work(worker)
+        if method == "submit":
+            return self._submit(worker, message)
+        raise ValueError(f"Unknown method {method}")
+
+    async def _get_work(self, worker: int) -> dict:
+        while not self._ready.is_set():
+            await self._ready.wait()
+        if self._closed:
+            raise ConnectionAbortedError("Work server closed")
+        if self._stalled:
+            unit_id = next(iter(self._stalled))
+            del self._stalled[unit_id]
+            self._reassigned += 1
+        else:
+            unit_id = len(self._issued)
+            self._issued[unit_id] = next(self._units)
+        self._assignments[unit_id] = (worker, time.monotonic() + self._stall_timeout)
+
+        unit = self._issued[unit_id]
+        return {
+            "method": "work",
+            "job": self._job,
+            "unit": unit_id,
+            "partial_header": b2x(unit.partial_header),
+            "target": b2x(unit.target),
+            "share_target": b2x(share_target(unit.target, self._share_factor)),
+            "first_nonce": unit.first_nonce,
+            "last_nonce": unit.last_nonce,
+        }
+
+    def _submit(self, worker: int, message: dict) -> dict:
+        unit_id = message["unit"]
+        shares = message["shares"]
+        if not _is_int(message["job"]) or not _is_int(unit_id):
+            raise ValueError("Job and unit must be integers")
+        if not isinstance(shares, list) or not all(_is_int(n) for n in shares):
+            raise ValueError("Shares must be a list of integer nonces")
+        if not _is_int(message["hashes"]) or message["hashes"] < 0:
+            raise ValueError("Hashes must be a non-negative integer")
+        if message["job"] != self._job or unit_id not in self._issued:
+            self._stale += len(shares)
+            return {"method": "result", "stale": True, "accepted": 0, "rejected": 0}
+        self._assignments.pop(unit_id, None)
+        self._stalled.pop(unit_id, None)
+
+        unit = self._issued[unit_id]
+        hasher = HeaderHasher(unit.partial_header, unit.target)
+        target = int.from_bytes(share_target(unit.target, self._share_factor), "big")
+        accepted = 0
+        best_hash = None
+        for nonce in shares:
+            if (
+                not unit.first_nonce <= nonce < unit.last_nonce
+                or (unit_id, nonce) in self._accepted
+            ):
+                continue
+            hash_value = hasher.hash(nonce)
+            if not hash_meets_target(hash_value, target):
+                continue
+            accepted += 1
+            self._accepted.add((unit_id, nonce))
+            if best_hash is None or hash_value[::-1] < best_hash[::-1]:
+                best_hash = hash_value
+            if hasher.meets_target(hash_value) and not self._solution.done():
+                self._solve(unit, nonce)
+
+        rejected = len(shares) - accepted
+        self._shares[worker] = self._shares.get(worker, 0) + accepted
+        self._rejected += rejected
+        if self._monitor.stats is not None:
+            self._monitor.record(message["hashes"], worker, best_hash)
+        return {
+            "method": "result",
+            "stale": False,
+            "accepted": accepted,
+            "rejected": rejected,
+        }
+
+    def _solve(self, unit: WorkUnit, nonce: int) -> None:
+        self._ready.clear()
+        self._assignments.clear()
+        self._stalled.clear()
+        self._monitor.finish()
+        self._solution.set_result(self._block.load_solution(unit, nonce))
+
+    def _release(self, worker: int) -> None:
+        for unit_id, (assignee, _) in list(self._assignments.items()):
+            if assignee == worker:
+                del self._assignments[unit_id]
+                self._stalled[unit_id] = None
+
+    async def _watch_stalled(self) -> None:
+        while True:
+            await asyncio.sleep(self._stall_timeout / STALL_CHECKS)
+            self.expire_stalled()
+            if self._monitor.stats is not None and not self._monitor.stats.solved:
+                self._monitor.poll()
+
+
+def _is_int(value: object) -> bool:
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+async def serve(
+    store: HeaderStore,
+    coinbase: BaseCoinTransaction,
+    host: str = HOST,
+    port: int = PORT,
+) -> None:
+    monitor = MiningMonitor()
+    monitor.add_callback(print_hash_rate)
+    async with WorkServer(host, port, monitor=monitor) as server:
+        print(f"Serving work on {server.address[0]}:{server.address[1]}")
+        while True:
+            transactions = [coinbase.create()]
+            if store.tip is None:
+                block = BitcoinBlock(
+                    transactions,
+                    GENESIS_PREV_HASH,
+                    store.next_bits(),
+                    int(time.time()),
+                    coinbase,
+                )
+            else:
+                block = BitcoinBlock.from_header_store(
+                    store, transactions, int(time.time()), coinbase
+                )
+            server.set_block(block)
+            hash_value = await server.solve()
+            entry = store.add(block.header)
+            print(f"Block {entry.height}: {b2lx(hash_value)}")
+
+
+def main():
+    data = "810199385PashaBarahimi"
+    private_key = "5JWoEUpPb1BCRMTYUqNNq4L7eEAptfiz9FKsBAj7niAJWaQ6uZJ"
+    host = sys.argv[1] if len(sys.argv) > 1 else HOST
+    port = int(sys.argv[2]) if len(sys.argv) > 2 else PORT
+
+    basecoin = BaseCoinTransaction(private_key, data, Transaction.Network.MAINNET)
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.environ.get(HEADER_STORE_ENV, os.path.join(directory, "headers.dat"))
+        with HeaderStore(path) as store:
+            asyncio.run(serve(store, basecoin, host, port))
+
+
+if __name__ == "__main__":
+    main()